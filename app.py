@@ -1,43 +1,132 @@
 import streamlit as st
-import datetime
-from dateutil.relativedelta import relativedelta
-from components.overview import show_overview,show_news
-from components.financialdata import sankey_plot
-from components.financialTrend import show_income_trend
-from components.insider import show_holdings_pies,show_insider_transactions
+
+# 每個頁面的 component 只在被選到時才 import，
+# 新 session 第一次渲染不必載入 yfinance / plotly.express 等所有模組。
+
+
+def page_overview(symbol):
+    from components.overview import show_overview,show_news,prefetch_overview
+    st.title("Stock Dashboard")
+    st.write("Welcome to the Stock Dashboard!")
+    futures = prefetch_overview(symbol)
+    show_overview(symbol, futures)
+    show_news(symbol, futures["news"])
+
+
+def page_financial_data(symbol):
+    from components.financialdata import sankey_plot
+    st.title("Financial Data")
+    st.write("Breakdown financial report for certain period.")
+    period_choice = st.selectbox("Select Period Type", ["quarterly", "annual"])
+    sankey_plot(symbol,period_choice)
+
+
+def page_financial_trend(symbol):
+    from components.financialTrend import show_income_trend
+    st.title("Income Statement Line Charts")
+    st.write("Show the trend of financial data.")
+    period_choice = st.selectbox("Select Period Type", ["quarterly", "annual"])
+    show_income_trend(symbol, period_choice)
+
+
+def page_insider(symbol):
+    from components.insider import show_holdings_pies,show_insider_transactions,prefetch_insider
+    st.title("Big Whale and Insider.")
+    st.write("Show the shareholding distribution.")
+    futures = prefetch_insider(symbol)
+    show_holdings_pies(symbol, futures)
+    show_insider_transactions(symbol, futures["transactions"])
+
+
+def page_whale_screens(symbol):
+    from components.whales import show_whale_screens
+    st.title("Whale & Insider Screens")
+    st.write("Institutional and insider activity across a symbol universe.")
+    symbols_text = st.text_area("Universe (comma or space separated)", "AAPL, MSFT, GOOGL, AMZN, NVDA, META, TSLA, JPM, XOM, JNJ")
+    show_whale_screens(symbols_text)
+
+
+def page_watchlist(symbol):
+    from components.watchlist import show_watchlist
+    st.title("Watchlist Comparison")
+    st.write("Compare income statement metrics across many symbols.")
+    symbols_text = st.text_area("Symbols (comma or space separated)", "AAPL, MSFT, GOOGL, AMZN, NVDA, META, TSLA")
+    period_choice = st.selectbox("Select Period Type", ["quarterly", "annual"])
+    show_watchlist(symbols_text, period_choice)
+
+
+def page_portfolio(symbol):
+    import datetime
+    from components.portfolio import show_portfolio
+    st.title("Portfolio")
+    st.write("Value, weights, volatility, correlation and drawdowns across your holdings.")
+    holdings_text = st.text_area("Holdings (symbol and shares, comma separated)", "AAPL 10, MSFT 8, NVDA 5, AMZN 6, GOOGL 7, JPM 4, XOM 9")
+    start = st.date_input("Start date", datetime.date.today() - datetime.timedelta(days=3 * 365))
+    show_portfolio(holdings_text, start)
+
+
+def page_screener(symbol):
+    from components.screener import show_screener
+    st.title("Screener")
+    st.write("Filter and sort a locally indexed universe by fundamentals and margins.")
+    symbols_text = st.text_area("Universe (comma or space separated)", "AAPL, MSFT, GOOGL, AMZN, NVDA, META, TSLA, JPM, XOM, JNJ")
+    show_screener(symbols_text)
+
+
+def symbol_search():
+    """側邊欄的代號 / 公司名稱搜尋；選到的結果直接填進下方的 symbol 欄位。"""
+    query = st.sidebar.text_input("Search symbol or company", key="symbol_search")
+    if not query:
+        return
+    from components.universe import search
+    matches = search(query)
+    if not matches:
+        st.sidebar.caption("No match in the screener index.")
+        return
+    labels = {f"{s} · {name}" if name else s: s for s, name in matches}
+    st.sidebar.selectbox(
+        "Matches", list(labels), index=None, placeholder="Pick a symbol", key="symbol_match",
+        on_change=lambda: st.session_state.update(symbol=labels.get(st.session_state["symbol_match"]) or st.session_state["symbol"]),
+    )
+
+
+# 頁面名稱 -> 渲染函式（選單順序即此順序）
+PAGES = {
+    "Overview": page_overview,
+    "Financial Data": page_financial_data,
+    "Financial Trend": page_financial_trend,
+    "Insider & Whale": page_insider,
+    "Whale Screens": page_whale_screens,
+    "Watchlist": page_watchlist,
+    "Portfolio": page_portfolio,
+    "Screener": page_screener,
+}
+
+
+def page_diagnostics(symbol):
+    from components.diagnostics import show_diagnostics
+    st.title("Diagnostics")
+    st.write("Wall time, cache hits and payload sizes per stage.")
+    show_diagnostics()
+
+
 def main():
     st.set_page_config(page_title="Stock Dashboard", layout="wide")
 
+    # 隱藏頁面：網址加上 ?diagnostics=1 才會出現在選單
+    pages = dict(PAGES)
+    if st.query_params.get("diagnostics") == "1":
+        pages["Diagnostics"] = page_diagnostics
+
 # 頂部選單
-    menu = st.sidebar.radio("Choose the page", ["Overview", "Financial Data","Financial Trend", "Insider & Whale"])
+    menu = st.sidebar.radio("Choose the page", list(pages))
     # 1) User input: Stock symbol
-    symbol = st.sidebar.text_input("Enter a stock symbol (e.g., AAPL, TSLA):", "AAPL")
-
-
-    if menu == "Overview":
-        st.title("Stock Dashboard")
-        st.write("Welcome to the Stock Dashboard!")
-        show_overview(symbol)
-        show_news(symbol)
-    elif menu == "Financial Data":
-        st.title("Financial Data")
-        st.write("Breakdown financial report for certain period.")
-        period_choice = st.selectbox("Select Period Type", ["quarterly", "annual"])
-        sankey_plot(symbol,period_choice)
-    elif menu == "Insider & Whale":
-        st.title("Big Whale and Insider.")
-        st.write("Show the shareholding distribution.")
-        show_holdings_pies(symbol)
-        show_insider_transactions(symbol)
-    elif menu == 'Financial Trend':
-        st.title("Income Statement Line Charts")
-        st.write("Show the trend of financial data.")
-        period_choice = st.selectbox("Select Period Type", ["quarterly", "annual"])
-        show_income_trend(symbol, period_choice)
-        
-
-
-   
+    symbol_search()
+    st.session_state.setdefault("symbol", "AAPL")  # 預設值放在 session state，搜尋結果才能覆寫
+    symbol = st.sidebar.text_input("Enter a stock symbol (e.g., AAPL, TSLA):", key="symbol")
+
+    pages[menu](symbol)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,266 @@
+"""
+離線 benchmark：用 benchmarks/fixtures 裡錄好的回應取代 Yahoo / Finnhub，
+以 Streamlit AppTest 在無頭模式下渲染各 component，量測每個 stage 的時間與記憶體峰值。
+每個情境（component × symbol 數 × 歷史長度）在獨立子程序與空白快取目錄裡跑，
+先 cold（從 fixture 讀進快取）再 warm（同一程序再跑一次，命中快取）。
+
+    python benchmark.py synthesize                  # 產生合成 fixtures（不需要網路）
+    python benchmark.py record AAPL MSFT NVDA       # 在有網路的機器上錄下真實回應
+    python benchmark.py run                         # 全部 component × 1/100/1000 檔 × short/long
+    python benchmark.py run --components candles sankey --symbols 1 100 --history long
+    python benchmark.py run --json results.json --baseline baseline.json
+    python benchmark.py check-scheduler             # 用 stub client 檢查 Finnhub scheduler
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+RESULT_PREFIX = "BENCHMARK_RESULT "
+SYNTHETIC_SYMBOLS = ["AAA", "BBB", "CCC", "DDD", "EEE"]
+
+
+# ---- 各 component 的 AppTest 腳本：AppTest 只取函式本體，所以 import 要寫在裡面 ----
+
+def _income_trend(symbols, start, end):
+    from components.financialTrend import show_income_trend
+    for symbol in symbols:
+        show_income_trend(symbol, "quarterly")
+
+
+def _sankey(symbols, start, end):
+    from components.financialdata import sankey_plot
+    for symbol in symbols:
+        sankey_plot(symbol, "quarterly")
+
+
+def _holdings_pies(symbols, start, end):
+    from components.insider import show_holdings_pies
+    for symbol in symbols:
+        show_holdings_pies(symbol)
+
+
+def _insider_transactions(symbols, start, end):
+    from components.insider import show_insider_transactions
+    for symbol in symbols:
+        show_insider_transactions(symbol)
+
+
+def _candles(symbols, start, end):
+    from components.overview import get_candle_data
+    for symbol in symbols:
+        get_candle_data(symbol, start, end)
+
+
+# component 名稱 -> (AppTest 腳本, 要先 import 的模組)
+COMPONENTS = {
+    "income_trend": (_income_trend, "components.financialTrend"),
+    "sankey": (_sankey, "components.financialdata"),
+    "holdings_pies": (_holdings_pies, "components.insider"),
+    "insider_transactions": (_insider_transactions, "components.insider"),
+    "candles": (_candles, "components.overview"),
+}
+HISTORY_DAYS = {"short": 365, "long": None}
+
+
+def _stages(records):
+    """依 stage 彙總量測紀錄：次數、總時間、p95、記憶體峰值。"""
+    by_stage = {}
+    for record in records:
+        by_stage.setdefault(record["stage"], []).append(record)
+    rows = []
+    for stage, items in by_stage.items():
+        seconds = sorted(r["seconds"] for r in items)
+        peaks = [r["peak_bytes"] for r in items if "peak_bytes" in r]
+        rows.append({
+            "stage": stage,
+            "count": len(items),
+            "total_ms": sum(seconds) * 1000,
+            "p95_ms": seconds[min(len(seconds) - 1, int(round(0.95 * (len(seconds) - 1))))] * 1000,
+            "peak_mb": max(peaks) / 2**20 if peaks else None,
+        })
+    return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+
+def run_scenario(component, n, history, fixture_dir, timeout):
+    """在目前程序裡跑一個情境（由 run 以子程序呼叫），回傳 cold / warm 兩個階段的結果。"""
+    import importlib
+    from streamlit.testing.v1 import AppTest
+    from benchmarks.fixtures import FixtureFinnhub, Universe, load_all
+    from components import instrument
+    from components.config import FINNHUB_SCHEDULER
+    from components.tickers import set_ticker_factory
+
+    universe = Universe(load_all(fixture_dir), history)
+    set_ticker_factory(universe.ticker_factory)
+    FINNHUB_SCHEDULER.set_client(FixtureFinnhub(universe))
+
+    script, module = COMPONENTS[component]
+    importlib.import_module(module)  # 匯入時間另外由 importtime.py 量測
+    symbols = universe.symbols(n)
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=HISTORY_DAYS[history]) if HISTORY_DAYS[history] else datetime.date(2000, 1, 1)
+
+    phases = []
+    tracemalloc.start()
+    for phase in ("cold", "warm"):
+        instrument.clear()
+        with instrument.span(f"benchmark.{component}") as total:
+            app = AppTest.from_function(script, args=(symbols, start, end), default_timeout=timeout)
+            app.run()
+        phases.append({
+            "component": component,
+            "symbols": n,
+            "history": history,
+            "phase": phase,
+            "seconds": total["seconds"],
+            "peak_mb": total["peak_bytes"] / 2**20,
+            "errors": [str(e.value) for e in app.exception],
+            "stages": _stages(r for r in instrument.records() if r is not total),
+        })
+    tracemalloc.stop()
+    return phases
+
+
+def _spawn(component, n, history, fixture_dir, timeout):
+    """每個情境用獨立子程序與空白快取目錄，互不影響快取與記憶體量測。"""
+    with tempfile.TemporaryDirectory(prefix="dashboard-bench-") as cache_dir:
+        env = dict(
+            os.environ,
+            DASHBOARD_CACHE_DIR=cache_dir,
+            DASHBOARD_TRACE="0",
+            DASHBOARD_TRACE_BUFFER="10000000",
+            FINNHUB_CALLS_PER_MINUTE="1000000",  # fixture 不需要限流
+        )
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "_scenario", component, str(n), history,
+             "--fixtures", fixture_dir, "--timeout", str(timeout)],
+            capture_output=True, text=True, cwd=ROOT, env=env,
+        )
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    error = (result.stderr.strip().splitlines() or ["no output"])[-1]
+    return [{"component": component, "symbols": n, "history": history, "phase": "cold",
+             "seconds": None, "peak_mb": None, "errors": [error], "stages": []}]
+
+
+def _format_ms(value):
+    return "-" if value is None else f"{value:10.1f}"
+
+
+def report(results, top):
+    for result in results:
+        status = f"ERROR: {result['errors'][0][:80]}" if result["errors"] else ""
+        seconds = "-" if result["seconds"] is None else f"{result['seconds']:.2f}s"
+        peak = "-" if result["peak_mb"] is None else f"{result['peak_mb']:.1f} MB"
+        print(f"\n{result['component']:<22}{result['symbols']:>6} symbols  {result['history']:<6}"
+              f"{result['phase']:<6}{seconds:>10}{peak:>12}  {status}")
+        for row in result["stages"][:top]:
+            peak_mb = "-" if row["peak_mb"] is None else f"{row['peak_mb']:.1f}"
+            print(f"    {row['stage']:<40}{row['count']:>7}{_format_ms(row['total_ms'])} ms"
+                  f"  p95{_format_ms(row['p95_ms'])} ms  peak {peak_mb:>7} MB")
+
+
+def compare(results, baseline, tolerance):
+    """和先前存下的結果比較，時間或記憶體峰值超過 baseline ×(1 + tolerance) 視為退步。"""
+    previous = {(r["component"], r["symbols"], r["history"], r["phase"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["component"], result["symbols"], result["history"], result["phase"]))
+        if before is None or result["seconds"] is None:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            if before[metric] and result[metric] > before[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{result['component']} {result['symbols']} {result['history']} {result['phase']}: "
+                    f"{metric} {before[metric]:.2f} -> {result[metric]:.2f}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline component benchmarks over recorded fixtures.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmark matrix")
+    run.add_argument("--components", nargs="+", choices=list(COMPONENTS), default=list(COMPONENTS))
+    run.add_argument("--symbols", nargs="+", type=int, default=[1, 100, 1000])
+    run.add_argument("--history", nargs="+", choices=list(HISTORY_DAYS), default=list(HISTORY_DAYS))
+    run.add_argument("--fixtures", default=None, help="fixture directory (default: benchmarks/fixtures)")
+    run.add_argument("--timeout", type=float, default=1800, help="AppTest timeout per run, seconds")
+    run.add_argument("--top", type=int, default=8, help="stages to show per run")
+    run.add_argument("--json", help="write results to this file")
+    run.add_argument("--baseline", help="compare against a previous --json file")
+    run.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs baseline (0.2 = 20%%)")
+
+    record = commands.add_parser("record", help="record live responses as fixtures (needs network)")
+    record.add_argument("symbols", nargs="+")
+    record.add_argument("--fixtures", default=None)
+
+    synthesize = commands.add_parser("synthesize", help="write deterministic synthetic fixtures")
+    synthesize.add_argument("symbols", nargs="*", default=SYNTHETIC_SYMBOLS)
+    synthesize.add_argument("--fixtures", default=None)
+
+    commands.add_parser("check-scheduler", help="check the Finnhub scheduler against a local stub client")
+
+    scenario = commands.add_parser("_scenario")  # 內部使用：單一情境，由 run 以子程序呼叫
+    scenario.add_argument("component", choices=list(COMPONENTS))
+    scenario.add_argument("n", type=int)
+    scenario.add_argument("history", choices=list(HISTORY_DAYS))
+    scenario.add_argument("--fixtures", required=True)
+    scenario.add_argument("--timeout", type=float, required=True)
+
+    args = parser.parse_args()
+    if args.command == "check-scheduler":
+        from benchmarks import scheduler_check
+        sys.exit(1 if scheduler_check.run() else 0)
+    from benchmarks import fixtures
+    fixture_dir = args.fixtures or fixtures.FIXTURE_DIR
+
+    if args.command == "record":
+        for symbol in args.symbols:
+            fixtures.record(symbol, fixture_dir)
+            print(f"recorded {symbol.upper()}")
+    elif args.command == "synthesize":
+        for seed, symbol in enumerate(args.symbols):
+            fixtures.save(symbol, fixtures.synthesize(symbol.upper(), seed=seed), fixture_dir)
+            print(f"synthesized {symbol.upper()}")
+    elif args.command == "_scenario":
+        phases = run_scenario(args.component, args.n, args.history, fixture_dir, args.timeout)
+        print(RESULT_PREFIX + json.dumps(phases))
+    else:
+        if not fixtures.load_all(fixture_dir):
+            sys.exit(f"No fixtures in {fixture_dir}; run `python benchmark.py synthesize` or `record` first.")
+        results = []
+        started = time.perf_counter()
+        for component in args.components:
+            for history in args.history:
+                for n in args.symbols:
+                    phases = _spawn(component, n, history, fixture_dir, args.timeout)
+                    report(phases, args.top)
+                    results.extend(phases)
+        print(f"\nTotal: {time.perf_counter() - started:.1f}s")
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+        failed = [r for r in results if r["errors"]]
+        regressions = []
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                regressions = compare(results, json.load(f), args.tolerance)
+            for line in regressions:
+                print(f"REGRESSION {line}")
+        if failed or regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Benchmark 用的本地 fixtures 與替身 client。
+
+fixtures 是每檔股票一個 pickle（benchmarks/fixtures/{SYMBOL}.pkl.gz），
+內容是 yfinance Ticker 屬性與 Finnhub 回應的原樣快照：
+`record()` 在有網路的機器上錄下真實回應，`synthesize()` 產生可重現的合成資料。
+`FixtureTicker` / `FixtureFinnhub` 以同樣的介面把這些快照回放給 components。
+"""
+import datetime
+import gzip
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+HISTORY_START = "2000-01-01"
+
+# 錄製 / 回放的 Ticker 屬性
+TICKER_FIELDS = [
+    "quarterly_financials", "financials",
+    "quarterly_balance_sheet", "balance_sheet",
+    "quarterly_cashflow", "cashflow",
+    "major_holders", "institutional_holders", "info",
+]
+# short：最近一年的日 K、5 季 / 4 年財報、一年內的內部人申報；long：fixture 的全部長度
+SHORT_HISTORY = {"days": 365, "quarters": 5, "years": 4}
+
+INCOME_ITEMS = [
+    "Total Revenue", "Cost Of Revenue", "Gross Profit", "Operating Expense", "Operating Income",
+    "EBITDA", "Pretax Income", "Tax Provision", "Net Income", "Basic EPS", "Diluted EPS",
+]
+
+
+def _path(symbol, directory):
+    return os.path.join(directory, f"{symbol.upper()}.pkl.gz")
+
+
+def save(symbol, fixture, directory=FIXTURE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    with gzip.open(_path(symbol, directory), "wb") as f:
+        pickle.dump(fixture, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_all(directory=FIXTURE_DIR):
+    """回傳 {symbol: fixture}，依 symbol 排序。"""
+    fixtures = {}
+    if not os.path.isdir(directory):
+        return fixtures
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".pkl.gz"):
+            with gzip.open(os.path.join(directory, name), "rb") as f:
+                fixtures[name[:-len(".pkl.gz")]] = pickle.load(f)
+    return fixtures
+
+
+def record(symbol, directory=FIXTURE_DIR):
+    """從 Yahoo / Finnhub 錄下一檔股票的原始回應（需要網路與 FINNHUB_API_KEY）。"""
+    import finnhub
+    import yfinance as yf
+    from components.config import FINNHUB_API_KEY
+
+    symbol = symbol.upper()
+    ticker = yf.Ticker(symbol)
+    client = finnhub.Client(api_key=FINNHUB_API_KEY)
+    today = datetime.date.today().isoformat()
+    fixture = {field: getattr(ticker, field) for field in TICKER_FIELDS}
+    fixture["history"] = ticker.history(start=HISTORY_START, interval="1d")
+    fixture["profile"] = client.company_profile2(symbol=symbol)
+    fixture["insider_transactions"] = client.stock_insider_transactions(symbol, HISTORY_START, today)
+    fixture["recorded_at"] = today
+    save(symbol, fixture, directory)
+    return fixture
+
+
+def synthesize(symbol, seed=0, quarters=40, years=10):
+    """產生一檔合成股票：2000 年至今的日 K、40 季 / 10 年財報、持股與內部人交易。"""
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp.today().normalize()
+
+    dates = pd.bdate_range(HISTORY_START, today, name="Date")
+    close = 20 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, len(dates))))
+    open_ = close * np.exp(rng.normal(0, 0.005, len(dates)))
+    history = pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, len(dates))),
+        "Low": np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, len(dates))),
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, len(dates)).astype(float),
+    }, index=dates)
+
+    def statement(periods, freq, scale):
+        ends = pd.date_range(end=today, periods=periods, freq=freq)[::-1]  # yfinance：最新的在最左邊
+        revenue = scale * np.exp(np.cumsum(rng.normal(0.01, 0.05, periods)))[::-1]
+        cost = revenue * rng.uniform(0.4, 0.6, periods)
+        gross = revenue - cost
+        opex = gross * rng.uniform(0.3, 0.6, periods)
+        operating = gross - opex
+        ebitda = operating * rng.uniform(1.05, 1.3, periods)
+        pretax = operating * rng.uniform(0.9, 1.05, periods)
+        tax = pretax * 0.2
+        net = pretax - tax
+        eps = net / 1e9
+        rows = [revenue, cost, gross, opex, operating, ebitda, pretax, tax, net, eps, eps * 0.98]
+        return pd.DataFrame(rows, index=INCOME_ITEMS, columns=ends)
+
+    holders = 10
+    insiders_pct = rng.uniform(0.001, 0.1)
+    institutions_pct = rng.uniform(0.4, 0.8)
+    pct_held = np.sort(rng.uniform(0.005, 0.08, holders))[::-1]
+    transaction_days = pd.bdate_range(HISTORY_START, today)
+    picks = np.sort(rng.choice(len(transaction_days), size=min(2000, len(transaction_days)), replace=False))
+    transactions = [
+        {
+            "id": f"{symbol}-{i}",
+            "name": f"Insider {i % 25}",
+            "share": int(rng.integers(1_000, 1_000_000)),
+            "change": int(rng.integers(-50_000, 50_000)),
+            "filingDate": (day + pd.Timedelta(days=2)).strftime("%Y-%m-%d"),
+            "transactionDate": day.strftime("%Y-%m-%d"),
+            "transactionCode": str(rng.choice(["S", "P", "M", "A", "F"])),
+            "transactionPrice": float(rng.uniform(10, 300)),
+            "isDerivative": bool(rng.random() < 0.1),
+        }
+        for i, day in enumerate(transaction_days[picks])
+    ]
+
+    return {
+        "quarterly_financials": statement(quarters, "QE", 5e9),
+        "financials": statement(years, "YE", 2e10),
+        "major_holders": pd.DataFrame(
+            {"Value": [insiders_pct, institutions_pct, institutions_pct / (1 - insiders_pct), 3000.0]},
+            index=pd.Index(["insidersPercentHeld", "institutionsPercentHeld",
+                            "institutionsFloatPercentHeld", "institutionsCount"], name="Breakdown"),
+        ),
+        "institutional_holders": pd.DataFrame({
+            "Date Reported": [today - pd.Timedelta(days=45)] * holders,
+            "Holder": [f"Institution {i}" for i in range(holders)],
+            "pctHeld": pct_held,
+            "Shares": (pct_held * 1e10).astype(int),
+            "Value": pct_held * 1e10 * close[-1],
+            "pctChange": rng.normal(0, 0.05, holders),
+        }),
+        "info": {"symbol": symbol, "longName": f"{symbol} Inc.", "sector": "Technology", "marketCap": float(close[-1] * 1e10)},
+        "history": history,
+        "profile": {"ticker": symbol, "name": f"{symbol} Inc.", "finnhubIndustry": "Technology"},
+        "insider_transactions": {"symbol": symbol, "data": transactions},
+        "recorded_at": None,
+    }
+
+
+def trim(fixture, history):
+    """依 history（"short" / "long"）截取 fixture；long 就是錄下的全部長度。"""
+    if history == "long":
+        return fixture
+    fixture = dict(fixture)
+    cutoff = pd.Timestamp.today().normalize() - pd.Timedelta(days=SHORT_HISTORY["days"])
+    prices = fixture["history"]
+    index = prices.index.tz_localize(None) if prices.index.tz is not None else prices.index
+    fixture["history"] = prices[index >= cutoff]
+    for field in ("quarterly_financials", "quarterly_balance_sheet", "quarterly_cashflow"):
+        if isinstance(fixture.get(field), pd.DataFrame):
+            fixture[field] = fixture[field].iloc[:, :SHORT_HISTORY["quarters"]]
+    for field in ("financials", "balance_sheet", "cashflow"):
+        if isinstance(fixture.get(field), pd.DataFrame):
+            fixture[field] = fixture[field].iloc[:, :SHORT_HISTORY["years"]]
+    transactions = fixture["insider_transactions"] or {}
+    fixture["insider_transactions"] = {
+        **transactions,
+        "data": [tx for tx in transactions.get("data", []) if (tx.get("filingDate") or "") >= cutoff.strftime("%Y-%m-%d")],
+    }
+    return fixture
+
+
+def variant(fixture, i):
+    """
+    第 i 個衍生 symbol：數值乘上一點點係數，讓每檔的資料（與畫出來的圖）都不同，
+    不會因為內容相同而全部命中圖表快取。
+    """
+    if i == 0:
+        return fixture
+    factor = 1 + 0.0007 * i
+    fixture = dict(fixture)
+    for field in TICKER_FIELDS + ["history"]:
+        value = fixture.get(field)
+        if isinstance(value, pd.DataFrame):
+            numeric = value.select_dtypes("number").columns
+            if field == "major_holders":
+                value = value.copy()
+                value.loc[:, numeric] = value[numeric] / factor  # 百分比不能超過 1
+            else:
+                value = value.copy()
+                value[numeric] = value[numeric] * factor
+            fixture[field] = value
+    transactions = fixture["insider_transactions"] or {}
+    fixture["insider_transactions"] = {
+        **transactions,
+        "data": [{**tx, "change": round((tx.get("change") or 0) * factor)} for tx in transactions.get("data", [])],
+    }
+    return fixture
+
+
+class FixtureTicker:
+    """與 yf.Ticker 相同的屬性與 history()，資料來自 fixture。"""
+
+    def __init__(self, symbol, fixture):
+        self.ticker = symbol
+        self._fixture = fixture
+
+    def __getattr__(self, name):
+        if name in TICKER_FIELDS:
+            value = self._fixture.get(name)
+            return pd.DataFrame() if value is None and name != "info" else value
+        raise AttributeError(name)
+
+    def history(self, start=None, end=None, interval="1d", **kwargs):
+        df = self._fixture.get("history")
+        if df is None:
+            return pd.DataFrame()
+        index = df.index.tz_localize(None) if df.index.tz is not None else df.index
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= index >= pd.Timestamp(start)
+        if end is not None:
+            mask &= index < pd.Timestamp(end)
+        return df[mask]
+
+
+class FixtureFinnhub:
+    """與 finnhub.Client 相同的方法（本專案用到的部分），資料來自 fixture。"""
+
+    def __init__(self, universe):
+        self._universe = universe
+
+    def company_profile2(self, symbol=None, **kwargs):
+        return self._universe.fixture(symbol).get("profile") or {}
+
+    def company_news(self, symbol, _from=None, to=None):
+        return list(self._universe.fixture(symbol).get("news") or [])
+
+    def stock_insider_transactions(self, symbol, _from=None, to=None):
+        response = self._universe.fixture(symbol).get("insider_transactions") or {}
+        data = [
+            tx for tx in response.get("data", [])
+            if (_from is None or (tx.get("filingDate") or "") >= _from)
+            and (to is None or (tx.get("filingDate") or "") <= to)
+        ]
+        return {**response, "data": data}
+
+
+class Universe:
+    """
+    N 檔 benchmark 用的 symbol：前幾檔就是 fixture 本身，
+    超過 fixture 數量時以 {原 symbol}{序號} 循環衍生。
+    """
+
+    def __init__(self, fixtures, history="long"):
+        if not fixtures:
+            raise ValueError("no fixtures found; run `python benchmark.py synthesize` or `record` first")
+        self._names = list(fixtures)
+        self._fixtures = {name: trim(fixture, history) for name, fixture in fixtures.items()}
+        self._cache = {}
+
+    def symbols(self, n):
+        k = len(self._names)
+        return [self._names[i] if i < k else f"{self._names[i % k]}{i}" for i in range(n)]
+
+    def fixture(self, symbol):
+        symbol = symbol.upper()
+        if symbol not in self._cache:
+            name = next((n for n in self._names if symbol == n), None)
+            i = 0
+            if name is None:
+                name = next((n for n in sorted(self._names, key=len, reverse=True)
+                             if symbol.startswith(n) and symbol[len(n):].isdigit()), None)
+                if name is None:
+                    return {}  # 沒錄到的 symbol：和 Yahoo 查無此股一樣回空資料
+                i = int(symbol[len(name):])
+            self._cache[symbol] = variant(self._fixtures[name], i)
+        return self._cache[symbol]
+
+    def ticker_factory(self, symbol, session=None):
+        return FixtureTicker(symbol, self.fixture(symbol))
@@ -0,0 +1,134 @@
+"""
+用本地 stub client 檢查 FinnhubScheduler（不打網路）：
+合併相同請求、互動請求插隊 / 升級、token bucket 限流、429 退避時不佔住 worker。
+
+    python benchmark.py check-scheduler
+"""
+import threading
+import time
+
+from components.scheduler import FinnhubScheduler, INTERACTIVE, BACKGROUND
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class StubFinnhub:
+    """
+    記下每次上游呼叫的 symbol。gate 關著時呼叫會卡住（entered 表示已有呼叫進來），
+    用來把後面的請求留在佇列裡；symbol 為 LIMITED 的前 rate_limited 次呼叫回 429。
+    """
+
+    def __init__(self, rate_limited=0):
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.entered = threading.Event()
+        self._rate_limited = rate_limited
+        self._lock = threading.Lock()
+
+    def company_profile2(self, symbol=None):
+        self.entered.set()
+        self.gate.wait()
+        with self._lock:
+            self.calls.append(symbol)
+            if symbol == "LIMITED" and self._rate_limited > 0:
+                self._rate_limited -= 1
+                raise RateLimited("429 Too Many Requests")
+        return {"ticker": symbol}
+
+
+def _scheduler(client, **kwargs):
+    options = {"calls_per_minute": 60000, "burst": 100, "workers": 1, **kwargs}
+    return FinnhubScheduler(client, **options)
+
+
+def _block(scheduler, client):
+    """讓唯一的 worker 卡在一個呼叫上，之後送出的請求都會先排隊。"""
+    client.gate.clear()
+    blocker = scheduler.submit("company_profile2", symbol="BLOCKER")
+    client.entered.wait(5)
+    return blocker
+
+
+def check_coalescing():
+    client = StubFinnhub()
+    scheduler = _scheduler(client)
+    _block(scheduler, client)
+    futures = [scheduler.submit("company_profile2", symbol="AAPL") for _ in range(10)]
+    client.gate.set()
+    results = [future.result(timeout=5) for future in futures]
+    assert len({id(future) for future in futures}) == 1, "identical requests should share one future"
+    assert client.calls.count("AAPL") == 1, f"expected one upstream call, got {client.calls.count('AAPL')}"
+    assert all(result == {"ticker": "AAPL"} for result in results)
+
+
+def check_priority():
+    client = StubFinnhub()
+    scheduler = _scheduler(client)
+    _block(scheduler, client)
+    background = [scheduler.submit("company_profile2", symbol=s, priority=BACKGROUND) for s in ("B1", "B2")]
+    interactive = scheduler.submit("company_profile2", symbol="I1", priority=INTERACTIVE)
+    client.gate.set()
+    for future in (*background, interactive):
+        future.result(timeout=5)
+    assert client.calls[1:] == ["I1", "B1", "B2"], f"interactive should run first, got {client.calls[1:]}"
+
+
+def check_priority_upgrade():
+    client = StubFinnhub()
+    scheduler = _scheduler(client)
+    _block(scheduler, client)
+    first = scheduler.submit("company_profile2", symbol="B", priority=BACKGROUND)
+    queued = scheduler.submit("company_profile2", symbol="C", priority=BACKGROUND)
+    joined = scheduler.submit("company_profile2", symbol="C", priority=INTERACTIVE)
+    client.gate.set()
+    for future in (first, queued, joined):
+        future.result(timeout=5)
+    assert queued is joined
+    assert client.calls[1:] == ["C", "B"], f"joined request should be upgraded, got {client.calls[1:]}"
+
+
+def check_backoff():
+    client = StubFinnhub(rate_limited=2)
+    scheduler = _scheduler(client, backoff=0.2)
+    started = time.monotonic()
+    limited = scheduler.submit("company_profile2", symbol="LIMITED")
+    client.entered.wait(5)
+    other = scheduler.submit("company_profile2", symbol="OTHER")
+    other.result(timeout=5)
+    waited = time.monotonic() - started
+    assert waited < 0.15, f"a 429 backoff should not block the worker ({waited:.2f}s)"
+    assert limited.result(timeout=5) == {"ticker": "LIMITED"}
+    elapsed = time.monotonic() - started
+    assert client.calls == ["LIMITED", "OTHER", "LIMITED", "LIMITED"], client.calls
+    assert elapsed >= 0.2 + 0.4, f"retries should wait 0.2s then 0.4s ({elapsed:.2f}s)"
+
+
+def check_rate_limit():
+    client = StubFinnhub()
+    scheduler = _scheduler(client, calls_per_minute=600, burst=2, workers=4)  # 每秒 10 次
+    started = time.monotonic()
+    futures = [scheduler.submit("company_profile2", symbol=f"S{i}") for i in range(6)]
+    for future in futures:
+        future.result(timeout=5)
+    elapsed = time.monotonic() - started
+    assert elapsed >= 0.35, f"6 calls with burst 2 at 10/s should take ~0.4s, took {elapsed:.2f}s"
+
+
+CHECKS = [check_coalescing, check_priority, check_priority_upgrade, check_backoff, check_rate_limit]
+
+
+def run():
+    """跑全部檢查，回傳失敗的數量。"""
+    failed = 0
+    for check in CHECKS:
+        try:
+            check()
+        except AssertionError as exc:
+            failed += 1
+            print(f"FAIL {check.__name__}: {exc}")
+        else:
+            print(f"ok   {check.__name__}")
+    return failed
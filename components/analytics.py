@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from components.config import CACHE_DIR
+from components.insider_store import ingest, query_transactions
+from components.prefetch import prefetch
+from components.tickers import get_info
+from components.utils import get_institutional_holders
+
+ANALYTICS_DIR = os.path.join(CACHE_DIR, "analytics")
+HOLDERS_PATH = os.path.join(ANALYTICS_DIR, "holders.parquet")
+INSIDERS_PATH = os.path.join(ANALYTICS_DIR, "insiders.parquet")
+HOLDER_COLUMNS = ["symbol", "sector", "Holder", "Date Reported", "pctHeld", "Shares", "Value", "pctChange"]
+INSIDER_COLUMNS = ["symbol", "sector", "transactionDate", "change", "Transaction value", "transactionCode"]
+
+
+def _collect(symbol):
+    """單一 symbol 的機構持股與內部人交易（都走既有的快取 / 本地資料庫）。"""
+    sector = get_info(symbol).get("sector", "Unknown")
+    holders = get_institutional_holders(symbol)
+    if holders is None or holders.empty:
+        holders = pd.DataFrame(columns=HOLDER_COLUMNS)
+    else:
+        holders = holders.assign(symbol=symbol, sector=sector).reindex(columns=HOLDER_COLUMNS)
+    ingest(symbol)
+    insiders = query_transactions(symbol).reset_index().assign(symbol=symbol, sector=sector)
+    return holders, insiders.reindex(columns=INSIDER_COLUMNS)
+
+
+def build_dataset(symbols):
+    """
+    並行收集整個 universe 的資料，寫成兩個欄式 Parquet 檔：
+    holders.parquet（每檔前十大機構）與 insiders.parquet（內部人交易）。
+    回傳 (holders, insiders, 失敗的 symbol 清單)。
+    """
+    futures = prefetch({s: (lambda s=s: _collect(s)) for s in symbols})
+    holder_frames, insider_frames, failed = [], [], []
+    for symbol, future in futures.items():
+        try:
+            holders, insiders = future.result()
+        except Exception:
+            failed.append(symbol)
+            continue
+        holder_frames.append(holders)
+        insider_frames.append(insiders)
+
+    holders = pd.concat(holder_frames, ignore_index=True) if holder_frames else pd.DataFrame(columns=HOLDER_COLUMNS)
+    insiders = pd.concat(insider_frames, ignore_index=True) if insider_frames else pd.DataFrame(columns=INSIDER_COLUMNS)
+    # 重複出現的字串欄位轉成 category，Parquet 會以 dictionary encoding 儲存
+    for df, cols in ((holders, ["symbol", "sector", "Holder"]), (insiders, ["symbol", "sector", "transactionCode"])):
+        for col in cols:
+            df[col] = df[col].astype("category")
+    os.makedirs(ANALYTICS_DIR, exist_ok=True)
+    holders.to_parquet(HOLDERS_PATH, index=False)
+    insiders.to_parquet(INSIDERS_PATH, index=False)
+    return holders, insiders, failed
+
+
+def load_dataset(holder_columns=None, insider_columns=None):
+    """讀回已建好的資料集，只讀需要的欄位；尚未建立時回傳 (None, None)。"""
+    if not (os.path.exists(HOLDERS_PATH) and os.path.exists(INSIDERS_PATH)):
+        return None, None
+    return (
+        pd.read_parquet(HOLDERS_PATH, columns=holder_columns),
+        pd.read_parquet(INSIDERS_PATH, columns=insider_columns),
+    )
+
+
+def institutions_adding(holders, min_change=0.0):
+    """
+    哪些機構在最多檔股票裡加碼：
+    每個機構加碼 / 減碼的檔數、加碼部位總市值，依加碼檔數排序。
+    """
+    df = holders.dropna(subset=["pctChange"])
+    added = df["pctChange"].to_numpy() > min_change
+    df = df.assign(
+        added=added.astype(int),
+        reduced=(df["pctChange"].to_numpy() < -min_change).astype(int),
+        added_value=np.where(added, df["Value"].to_numpy(dtype=float), 0.0),
+    )
+    result = df.groupby("Holder", observed=True).agg(
+        tickers_added=("added", "sum"),
+        tickers_reduced=("reduced", "sum"),
+        tickers_held=("symbol", "nunique"),
+        value_added=("added_value", "sum"),
+        avg_pct_change=("pctChange", "mean"),
+    )
+    return result.sort_values(["tickers_added", "value_added"], ascending=False)
+
+
+def net_insider_by_sector(insiders, start=None, end=None):
+    """
+    依產業彙總內部人淨買賣：只計公開市場買進 (P) / 賣出 (S)，
+    金額以 change 的正負號決定方向。
+    """
+    df = insiders
+    if start is not None:
+        df = df[df["transactionDate"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["transactionDate"] <= pd.Timestamp(end)]
+    df = df[df["transactionCode"].isin(["P", "S"])]
+    signed_value = np.sign(df["change"].to_numpy(dtype=float)) * df["Transaction value"].to_numpy(dtype=float)
+    df = df.assign(
+        net_value=signed_value,
+        buys=(df["transactionCode"] == "P").astype(int),
+        sells=(df["transactionCode"] == "S").astype(int),
+    )
+    result = df.groupby("sector", observed=True).agg(
+        net_value=("net_value", "sum"),
+        buys=("buys", "sum"),
+        sells=("sells", "sum"),
+        symbols=("symbol", "nunique"),
+    )
+    return result.sort_values("net_value", ascending=False)
@@ -0,0 +1,169 @@
+"""
+持股與基本面的歷史快照庫（point-in-time）。
+major_holders / institutional_holders / info 每次重抓時記一份當天的快照，
+存在 CACHE_DIR/archive/{dataset}/{SYMBOL}.parquet（zstd 壓縮、依 AsOf 由舊到新）。
+只追加、不改舊資料；內容跟上一份一樣（雜湊相同）就不寫，同一天重抓只留最後一份。
+"""
+import datetime
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from components.config import CACHE_DIR, CACHE_MAX_ITEMS
+from components.cache import single_flight
+from components.instrument import timed, annotate
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.path.join(CACHE_DIR, "archive")
+DATASETS = ("major_holders", "institutional_holders", "info")
+
+# 記憶體層：(dataset, symbol) -> (檔案 mtime, 全部快照)
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def _path(dataset, symbol):
+    # symbol 來自使用者輸入：跳脫 / 等字元，檔名不會跑出 ARCHIVE_DIR
+    return os.path.join(ARCHIVE_DIR, dataset, f"{quote(symbol, safe='^=')}.parquet")
+
+
+def to_frame(dataset, value):
+    """
+    把 API 回傳值整理成要存的表：
+    - info: 只留數值欄位，一列（本益比、市值、EPS… 之後可以畫走勢）
+    - major_holders: Breakdown 轉成欄位，一列
+    - institutional_holders: 原表，每個機構一列
+    """
+    if value is None:
+        return pd.DataFrame()
+    if dataset == "info":
+        numbers = {
+            key: float(v) for key, v in value.items()
+            if isinstance(v, (int, float, np.number)) and not isinstance(v, bool)
+        }
+        return pd.DataFrame([numbers], columns=sorted(numbers), dtype=float) if numbers else pd.DataFrame()
+    if value.empty:
+        return pd.DataFrame()
+    if dataset == "major_holders":
+        row = pd.to_numeric(value["Value"], errors="coerce")
+        return pd.DataFrame([row.to_numpy(dtype=float)], columns=[str(name) for name in row.index])
+    return value.reset_index(drop=True)
+
+
+def _hash(frame):
+    digest = hashlib.sha1(pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+    digest.update(str(list(frame.columns)).encode())
+    return digest.hexdigest()
+
+
+def _load(dataset, symbol):
+    """讀整個快照檔（依 mtime 快取在記憶體）；沒有檔案時回傳 None。"""
+    path = _path(dataset, symbol)
+    if not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    key = (dataset, symbol)
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is not None and entry[0] == mtime:
+            _memory.move_to_end(key)
+            annotate(cache="memory")
+            return entry[1]
+    frame = pd.read_parquet(path)
+    annotate(cache="disk")
+    with _memory_lock:
+        _memory[key] = (mtime, frame)
+        _memory.move_to_end(key)
+        while len(_memory) > CACHE_MAX_ITEMS:
+            _memory.popitem(last=False)
+    return frame
+
+
+@timed("archive.record")
+def record(symbol, dataset, value, day=None):
+    """
+    記下一份快照並原樣回傳 value，可以直接包在 fetch 外面：
+        lambda: record(symbol, "info", fetch_info(symbol))
+    存檔失敗只記 log，不影響 fetch 本身。
+    """
+    try:
+        _record(symbol, dataset, value, day)
+    except Exception:
+        log.exception("archiving %s %s failed", dataset, symbol)
+    return value
+
+
+def _record(symbol, dataset, value, day):
+    frame = to_frame(dataset, value)
+    if frame.empty:
+        return
+    symbol = symbol.upper()
+    day = pd.Timestamp(day or datetime.date.today())
+    digest = _hash(frame)
+    with single_flight(("archive", dataset, symbol)):
+        stored = _load(dataset, symbol)
+        snapshot = frame.assign(AsOf=day, Hash=digest)
+        merged = snapshot
+        if stored is not None and not stored.empty:
+            if stored["Hash"].iat[-1] == digest:
+                annotate(rows=0)
+                return  # 跟上一份一樣，不寫
+            if stored["AsOf"].iat[-1] > day:
+                return  # 比已存的還舊，不寫回過去
+            earlier = stored[stored["AsOf"] < day]  # 同一天只留最後一份
+            if not earlier.empty and earlier["Hash"].iat[-1] == digest:
+                # A、B、A（B 和第二個 A 同一天）：當天的 B 作廢，留原本那份 A 就好
+                merged, snapshot = earlier, snapshot.iloc[:0]
+            elif not earlier.empty:
+                merged = pd.concat([earlier, snapshot], ignore_index=True)
+        path = _path(dataset, symbol)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        merged.to_parquet(tmp_path, compression="zstd", index=False)
+        os.replace(tmp_path, path)
+        annotate(rows=len(snapshot))
+
+
+def dates(symbol, dataset):
+    """有快照的日期（由舊到新）。"""
+    stored = _load(dataset, symbol.upper())
+    if stored is None or stored.empty:
+        return []
+    return list(pd.DatetimeIndex(stored["AsOf"].unique()).date)
+
+
+@timed("archive.history")
+def history(symbol, dataset, start=None, end=None):
+    """[start, end] 之間的所有快照（含 AsOf 欄）；AsOf 已排序，用二分搜尋切區間。"""
+    stored = _load(dataset, symbol.upper())
+    if stored is None or stored.empty:
+        return pd.DataFrame()
+    as_of = stored["AsOf"].to_numpy()
+    lo = 0 if start is None else as_of.searchsorted(np.datetime64(pd.Timestamp(start)), side="left")
+    hi = len(as_of) if end is None else as_of.searchsorted(np.datetime64(pd.Timestamp(end)), side="right")
+    return stored.iloc[lo:hi].drop(columns="Hash")
+
+
+def at(symbol, dataset, day):
+    """
+    day 當天（或之前最近一次）的快照，整理回原本 API 的形狀：
+    info -> dict、major_holders -> Breakdown x Value、institutional_holders -> 原表。
+    沒有快照時回傳 None。
+    """
+    stored = history(symbol, dataset, end=day)
+    if stored.empty:
+        return None
+    latest = stored[stored["AsOf"] == stored["AsOf"].iat[-1]].drop(columns="AsOf")
+    if dataset == "info":
+        return {key: v for key, v in latest.iloc[0].items() if pd.notna(v)}
+    if dataset == "major_holders":
+        values = latest.iloc[0].dropna()
+        return pd.DataFrame({"Value": values.to_numpy()}, index=pd.Index(values.index, name="Breakdown"))
+    return latest.dropna(axis=1, how="all").reset_index(drop=True)
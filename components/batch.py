@@ -0,0 +1,36 @@
+from components.metrics import to_panel
+from components.prefetch import prefetch
+from components.utils import get_ic
+
+
+def parse_symbols(text):
+    """'AAPL, msft tsla' -> ['AAPL', 'MSFT', 'TSLA']（去重、保留順序）"""
+    symbols = text.replace(",", " ").upper().split()
+    return list(dict.fromkeys(symbols))
+
+
+def load_income_statements(symbols, period_type="quarterly"):
+    """
+    並行抓多檔股票的損益表，合併成一張 MultiIndex (Symbol, ReportDate) 的長表。
+    抓不到或沒有資料的 symbol 直接略過。
+    """
+    futures = prefetch({s: (lambda s=s: get_ic(s, type=period_type)) for s in symbols})
+    statements = {}
+    for symbol, future in futures.items():
+        try:
+            df = future.result()
+        except Exception:
+            continue
+        if df is None or df.empty:
+            continue
+        statements[symbol] = df
+    panel = to_panel(statements)
+    return panel.dropna(subset=["Total Revenue"])
+
+
+def latest_snapshot(metrics):
+    """每檔股票最新一期的指標，做成橫截面比較表。"""
+    if metrics.empty:
+        return metrics
+    latest = metrics.groupby(level="Symbol").tail(1)
+    return latest.reset_index(level="ReportDate")
@@ -0,0 +1,237 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from components.config import CACHE_DIR, CACHE_MAX_ITEMS, CACHE_TTL, CACHE_DEFAULT_TTL, CACHE_LOCK_TIMEOUT, CACHE_STALE_MAX
+from components.instrument import annotate
+from components.prefetch import revalidate
+
+try:
+    import fcntl
+except ImportError:  # Windows：只有同一程序內的 single-flight
+    fcntl = None
+
+LOCK_DIR = os.path.join(CACHE_DIR, "locks")
+
+# 記憶體層：key -> (fetched_at, value)，依最近使用排序
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+_local = threading.local()
+# single-flight：每個 key 一把 thread lock，程序之間再靠檔案鎖
+_flight_locks = {}
+_flight_guard = threading.Lock()
+
+
+def open_db(name):
+    """
+    開啟 CACHE_DIR 底下的 SQLite 檔。使用 WAL，
+    多個程序同時讀寫時讀取不會被寫入擋住。
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(CACHE_DIR, name), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+@contextmanager
+def _file_lock(name):
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    path = os.path.join(LOCK_DIR, hashlib.sha1(repr(name).encode("utf-8")).hexdigest() + ".lock")
+    with open(path, "a+b") as f:
+        deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+        locked = False
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                locked = True
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if locked:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def single_flight(name):
+    """
+    同一個 name 同時只有一個 thread / 程序在執行區塊，其他人排隊等它做完。
+    thread 之間用 threading.Lock，程序之間用 LOCK_DIR 底下的 flock 檔案鎖
+    （持有者掛掉時 OS 會自動釋放）。等超過 CACHE_LOCK_TIMEOUT 就不等了，直接進去。
+    """
+    with _flight_guard:
+        lock = _flight_locks.setdefault(name, threading.Lock())
+    acquired = lock.acquire(timeout=CACHE_LOCK_TIMEOUT)
+    try:
+        with _file_lock(name):
+            yield
+    finally:
+        if acquired:
+            lock.release()
+
+
+def _connect():
+    """每個 thread 各自一條 SQLite 連線，資料庫放在 CACHE_DIR 底下，所有程序共用。"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = open_db("cache.sqlite")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " symbol TEXT NOT NULL,"
+            " dataset TEXT NOT NULL,"
+            " period TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " payload BLOB NOT NULL,"
+            " PRIMARY KEY (symbol, dataset, period))"
+        )
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def _make_key(symbol, dataset, period):
+    return (symbol.upper(), dataset, period or "")
+
+
+def _remember(key, fetched_at, value):
+    with _memory_lock:
+        _memory[key] = (fetched_at, value)
+        _memory.move_to_end(key)
+        while len(_memory) > CACHE_MAX_ITEMS:
+            _memory.popitem(last=False)
+
+
+def _read_memory(key, ttl, now):
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        if now - entry[0] >= ttl:
+            del _memory[key]
+            return None
+        _memory.move_to_end(key)
+        return entry
+
+
+def _read_disk(key, ttl, now):
+    row = _connect().execute(
+        "SELECT fetched_at, payload FROM cache WHERE symbol=? AND dataset=? AND period=?",
+        key,
+    ).fetchone()
+    if row is None or now - row[0] >= ttl:
+        return None
+    return row[0], pickle.loads(row[1])
+
+
+def _write_disk(key, fetched_at, value):
+    conn = _connect()
+    conn.execute(
+        "INSERT OR REPLACE INTO cache (symbol, dataset, period, fetched_at, payload) VALUES (?, ?, ?, ?, ?)",
+        (*key, fetched_at, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+    )
+    conn.commit()
+
+
+def _is_empty(value):
+    """None、空表、空 dict 都不寫入快取（上游失敗時 yfinance 常回傳空表）。"""
+    if value is None:
+        return True
+    empty = getattr(value, "empty", None)
+    if isinstance(empty, bool):
+        return empty
+    return isinstance(value, (dict, list)) and not value
+
+
+def get_or_fetch(symbol, dataset, period, fetch):
+    """
+    依 (symbol, dataset, period) 取快取，過期或不存在時才呼叫 fetch()。
+    先查記憶體 LRU，再查共用的 SQLite；過期不久的資料直接回傳並在背景重抓，
+    兩層都沒有才打網路；
+    打網路時以 single-flight 鎖住這個 key，其他 thread / 程序等結果寫進 SQLite 後直接讀。
+    """
+    key = _make_key(symbol, dataset, period)
+    ttl = CACHE_TTL.get(dataset, CACHE_DEFAULT_TTL)
+    now = time.time()
+
+    entry = _read_memory(key, ttl, now)
+    tier = "memory"
+    if entry is None:
+        # 過期但還沒超過 CACHE_STALE_MAX 的也讀出來，先回舊資料、背景重抓
+        entry = _read_disk(key, ttl + CACHE_STALE_MAX, now)
+        tier = "disk"
+        if entry is not None and now - entry[0] >= ttl:
+            annotate(cache="stale")
+            revalidate(key, lambda: refresh(symbol, dataset, period, fetch))
+            return entry[1]
+        if entry is not None:
+            _remember(key, *entry)
+    if entry is not None:
+        annotate(cache=tier)
+        return entry[1]
+
+    with single_flight(key):
+        # 等鎖的期間別人可能已經抓好了
+        entry = _read_disk(key, ttl, time.time())
+        if entry is not None:
+            _remember(key, *entry)
+            annotate(cache="shared")
+            return entry[1]
+        annotate(cache="miss")
+        value = fetch()
+        if not _is_empty(value):
+            fetched_at = time.time()
+            _write_disk(key, fetched_at, value)
+            _remember(key, fetched_at, value)
+    return value
+
+
+def refresh(symbol, dataset, period, fetch):
+    """不管 TTL，直接重新抓取並寫入快取（背景 worker 用來預熱）。"""
+    key = _make_key(symbol, dataset, period)
+    with single_flight(key):
+        value = fetch()
+        if not _is_empty(value):
+            fetched_at = time.time()
+            _write_disk(key, fetched_at, value)
+            _remember(key, fetched_at, value)
+    return value
+
+
+def as_of(symbol, dataset, period=None):
+    """這份快取是什麼時候抓的（epoch 秒），沒有快取時回傳 None。"""
+    key = _make_key(symbol, dataset, period)
+    with _memory_lock:
+        entry = _memory.get(key)
+    if entry is not None:
+        return entry[0]
+    row = _connect().execute(
+        "SELECT fetched_at FROM cache WHERE symbol=? AND dataset=? AND period=?", key
+    ).fetchone()
+    return row[0] if row else None
+
+
+def invalidate(symbol, dataset=None):
+    """清掉某檔股票（或某個資料集）的快取，記憶體與磁碟都清。"""
+    symbol = symbol.upper()
+    with _memory_lock:
+        for key in [k for k in _memory if k[0] == symbol and dataset in (None, k[1])]:
+            del _memory[key]
+    conn = _connect()
+    if dataset is None:
+        conn.execute("DELETE FROM cache WHERE symbol=?", (symbol,))
+    else:
+        conn.execute("DELETE FROM cache WHERE symbol=? AND dataset=?", (symbol, dataset))
+    conn.commit()
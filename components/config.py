@@ -1,11 +1,81 @@
-import finnhub
 import os
 import dotenv
-import datetime
+from components.scheduler import FinnhubScheduler, ScheduledClient, BACKGROUND
 dotenv.load_dotenv()
 # ---------------------------------------
 # Replace with your actual Finnhub API key
 # ---------------------------------------
 FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY")
-FINNCLIENT = finnhub.Client(api_key=FINNHUB_API_KEY)
-STARTDATE ="2021-01-01"
\ No newline at end of file
+FINNHUB_CALLS_PER_MINUTE = int(os.getenv("FINNHUB_CALLS_PER_MINUTE", "60"))  # 免費方案每分鐘 60 次
+# 所有 session 共用同一個 scheduler：限流、合併重複請求、互動優先
+def _make_finnhub_client():
+    import finnhub
+    from components.instrument import add_bytes
+    client = finnhub.Client(api_key=FINNHUB_API_KEY)
+    client._session.hooks["response"].append(lambda response, *args, **kwargs: add_bytes(len(response.content)))
+    return client
+
+
+# client 在第一次呼叫 Finnhub 時才建立，整個程序只建一次
+FINNHUB_SCHEDULER = FinnhubScheduler(client_factory=_make_finnhub_client, calls_per_minute=FINNHUB_CALLS_PER_MINUTE)
+FINNCLIENT = ScheduledClient(FINNHUB_SCHEDULER)
+FINNCLIENT_BACKGROUND = FINNCLIENT.with_priority(BACKGROUND)
+STARTDATE ="2021-01-01"
+
+# ---------------------------------------
+# Local data cache (shared by every session on this machine)
+# ---------------------------------------
+# 多個 Streamlit 程序共用同一個 CACHE_DIR（同一台機器或共享磁碟），SQLite 快取與檔案鎖都放這裡
+CACHE_DIR = os.getenv("DASHBOARD_CACHE_DIR", ".cache")
+# 記憶體內 LRU 上限；每個程序各有一份，多程序部署時可以調小或設 0 只用共享的 SQLite
+CACHE_MAX_ITEMS = int(os.getenv("DASHBOARD_MEMORY_CACHE_ITEMS", "256"))
+# 各資料集的存活秒數：財報一季才變一次，持股每天變
+CACHE_TTL = {
+    "income": 24 * 3600,
+    "balance": 24 * 3600,
+    "cashflow": 24 * 3600,
+    "institutional_holders": 4 * 3600,
+    "major_holders": 4 * 3600,
+    "info": 15 * 60,
+    "profile": 24 * 3600,
+    "news": 10 * 60,
+    "insider_transactions": 6 * 3600,
+}
+CACHE_DEFAULT_TTL = 3600
+CACHE_LOCK_TIMEOUT = 60  # 等其他程序抓同一個 key 最多幾秒，超過就自己抓
+# 過期但還在這段時間內的資料先拿來顯示，同時在背景重抓（stale-while-revalidate）
+CACHE_STALE_MAX = 7 * 24 * 3600
+# 每個頁面區塊等資料的上限秒數，超過就先畫上一份成功的 snapshot
+SECTION_TIMEOUT = float(os.getenv("DASHBOARD_SECTION_TIMEOUT", "8"))
+TICKER_POOL_SIZE = 64  # 同時保留的 yf.Ticker 物件上限
+TICKER_MAX_AGE = 60  # Ticker 物件重用的秒數，一次頁面渲染內共用即可
+PREFETCH_WORKERS = 16  # 頁面並行抓取的 thread 數
+# 本地 K 線檔多久內視為最新，不再補抓；有背景 worker 維護時可以調大
+PRICE_REFRESH_SECONDS = int(os.getenv("PRICE_REFRESH_SECONDS", str(5 * 60)))
+FIGURE_CACHE_SIZE = 128  # 伺服器端保留的 plotly 圖數量
+NEWS_DAYS = 7  # 新聞保留 / 顯示的天數
+NEWS_BATCH = 5  # 每次顯示 / 多載入的新聞篇數
+THUMBNAIL_SIZE = (300, 300)  # 新聞縮圖的最大寬高
+THUMBNAIL_RETRY_SECONDS = 6 * 3600  # 縮圖下載失敗後，隔多久才再試同一個網址
+TRACE_ENABLED = os.getenv("DASHBOARD_TRACE", "0") == "1"  # 是否把量測寫到 CACHE_DIR/trace.jsonl（預設關閉）
+TRACE_FLUSH_ROWS = 200  # 寫檔前先在記憶體累積的筆數（另外每 TRACE_FLUSH_SECONDS 秒也會寫一次）
+TRACE_FLUSH_SECONDS = 5
+TRACE_MAX_BYTES = int(os.getenv("DASHBOARD_TRACE_MAX_MB", "50")) * 1024 * 1024  # 超過就換檔成 trace.jsonl.1
+TRACE_BUFFER = int(os.getenv("DASHBOARD_TRACE_BUFFER", "5000"))  # Diagnostics 頁面保留的最近量測筆數
+MAX_CANDLES = 600  # 一張 K 線圖最多畫幾根，超過就自動改用週 / 月 K
+
+# ---------------------------------------
+# Background refresh worker (worker.py)
+# ---------------------------------------
+WATCHLIST = [s.strip().upper() for s in os.getenv("DASHBOARD_WATCHLIST", "AAPL,MSFT,GOOGL,AMZN,NVDA,META,TSLA").split(",") if s.strip()]
+# 每個資料集的更新頻率：every=每隔幾秒；at=每天固定時間 (UTC, HH:MM)
+# every 要比 CACHE_TTL 短，頁面讀到的快取才會一直是熱的
+REFRESH_CADENCE = {
+    "candles": {"at": "21:15"},  # 美股收盤後
+    "news": {"every": 5 * 60},
+    "info": {"every": 10 * 60},
+    "holders": {"every": 2 * 3600},
+    "insider_transactions": {"every": 3 * 3600},
+    "statements": {"every": 12 * 3600},
+    "profile": {"every": 12 * 3600},
+}
@@ -0,0 +1,46 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from components.config import TRACE_ENABLED
+from components.instrument import records, summary, prometheus_text, TRACE_PATH
+
+
+def show_diagnostics():
+    """各階段（抓取、快取、計算、組圖、輸出）的耗時分布，資料來自本程序最近的量測。"""
+    stats = pd.DataFrame(summary())
+    if stats.empty:
+        st.info("No measurements yet. Open a few pages first.")
+        return
+
+    # stage 名稱是「群組.名稱」，群組清單直接從量測到的 stage 取，新模組加的 span 也會出現
+    groups = sorted({stage.split(".", 1)[0] for stage in stats["stage"]})
+    prefix = st.selectbox("Stage group", ["all", *groups])
+    if prefix != "all":
+        stats = stats[stats["stage"].str.startswith(prefix + ".")]
+    stats = stats.sort_values("p95_ms", ascending=False)
+
+    st.subheader("Per-stage latency")
+    st.dataframe(stats.set_index("stage"), use_container_width=True)
+    fig = px.bar(
+        stats.head(25),
+        x="p95_ms",
+        y="stage",
+        orientation="h",
+        hover_data=["p50_ms", "count", "cache_hit_rate"],
+        title="p95 latency by stage (ms)",
+        height=max(300, 24 * min(len(stats), 25)),
+    )
+    fig.update_yaxes(autorange="reversed")
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("Recent trace")
+    recent = pd.DataFrame(records()[-200:][::-1])
+    st.dataframe(recent, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    col1.download_button("Download Prometheus metrics", prometheus_text(), file_name="metrics.prom")
+    if TRACE_ENABLED:
+        col2.caption(f"Full JSONL trace (all processes): `{TRACE_PATH}`")
+    else:
+        col2.caption(f"Set DASHBOARD_TRACE=1 to also write the full JSONL trace to `{TRACE_PATH}`")
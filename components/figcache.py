@@ -0,0 +1,71 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from components.config import FIGURE_CACHE_SIZE
+from components.instrument import span
+from components.sections import element_key
+
+# (圖表名稱, 資料雜湊, 參數) -> 已建好的 plotly Figure
+_figures = OrderedDict()
+_lock = threading.Lock()
+
+
+def data_hash(*parts):
+    """對 DataFrame / Series 用 pandas 的向量化雜湊，其餘物件用 repr。"""
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            digest.update(pd.util.hash_pandas_object(part, index=True).values.tobytes())
+            if isinstance(part, pd.DataFrame):
+                digest.update(str(list(part.columns)).encode())
+        else:
+            digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+
+def cached_figure(name, data, params, build):
+    """
+    輸入資料與參數都沒變時直接回傳上次建好的 Figure，不重新組圖。
+    data: 建圖用到的資料（可以是 tuple）；params: 其他影響外觀的參數 dict。
+    """
+    with span(f"figure.{name}") as record:
+        key = (name, data_hash(*(data if isinstance(data, tuple) else (data,))), repr(sorted(params.items())))
+        with _lock:
+            fig = _figures.get(key)
+            if fig is not None:
+                _figures.move_to_end(key)
+                record["cache"] = "memory"
+                return fig
+        record["cache"] = "miss"
+        fig = build()
+        with _lock:
+            _figures[key] = fig
+            while len(_figures) > FIGURE_CACHE_SIZE:
+                _figures.popitem(last=False)
+        return fig
+
+
+def show_figure(fig, name, target=st, **kwargs):
+    """st.plotly_chart 加上計時（序列化 + 送出），target 可以是 column / container。"""
+    kwargs.setdefault("key", element_key(name))
+    with span(f"render.{name}"):
+        target.plotly_chart(fig, **kwargs)
+
+
+def compact_values(series, dtype=np.float32):
+    """
+    轉成 numpy typed array，plotly 會序列化成 base64 的二進位陣列，
+    而不是一個一個數字的 JSON list。價格用 float32 已足夠；
+    成交量會超過 2^24，float32 會失真，呼叫端要改傳 float64。
+    """
+    return np.asarray(series, dtype=dtype)
+
+
+def compact_dates(index):
+    """日期轉成 epoch 毫秒（float64 typed array），搭配 xaxis type='date' 使用。"""
+    return pd.DatetimeIndex(index).as_unit("ms").asi8.astype(np.float64)
@@ -1,63 +1,73 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from components.utils import get_ic
+from components.metrics import get_metrics
+from components.figcache import cached_figure, show_figure
+from components.instrument import timed
+from components.sections import section
+from components.statements import as_of
+
+PLOT_COLS = [
+    "Total Revenue", "Net Income", "Gross Margin (%)", "Net Margin (%)",
+    "Basic EPS", "Diluted EPS",
+    "Operating Income", "Operating Expense", "EBITDA"
+]
 def show_financial_trend(symbol):
     return 0
+@timed("page.show_income_trend")
 def show_income_trend(symbol, period_type="quarterly"):
     """
-    1) 從 yfinance 抓取損益表 (年度或季度)
-    2) 轉置後整理欄位
+    1) 讀取 components.metrics 預先算好的指標表 (年度或季度)
+    2) 篩選期別、補缺值
     3) 產生四張折線圖(2×2):
        (A) Total Revenue & Net Income
        (B) Gross Margin & Net Margin
-       (C) EPS 成長圖 (Basic EPS & Diluted EPS 成長率)
+       (C) Basic EPS & Diluted EPS
        (D) Operating Income & Operating Expenses & EBITDA
     """
 
-    # 1) 取得 DataFrame（columns=日期、index=科目）
-    df = get_ic(symbol, type=period_type)
-    
-    if df.empty:
+    # 1) 取得預先算好的指標表（index=報表日期，由舊到新；與 Sankey 共用）
+    section(
+        "Income trend", (symbol.upper(), period_type), [lambda: get_metrics(symbol, period_type)],
+        lambda df_t: _render_income_trend(symbol, period_type, df_t),
+        as_of=lambda: as_of(symbol, "income", period_type)
+    )
+
+
+def _render_income_trend(symbol, period_type, df_t):
+    if df_t.empty:
         st.warning(f"No {period_type} financial data for {symbol}.")
         return
 
-    # 2) 轉置 -> 每列代表一個日期 (e.g. 2023-12-31)
-    df_t = df.T  # df_t.index = 報表日期, df_t.columns = 科目名稱
+    df_t = trend_frame(df_t)
+
+    # 資料與參數沒變就沿用上次建好的四張圖
+    fig1, fig2, fig3, fig4 = cached_figure(
+        "income_trend", df_t, {"symbol": symbol.upper(), "period_type": period_type},
+        lambda: build_trend_figures(symbol, period_type, df_t)
+    )
+
+    # -- 2×2 方式排版 --
+    col1, col2 = st.columns(2)
+    show_figure(fig1, "income_trend", col1, use_container_width=True)
+    show_figure(fig2, "income_trend", col2, use_container_width=True)
+
+    col3, col4 = st.columns(2)
+    show_figure(fig3, "income_trend", col3, use_container_width=True)
+    show_figure(fig4, "income_trend", col4, use_container_width=True)
+
+
+def trend_frame(df_t):
+    """指標表 -> 畫趨勢圖用的表（頁面與 report.py 共用）。"""
+    # 2) 只保留營收與 EPS 都有的期別，缺值補0
     df_t = df_t.dropna(subset=["Total Revenue","Basic EPS"])
-    # -- 我們會用到的欄位，若無則補0 --
-    needed_cols = [
-        "Total Revenue", "Net Income", "Gross Profit", 
-        "Operating Income", "Operating Expense", "EBITDA",
-        "Basic EPS", "Diluted EPS"
-    ]
-    for col in needed_cols:
-        if col not in df_t.columns:
-            df_t[col] = 0
-    for col in needed_cols:
-        df_t[col] = pd.to_numeric(df_t[col], errors="coerce").fillna(0)
-    # 3) 計算毛利率 / 淨利率
-    #    如果 "Total Revenue"=0，避免除零
-    df_t["Gross Margin"] = (df_t["Gross Profit"] / df_t["Total Revenue"]).fillna(0)
-    df_t["Net Margin"] = (df_t["Net Income"] / df_t["Total Revenue"]).fillna(0)
-
-    # 4) 做成易繪圖格式: index -> 欄位 "ReportDate"
-    df_t = df_t.reset_index().rename(columns={"index": "ReportDate"})
-    # 排序一下日期
-    df_t = df_t.sort_values("ReportDate")
-    # -- EPS 成長率計算 (第3張圖) --
-    # 若為年度 -> 與前1期相比 (YoY)
-    # 若為季度 -> 與前4期相比 (approx. YoY)
-    # shift_n = 1 if period_type == "annual" else 4
-
-    # # pct_change(shift_n)*100 => %成長率
-    # df_t["BasicEPS Growth (%)"] = df_t["Basic EPS"].pct_change(shift_n)*100
-    # df_t["DilutedEPS Growth (%)"] = df_t["Diluted EPS"].pct_change(shift_n)*100
-
-    # # 缺值用0填
-    # df_t["BasicEPS Growth (%)"] = df_t["BasicEPS Growth (%)"].fillna(0)
-    # df_t["DilutedEPS Growth (%)"] = df_t["DilutedEPS Growth (%)"].fillna(0)
+    df_t = df_t[PLOT_COLS].fillna(0)
+
+    # 3) 做成易繪圖格式: index -> 欄位 "ReportDate"
+    return df_t.reset_index()
+
 
+def build_trend_figures(symbol, period_type, df_t):
+    """由整理好的指標表建立四張折線圖，回傳 (fig1, fig2, fig3, fig4)。"""
     #
     # ---- (A) Total Revenue & Net Income ----
     #
@@ -73,10 +83,6 @@ def show_income_trend(symbol, period_type="quarterly"):
     #
     # ---- (B) Gross Margin & Net Margin ----
     #
-    # 轉換成百分比顯示
-    df_t["Gross Margin (%)"] = df_t["Gross Margin"] * 100
-    df_t["Net Margin (%)"] = df_t["Net Margin"] * 100
-
     fig2 = px.line(
         df_t,
         x="ReportDate",
@@ -87,7 +93,7 @@ def show_income_trend(symbol, period_type="quarterly"):
     fig2.update_layout(xaxis_title="Report Date", yaxis_title="Margin (%)")
 
     #
-    # ---- (C) EPS 成長圖 (Basic EPS & Diluted EPS Growth %) ----
+    # ---- (C) Basic EPS & Diluted EPS ----
     #
     fig3 = px.line(
         df_t,
@@ -113,11 +119,4 @@ def show_income_trend(symbol, period_type="quarterly"):
     )
     fig4.update_layout(xaxis_title="Report Date", yaxis_title="Amount (USD)")
 
-    # -- 2×2 方式排版 --
-    col1, col2 = st.columns(2)
-    col1.plotly_chart(fig1, use_container_width=True)
-    col2.plotly_chart(fig2, use_container_width=True)
-
-    col3, col4 = st.columns(2)
-    col3.plotly_chart(fig3, use_container_width=True)
-    col4.plotly_chart(fig4, use_container_width=True)
\ No newline at end of file
+    return fig1, fig2, fig3, fig4
@@ -1,104 +1,166 @@
 import streamlit  as st
 import plotly.graph_objects as go
 from components.config import FINNCLIENT,STARTDATE
-from components.utils import get_ic,format_number
+from components.metrics import get_metrics
+from components.figcache import cached_figure, show_figure
+from components.instrument import timed
+from components.sections import section, element_key
+from components.statements import as_of
 import datetime
+import numpy as np
 import pandas as pd
 
+# 1) 各節點的標籤
+LABELS = [
+    "Total Revenue",                 # 0
+    "Cost Of Revenue",               # 1
+    "Gross Profit",                  # 2
+    "Operating Expense",             # 3
+    "EBITDA",                        # 4
+    "Depreciation & Amortization",   # 5
+    "Operating Income",              # 6
+    "Pretax Income",                  # 7
+    "Tax Provision",                  # 8
+    "Net Income"                      # 9
+]
+# 2) 流向 (來源 → 目標) 索引
+#   - 來源與目標都對應 LABELS 的索引位置
+SOURCES = [0, 0, 2, 2, 4, 5, 6, 7, 7]
+TARGETS = [1, 2, 3, 4, 5, 6, 7, 8, 9]
+LINK_COLORS = [
+    # 0->1 (Cost)
+    "rgba(255,0,0,0.4)",
+    # 0->2 (Leftover)
+    "rgba(0,255,0,0.4)",
+    # 2->3 (Cost)
+    "rgba(255,0,0,0.4)",
+    # 2->4 (Leftover)
+    "rgba(0,255,0,0.4)",
+    # 4->5 (Cost)
+    "rgba(255,0,0,0.4)",
+    # 5->6 (Leftover)
+    "rgba(0,255,0,0.4)",
+    # 6->7 (Cost)
+    "rgba(255,0,0,0.4)",
+    # 7->8 (Cost)
+    "rgba(255,0,0,0.4)",
+    # 7->9 (Leftover)
+    "rgba(0,255,0,0.4)"
+]
+FLOW_ITEMS = [
+    "Total Revenue", "Cost Of Revenue", "Gross Profit", "Operating Expense",
+    "EBITDA", "Operating Income", "Pretax Income", "Tax Provision", "Net Income"
+]
+CHECK_TOLERANCE = 0.02  # 勾稽誤差容許 2%
 
+
+def sankey_flows(df_q):
+    """
+    一次算出所有期別的流量，回傳 periods × links 的矩陣（欄位順序對應 SOURCES/TARGETS）。
+    取不到的科目當作 0。
+    """
+    item = dict(zip(FLOW_ITEMS, df_q.reindex(columns=FLOW_ITEMS).fillna(0).to_numpy().T))
+    return np.column_stack([
+        item["Cost Of Revenue"],                          # 0->1
+        item["Gross Profit"],                             # 0->2
+        item["Operating Expense"],                        # 2->3
+        item["EBITDA"],                                   # 2->4
+        item["EBITDA"] - item["Operating Income"],        # 4->5
+        item["Operating Income"],                         # 5->6
+        item["Pretax Income"],                            # 6->7
+        item["Tax Provision"],                            # 7->8
+        item["Net Income"],                               # 7->9
+    ])
+
+
+def flow_checks(df_q):
+    """
+    每一期的勾稽檢查（向量化）：
+    營收 = 成本 + 毛利、稅前 = 所得稅 + 淨利、EBITDA >= 營業利益，以及是否有負值流量。
+    回傳以期別為 index 的 True/False 表。
+    """
+    df = df_q.reindex(columns=FLOW_ITEMS).fillna(0)
+
+    def close(a, b):
+        return (a - b).abs() <= CHECK_TOLERANCE * np.maximum(a.abs(), b.abs())
+
+    return pd.DataFrame({
+        "Revenue = Cost + Gross Profit": close(df["Total Revenue"], df["Cost Of Revenue"] + df["Gross Profit"]),
+        "Pretax = Tax + Net Income": close(df["Pretax Income"], df["Tax Provision"] + df["Net Income"]),
+        "EBITDA >= Operating Income": df["EBITDA"] >= df["Operating Income"],
+        "No negative flows": (sankey_flows(df) >= 0).all(axis=1),
+    }, index=df_q.index)
+
+
+@timed("page.sankey_plot")
 def sankey_plot(symbol,period_choice = "quarterly"):
-    df = get_ic(symbol,type=period_choice)
-    df_q = df.T
-    
-    available_periods = df_q.index.tolist()  # e.g. [Timestamp('2022-09-30 00:00:00'), ...]
-    if period_choice == "quarterly":
-        selected_periods = st.selectbox("Select a Quarter End Date", available_periods)
-    elif period_choice == "annual":
-        selected_periods = st.selectbox("Select a Year End Date", available_periods)
- 
-
-    # 篩選出該季度數據
-    row = df_q.loc[selected_periods]
-
-  
-    # 1) 各節點的標籤
-    labels = [
-        "Total Revenue",                 # 0
-        "Cost Of Revenue",               # 1
-        "Gross Profit",                  # 2
-        "Operating Expense",             # 3
-        "EBITDA",                        # 4
-        "Depreciation & Amortization",   # 5
-        "Operating Income",              # 6
-        "Pretax Income",                  # 7
-        "Tax Provision",                  # 8
-        "Net Income"                      # 9
-    ]
-    # 2) 流向 (來源 → 目標) 索引
-    #   - 來源與目標都對應 labels 的索引位置
-    sources = [0, 0, 2, 2, 4, 5, 6, 7, 7]
-    targets = [1, 2, 3, 4, 5, 6, 7, 8, 9]
-
-    # 3) 各流向對應的數值
-    #    取不到值時預設給 0，避免 KeyError
-    values = [
-    row.get("Cost Of Revenue", 0),             # 0->1
-    row.get("Gross Profit", 0),                # 0->2
-    row.get("Operating Expense", 0),           # 2->3
-    row.get("EBITDA", 0),                      # 2->4
-    row.get("EBITDA", 0) - row.get("Operating Income", 0),
-    row.get("Operating Income", 0),            # 4->6 (這裡其實是 5->6，請見下文)
-    row.get("Pretax Income", 0),                # 6->7
-    row.get("Tax Provision", 0),                # 7->8
-    row.get("Net Income", 0)                    # 7->9
-    ]
+    # 與趨勢圖共用同一份預先算好的指標表（index 由舊到新）；財報過期時先畫舊的、背景重抓
+    section(
+        "Sankey", (symbol.upper(), period_choice), [lambda: get_metrics(symbol, period_choice)],
+        lambda df_q: _render_sankey(symbol, period_choice, df_q),
+        as_of=lambda: as_of(symbol, "income", period_choice)
+    )
 
 
-    link_colors = [
-        # 0->1 (Cost)
-        "rgba(255,0,0,0.4)",  
-        # 0->2 (Leftover)
-        "rgba(0,255,0,0.4)",  
-        # 2->3 (Cost)
-        "rgba(255,0,0,0.4)",
-        # 2->4 (Leftover)
-        "rgba(0,255,0,0.4)",
-        # 4->5 (Cost)
-        "rgba(255,0,0,0.4)",
-        # 5->6 (Leftover)
-        "rgba(0,255,0,0.4)",
-        # 6->7 (Cost)
-        "rgba(255,0,0,0.4)",
-        # 7->8 (Cost)
-        "rgba(255,0,0,0.4)",
-        # 7->9 (Leftover)
-        "rgba(0,255,0,0.4)"
-    ]
-    
-    formatted_values = [format_number(v) for v in values]
+def _render_sankey(symbol, period_choice, df_q):
+    if df_q.empty:
+        st.warning(f"No {period_choice} financial data for {symbol}.")
+        return
+
+    # 所有期別一次算好，切換期別由圖上的 slider 在瀏覽器端完成，不需要重跑
+    fig = cached_figure(
+        "sankey", df_q, {"symbol": symbol, "period_choice": period_choice},
+        lambda: build_sankey_figure(symbol, df_q.index, sankey_flows(df_q), period_choice)
+    )
+    show_figure(fig, "sankey")
+
+    checks = flow_checks(df_q)
+    failed = checks[~checks.all(axis=1)]
+    if not failed.empty:
+        st.caption(f"⚠️ {len(failed)} period(s) do not reconcile; the flows may be incomplete.")
+        with st.expander("Flow consistency checks"):
+            st.dataframe(checks, use_container_width=True, key=element_key("flow_checks"))
+
+
+def build_sankey_figure(symbol, periods, flows, period_choice="quarterly"):
+    """
+    建立含全部期別的 Sankey 圖：預設顯示最新一期，
+    slider 的每一步只在前端替換 link.value 與標題。
+    """
+    period_label = "Quarter End Date" if period_choice == "quarterly" else "Year End Date"
+    latest = len(periods) - 1
+
+    def title(i):
+        return f"Sankey for {symbol} / {periods[i].date()}"
+
     # -- 建立 Sankey 圖 --
     fig = go.Figure(go.Sankey(
-       
+
         node=dict(
             pad=30,
             thickness=15,
             line=dict(color="black", width=0.5),
-            label=labels,
-            
+            label=LABELS,
+
         ),
         link=dict(
-            source=sources,
-            target=targets,
-            value=values,
-            color=link_colors,
-            # hovertemplate=[
-            # f"{labels[s]} → {labels[t]}<br>Value: {formatted_values[i]}" 
-            # for i, (s, t) in enumerate(zip(sources, targets))
-        
+            source=SOURCES,
+            target=TARGETS,
+            value=flows[latest],
+            color=LINK_COLORS,
         )
     ))
 
-    title_str = f"Sankey for {symbol} / {selected_periods.date()}"
-    fig.update_layout(title_text=title_str, font_size=12, width=1000, height=800)
-
-    st.plotly_chart(fig)
+    steps = [
+        dict(
+            method="update",
+            label=str(period.date()),
+            args=[{"link.value": [flows[i]]}, {"title.text": title(i)}],
+        )
+        for i, period in enumerate(periods)
+    ]
+    fig.update_layout(
+        title_text=title(latest), font_size=12, width=1000, height=800,
+        sliders=[dict(active=latest, currentvalue=dict(prefix=f"{period_label}: "), steps=steps, pad=dict(t=40))]
+    )
+    return fig
@@ -0,0 +1,189 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from components.pricestore import load_prices
+from components.prefetch import prefetch
+from components.instrument import timed, annotate
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+MAX_STORED = 512
+
+# (symbol, 指標, 參數) -> {"values": 指標表（含 "_" 開頭的內部狀態欄）, "settled_close": 倒數第二根收盤}
+_store = OrderedDict()
+_store_lock = threading.Lock()
+
+
+# ---- 向量化 kernel：輸入都是 (時間, 股票數) 的 2D 陣列，沿 axis 0 計算 ----
+
+def _window(x, n):
+    """(T, S) -> (T, S, n) 的滑動視窗（不複製資料），前 n-1 列補 NaN。"""
+    pad = np.full((n - 1,) + x.shape[1:], np.nan)
+    return sliding_window_view(np.concatenate([pad, x]), n, axis=0)
+
+
+def _ewm(x, alpha, seed=None):
+    """
+    指數平均（adjust=False，第一個有效值當起點）。
+    seed 是前一根的值，增量更新時接續上次的狀態。
+    """
+    frame = pd.DataFrame(x)
+    if seed is not None:
+        frame = pd.concat([pd.DataFrame(np.atleast_2d(seed)), frame], ignore_index=True)
+    out = frame.ewm(alpha=alpha, adjust=False, ignore_na=True).mean().to_numpy()
+    return out[1:] if seed is not None else out
+
+
+def sma(bars, prev, n=20):
+    return {f"SMA {n}": _window(bars["Close"], n).mean(axis=-1)}
+
+
+def ema(bars, prev, n=20):
+    name = f"EMA {n}"
+    return {name: _ewm(bars["Close"], 2 / (n + 1), None if prev is None else prev[name])}
+
+
+def bollinger(bars, prev, n=20, k=2):
+    window = _window(bars["Close"], n)
+    mid = window.mean(axis=-1)
+    std = window.std(axis=-1)
+    return {"BB Mid": mid, "BB Upper": mid + k * std, "BB Lower": mid - k * std}
+
+
+def vwap(bars, prev, n=20):
+    """日 K 上的滾動 VWAP：n 根內 典型價 × 量 的總和 / 量的總和。"""
+    typical = (bars["High"] + bars["Low"] + bars["Close"]) / 3
+    volume = _window(bars["Volume"], n).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {f"VWAP {n}": _window(typical * bars["Volume"], n).sum(axis=-1) / volume}
+
+
+def rsi(bars, prev, n=14):
+    """Wilder RSI：漲跌幅各自做 alpha = 1/n 的平滑。"""
+    delta = np.diff(bars["Close"], axis=0, prepend=np.nan)
+    gain = _ewm(np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0)), 1 / n,
+                None if prev is None else prev["_gain"])
+    loss = _ewm(np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0)), 1 / n,
+                None if prev is None else prev["_loss"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        value = np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+    return {f"RSI {n}": np.where(np.isnan(gain), np.nan, value), "_gain": gain, "_loss": loss}
+
+
+def macd(bars, prev, fast=12, slow=26, signal=9):
+    fast_ema = _ewm(bars["Close"], 2 / (fast + 1), None if prev is None else prev["_fast"])
+    slow_ema = _ewm(bars["Close"], 2 / (slow + 1), None if prev is None else prev["_slow"])
+    line = fast_ema - slow_ema
+    signal_line = _ewm(line, 2 / (signal + 1), None if prev is None else prev["Signal"])
+    return {"MACD": line, "Signal": signal_line, "Hist": line - signal_line, "_fast": fast_ema, "_slow": slow_ema}
+
+
+# 名稱 -> kernel、預設參數、增量更新時要往前帶幾根原始 K 棒、畫在價格圖上還是獨立面板
+INDICATORS = {
+    "SMA": {"fn": sma, "params": {"n": 20}, "lookback": lambda p: p["n"] - 1, "overlay": True},
+    "EMA": {"fn": ema, "params": {"n": 20}, "lookback": lambda p: 0, "overlay": True},
+    "Bollinger": {"fn": bollinger, "params": {"n": 20, "k": 2}, "lookback": lambda p: p["n"] - 1, "overlay": True},
+    "VWAP": {"fn": vwap, "params": {"n": 20}, "lookback": lambda p: p["n"] - 1, "overlay": True},
+    "RSI": {"fn": rsi, "params": {"n": 14}, "lookback": lambda p: 1, "overlay": False},
+    "MACD": {"fn": macd, "params": {"fast": 12, "slow": 26, "signal": 9}, "lookback": lambda p: 0, "overlay": False},
+}
+
+
+def _run(name, bars, prev=None, **params):
+    """bars: {欄位: (T, S) 陣列}；回傳 {輸出欄: (T, S) 陣列}。"""
+    spec = INDICATORS[name]
+    return spec["fn"](bars, prev, **{**spec["params"], **params})
+
+
+def _compute(name, candles, prev=None, **params):
+    bars = {field: candles[field].to_numpy(dtype=float)[:, None] for field in FIELDS}
+    out = _run(name, bars, prev, **params)
+    return pd.DataFrame({col: values[:, 0] for col, values in out.items()}, index=candles.index)
+
+
+def _resume(entry, candles, lookback, name, params):
+    """
+    從上次存下的狀態接著算新的 K 棒。最後一根可能是盤中資料會被覆寫，
+    所以每次都從倒數第二根（已收盤）的狀態往後重算。接不上時回傳 None。
+    """
+    values = entry["values"]
+    if len(values) < 2:
+        return None
+    settled = values.index[-2]
+    pos = candles.index.searchsorted(settled)
+    if (pos != len(values) - 2 or pos >= len(candles) or candles.index[pos] != settled
+            or candles["Close"].iat[pos] != entry["settled_close"] or pos + 1 - lookback < 0):
+        return None  # 歷史資料被改過（例如重新下載、調整），整段重算
+    prev = {col: values[col].to_numpy()[pos:pos + 1] for col in values.columns}
+    tail = _compute(name, candles.iloc[pos + 1 - lookback:], prev, **params).iloc[lookback:]
+    return pd.concat([values.iloc[:pos + 1], tail])
+
+
+@timed("indicators.get")
+def get_indicator(symbol, name, candles, **params):
+    """
+    單一股票的指標表（index 與 candles 相同，只含顯示用的欄位）。
+    依 (symbol, 指標, 參數) 快取；有新 K 棒時只從上次的狀態往後算。
+    """
+    params = {**INDICATORS[name]["params"], **params}
+    key = (symbol.upper(), name, tuple(sorted(params.items())))
+    with _store_lock:
+        entry = _store.get(key)
+        if entry is not None:
+            _store.move_to_end(key)
+
+    values = None
+    if entry is not None:
+        cached = entry["values"]
+        if cached.index.equals(candles.index) and cached.index.size and entry["last_close"] == candles["Close"].iat[-1]:
+            annotate(cache="memory")
+            values = cached
+        else:
+            values = _resume(entry, candles, INDICATORS[name]["lookback"](params), name, params)
+            if values is not None:
+                annotate(cache="incremental")
+    if values is None:
+        annotate(cache="miss")
+        values = _compute(name, candles, **params)
+
+    if len(values) >= 2:
+        with _store_lock:
+            _store[key] = {
+                "values": values,
+                "settled_close": candles["Close"].iat[-2],
+                "last_close": candles["Close"].iat[-1],
+            }
+            while len(_store) > MAX_STORED:
+                _store.popitem(last=False)
+    return values[[col for col in values.columns if not col.startswith("_")]]
+
+
+@timed("indicators.batch")
+def batch(symbols, name, start, end=None, **params):
+    """
+    一次算很多檔（篩選用）：各檔日 K 對齊成 (日期, 股票) 矩陣，kernel 只跑一次。
+    回傳 {輸出欄: DataFrame(index=日期, columns=symbol)}。
+    """
+    end = end or pd.Timestamp.today().normalize()
+    symbols = [s.upper() for s in symbols]
+    futures = prefetch({symbol: (lambda s=symbol: load_prices(s, start, end)) for symbol in symbols})
+    prices = {symbol: future.result() for symbol, future in futures.items()}
+    prices = {symbol: df for symbol, df in prices.items() if not df.empty}
+    if not prices:
+        return {}
+    panel = pd.concat(prices, axis=1, names=["Symbol", "Field"])
+    bars = {field: panel.xs(field, axis=1, level="Field").reindex(columns=list(prices)).to_numpy(dtype=float)
+            for field in FIELDS}
+    out = _run(name, bars, **params)
+    return {
+        col: pd.DataFrame(values, index=panel.index, columns=list(prices))
+        for col, values in out.items() if not col.startswith("_")
+    }
+
+
+def latest(frames):
+    """batch() 的結果取每檔最後一個有效值，回傳 symbol x 輸出欄 的表。"""
+    return pd.DataFrame({col: frame.ffill().iloc[-1] for col, frame in frames.items()})
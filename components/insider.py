@@ -1,27 +1,104 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
+import numpy as np
 from components.utils import get_institutional_holders, get_major_holders
-from components.config import FINNCLIENT, STARTDATE
+from components.insider_store import ingest, query_transactions, query_daily, as_of as transactions_as_of
+from components.config import STARTDATE
+from components.prefetch import prefetch
+from components.figcache import cached_figure, show_figure
+from components.instrument import timed
+from components.sections import section, widget_key, element_key
+from components.cache import as_of
+from components import archive
 import datetime
-def show_holdings_pies(symbol):
+
+HOLDER_COLUMNS = ["Holder", "pctHeld", "Value", "pctChange"]
+
+
+def prefetch_insider(symbol):
+    """Insider & Whale 頁面的三個請求同時發出。"""
+    return prefetch({
+        "major_holders": lambda: get_major_holders(symbol),
+        "institutional_holders": lambda: get_institutional_holders(symbol),
+        "transactions": lambda: ingest(symbol),
+    })
+
+
+@timed("page.show_holdings_pies")
+def show_holdings_pies(symbol, futures=None):
     """
     Generates two pie charts:
     1. Overall shareholding distribution: Insiders vs. Institutions vs. Others
     2. Top 10 institutions' shareholding distribution within total institutional holdings
     """
-    major_hold = get_major_holders(symbol)
-    institution_hold = get_institutional_holders(symbol)
+    if futures is None:
+        futures = prefetch({
+            "major_holders": lambda: get_major_holders(symbol),
+            "institutional_holders": lambda: get_institutional_holders(symbol),
+        })
+    section(
+        "Holdings", symbol.upper(), [futures["major_holders"], futures["institutional_holders"]],
+        lambda major_hold, institution_hold: _render_holdings_pies(symbol, major_hold, institution_hold),
+        as_of=lambda: as_of(symbol, "institutional_holders")
+    )
+
+
+def _render_holdings_pies(symbol, major_hold, institution_hold):
+    # 有歷史快照時可以拉回過去某一天的持股分布
+    days = sorted(set(archive.dates(symbol, "major_holders")) | set(archive.dates(symbol, "institutional_holders")))
+    if len(days) > 1:
+        day = st.select_slider("Holdings as of", options=days, value=days[-1], key=widget_key(f"holdings_asof_{symbol}"))
+        if day != days[-1]:
+            major_hold = archive.at(symbol, "major_holders", day)
+            institution_hold = archive.at(symbol, "institutional_holders", day)
+    if institution_hold is not None and "Date Reported" in institution_hold and not institution_hold.empty:
+        st.write(f'latest update:{institution_hold["Date Reported"].max()}')
+    fig1, fig2 = cached_figure(
+        "holdings_pies", (major_hold, institution_hold), {},
+        lambda: build_holdings_pies(major_hold, institution_hold)
+    )
+    colA, colB = st.columns(2)
+    with colA:
+        st.subheader("1) Insiders vs Institutions vs Others")
+        show_figure(fig1, "holdings_pies", use_container_width=True)
+    with colB:
+        st.subheader("2) TOP 10 Institutions' Shareholding Distribution")
+        show_figure(fig2, "holdings_pies", use_container_width=True)
+
+    history = archive.history(symbol, "major_holders")
+    if len(history) > 1:
+        with st.expander("📈 Ownership history"):
+            fig = cached_figure("ownership_history", history, {}, lambda: build_ownership_history_figure(history))
+            show_figure(fig, "ownership_history", use_container_width=True)
+
+
+def build_ownership_history_figure(history):
+    """歷史快照裡內部人 / 機構持股比例的走勢。"""
+    cols = [col for col in ("insidersPercentHeld", "institutionsPercentHeld") if col in history]
+    fig = px.line(history, x="AsOf", y=cols, markers=True, title="Ownership over time")
+    fig.update_layout(xaxis_title="", yaxis_title="Percent held", yaxis_tickformat=".0%")
+    return fig
+
+
+def _held(major_hold, row):
+    """major_holders 裡的持股比例；yfinance 有時少了某一列或整張表是空的，缺的當 0。"""
+    try:
+        value = float(major_hold.at[row, "Value"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return 0.0
+    return 0.0 if np.isnan(value) else value
 
-    insiders_pct = major_hold.at["insidersPercentHeld", "Value"]
-    institutions_pct = major_hold.at["institutionsPercentHeld","Value"]
+
+def build_holdings_pies(major_hold, institution_hold):
+    """建立持股分布的兩張圓餅圖，回傳 (fig1, fig2)。"""
+    insiders_pct = _held(major_hold, "insidersPercentHeld")
+    institutions_pct = _held(major_hold, "institutionsPercentHeld")
     #
     others_pct = 1 - insiders_pct - institutions_pct
     if others_pct < 0:  # 數據有時可能略超過1
         others_pct = 0
 
-    
-    st.write(f'latest update:{institution_hold["Date Reported"].unique()[0]}')
     color_map = {
     "Insiders": "red",
     "Institutions": "green",
@@ -52,11 +129,13 @@ def show_holdings_pies(symbol):
 
     # institution_hold 應該是一個 DataFrame
     #   Holder, pctHeld, Value, pctChange, ...
-    df_insti = institution_hold.copy()
+    df_insti = institution_hold.copy() if institution_hold is not None else pd.DataFrame()
+    df_insti = df_insti.reindex(columns=list(dict.fromkeys([*df_insti.columns, *HOLDER_COLUMNS])))
 
     # 機構持股佔全部公司股份 = institutions_pct
     # 若 want：前10 機構相對機構總量 => df_insti["pctOfInstitution"] = (pctHeld / institutions_pct) * 100
-    df_insti["pctOfInstitution"] = (df_insti["pctHeld"] / institutions_pct).fillna(0) * 100
+    with np.errstate(invalid="ignore", divide="ignore"):
+        df_insti["pctOfInstitution"] = (df_insti["pctHeld"] / institutions_pct).fillna(0) * 100
 
     # 我們用 px.pie 顯示這個 "pctOfInstitution"
     fig2 = px.pie(
@@ -83,34 +162,33 @@ def show_holdings_pies(symbol):
             "Percentage Change: %{customdata[1]:.2%}<extra></extra>"
         )
     )
-    colA, colB = st.columns(2)
-    with colA:
-        st.subheader("1) Insiders vs Institutions vs Others")
-        st.plotly_chart(fig1, use_container_width=True)
-    with colB:
-        st.subheader("2) TOP 10 Institutions' Shareholding Distribution")
-        st.plotly_chart(fig2, use_container_width=True)
-   
+    return fig1, fig2
 
 
-def show_insider_transactions(symbol):
-    
-    order = ["transactionDate","change","Transaction value","transactionPrice","share","isDerivative","name","transactionCode"]
-    transactions = FINNCLIENT.stock_insider_transactions(symbol,STARTDATE,datetime.datetime.today())     
-    transactions = pd.DataFrame(transactions["data"])
-    transactions.drop(columns=["id","currency","filingDate","source","symbol"], inplace=True)
-    transactions["Transaction value"] = transactions["share"] * transactions["transactionPrice"]
-    transactions = transactions[order]
-    transactions.set_index("transactionDate", inplace=True)
-    
-    ## Plot streamlit
+@timed("page.show_insider_transactions")
+def show_insider_transactions(symbol, transactions_future=None):
+    # 先把新申報增量寫進本地資料庫，之後表格與圖都直接查區間；
+    # 抓申報逾時或失敗時，本地已有交易就照樣顯示
     st.subheader("3) Insider Transactions")
+    section(
+        "Insider transactions", symbol.upper(), [transactions_future or (lambda: ingest(symbol))],
+        lambda inserted: _render_insider_transactions(symbol),
+        as_of=lambda: transactions_as_of(symbol),
+        fallback=lambda: None if query_transactions(symbol).empty else [0]
+    )
+
+
+def _render_insider_transactions(symbol):
+    date_range = st.date_input(
+        "Transaction date range",
+        value=(datetime.datetime.strptime(STARTDATE, "%Y-%m-%d").date(), datetime.date.today()),
+        key=widget_key(f"insider_range_{symbol}")
+    )
+    start, end = date_range if len(date_range) == 2 else (date_range[0], None)
+    transactions = query_transactions(symbol, start, end)
     if transactions.empty:
         st.write("No insider transaction data available for the selected period.")
         
-    if "transactionDate" in transactions.columns:
-        transactions["transactionDate"] = pd.to_datetime(transactions["transactionDate"])
-        transactions.sort_values("transactionDate", ascending=True, inplace=True)
     with st.expander("Click to view Insider Transaction Codes & Explanations"):
         st.write("""
             ### Insider Transaction Codes & Explanations
@@ -130,24 +208,16 @@ def show_insider_transactions(symbol):
             - **K**: **Equity Swap or Similar** – The insider participated in an equity swap transaction.
             """)
 
-    st.dataframe(transactions)
+    st.dataframe(transactions, key=element_key("insider_transactions"))
     
-   
-    if "change" in transactions.columns:
-    # Reset index to make 'transactionDate' a regular column
-        transactions = transactions.reset_index()
-        
-        # Ensure 'transactionDate' is a datetime type
-        transactions["transactionDate"] = pd.to_datetime(transactions["transactionDate"])
-        
-        # Group by date and sum the 'change' values
-        insider_bar_data = transactions.groupby(transactions["transactionDate"].dt.date)["change"].sum().reset_index()
-
+    # 每日淨變動已在寫入時算好，直接查
+    insider_bar_data = query_daily(symbol, start, end)
+    if not insider_bar_data.empty:
         # Add a color column: green for positive, red for negative
-        insider_bar_data["color"] = insider_bar_data["change"].apply(lambda x: "green" if x > 0 else "red")
+        insider_bar_data["color"] = np.where(insider_bar_data["change"] > 0, "green", "red")
 
         # Create a bar chart with custom colors
-        fig = px.bar(
+        fig = cached_figure("insider_bar", insider_bar_data, {}, lambda: px.bar(
             insider_bar_data,
             x="transactionDate",
             y="change",
@@ -155,7 +225,6 @@ def show_insider_transactions(symbol):
             labels={"transactionDate": "Date", "change": "Change"},
             color="color",  # Use color column
             color_discrete_map={"green": "green", "red": "red"}  # Define color mapping
-        )
+        ))
 
-        
-        st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+        show_figure(fig, "insider_bar", use_container_width=True)
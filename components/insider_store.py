@@ -0,0 +1,157 @@
+import datetime
+import threading
+import time
+
+import pandas as pd
+
+from components.config import CACHE_TTL, STARTDATE
+from components.utils import _fetch_insider_transactions
+from components.instrument import timed
+from components.cache import open_db, single_flight
+
+# 表格顯示的欄位順序（與原本 Insider & Whale 頁面相同）
+TABLE_COLUMNS = ["transactionDate", "change", "Transaction value", "transactionPrice", "share", "isDerivative", "name", "transactionCode"]
+INGEST_INTERVAL = CACHE_TTL["insider_transactions"]
+
+_write_lock = threading.Lock()
+_conns = threading.local()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS insider_transactions (
+    symbol TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT,
+    share REAL,
+    change REAL,
+    filingDate TEXT,
+    transactionDate TEXT NOT NULL,
+    transactionCode TEXT,
+    transactionPrice REAL,
+    isDerivative INTEGER,
+    value REAL,                      -- 物化欄位：share * transactionPrice
+    PRIMARY KEY (symbol, id)
+);
+CREATE INDEX IF NOT EXISTS idx_insider_symbol_date ON insider_transactions (symbol, transactionDate);
+CREATE INDEX IF NOT EXISTS idx_insider_symbol_filing ON insider_transactions (symbol, filingDate);
+-- 物化的每日淨變動，bar chart 直接查
+CREATE TABLE IF NOT EXISTS insider_daily (
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    change REAL NOT NULL,
+    PRIMARY KEY (symbol, date)
+);
+CREATE TABLE IF NOT EXISTS insider_ingest_log (
+    symbol TEXT PRIMARY KEY,
+    checked_at REAL NOT NULL
+);
+"""
+
+
+def _connect():
+    conn = getattr(_conns, "conn", None)
+    if conn is None:
+        conn = open_db("insider.sqlite")
+        conn.executescript(SCHEMA)
+        _conns.conn = conn
+    return conn
+
+
+def _row_id(tx):
+    # Finnhub 每筆都有 id；保險起見沒有時用內容組出唯一鍵
+    return tx.get("id") or f"{tx.get('name')}|{tx.get('transactionDate')}|{tx.get('change')}|{tx.get('share')}"
+
+
+@timed("insider_store.ingest")
+def ingest(symbol, force=False, client=None):
+    """
+    只抓最後一筆已存申報日之後的交易，寫入本地 SQLite。
+    上次檢查未超過 INGEST_INTERVAL 時不打 API（force=True 除外）。
+    回傳新增的筆數。
+    """
+    symbol = symbol.upper()
+    # 多個程序同時打開同一檔時只有一個去打 Finnhub；其他的等它寫完，看到新的 checked_at 就直接回傳
+    with single_flight(("insider_transactions", symbol)):
+        return _ingest(symbol, force, client)
+
+
+def _ingest(symbol, force, client):
+    conn = _connect()
+    checked = conn.execute("SELECT checked_at FROM insider_ingest_log WHERE symbol=?", (symbol,)).fetchone()
+    if not force and checked is not None and time.time() - checked[0] < INGEST_INTERVAL:
+        return 0
+
+    last_filing = conn.execute(
+        "SELECT MAX(filingDate) FROM insider_transactions WHERE symbol=?", (symbol,)
+    ).fetchone()[0]
+    # 從最後申報日當天開始抓（同一天可能還有新的申報），重複的靠主鍵略過
+    start = last_filing or STARTDATE
+    kwargs = {} if client is None else {"client": client}
+    response = _fetch_insider_transactions(symbol, start=start, **kwargs)
+    rows = [
+        (
+            symbol, str(_row_id(tx)), tx.get("name"), tx.get("share"), tx.get("change"),
+            tx.get("filingDate"), tx.get("transactionDate"), tx.get("transactionCode"),
+            tx.get("transactionPrice"), int(bool(tx.get("isDerivative"))),
+            (tx.get("share") or 0) * (tx.get("transactionPrice") or 0),
+        )
+        for tx in (response or {}).get("data", [])
+        if tx.get("transactionDate")
+    ]
+
+    with _write_lock:
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO insider_transactions "
+            "(symbol, id, name, share, change, filingDate, transactionDate, transactionCode, transactionPrice, isDerivative, value) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        inserted = conn.total_changes - before
+        if inserted:
+            # 只重算有新交易的日期
+            dates = sorted({row[6] for row in rows})
+            conn.executemany(
+                "INSERT OR REPLACE INTO insider_daily (symbol, date, change) "
+                "SELECT symbol, transactionDate, SUM(change) FROM insider_transactions "
+                "WHERE symbol=? AND transactionDate=? GROUP BY symbol, transactionDate",
+                [(symbol, d) for d in dates],
+            )
+        conn.execute("INSERT OR REPLACE INTO insider_ingest_log (symbol, checked_at) VALUES (?, ?)", (symbol, time.time()))
+        conn.commit()
+    return inserted
+
+
+def as_of(symbol):
+    """上次向 Finnhub 檢查新申報的時間（epoch 秒），沒檢查過時回傳 None。"""
+    row = _connect().execute("SELECT checked_at FROM insider_ingest_log WHERE symbol=?", (symbol.upper(),)).fetchone()
+    return row[0] if row else None
+
+
+def _date_bounds(start, end):
+    start = pd.Timestamp(start or STARTDATE).strftime("%Y-%m-%d")
+    end = pd.Timestamp(end or datetime.date.today()).strftime("%Y-%m-%d")
+    return start, end
+
+
+@timed("insider_store.query")
+def query_transactions(symbol, start=None, end=None):
+    """依日期區間直接查本地交易明細（走 symbol+transactionDate 索引）。"""
+    start, end = _date_bounds(start, end)
+    df = pd.read_sql_query(
+        'SELECT transactionDate, change, value AS "Transaction value", transactionPrice, share, '
+        "isDerivative, name, transactionCode FROM insider_transactions "
+        "WHERE symbol=? AND transactionDate BETWEEN ? AND ? ORDER BY transactionDate",
+        _connect(), params=(symbol.upper(), start, end), parse_dates=["transactionDate"],
+    )
+    df["isDerivative"] = df["isDerivative"].astype(bool)
+    return df[TABLE_COLUMNS].set_index("transactionDate")
+
+
+def query_daily(symbol, start=None, end=None):
+    """依日期區間查物化好的每日淨變動。"""
+    start, end = _date_bounds(start, end)
+    return pd.read_sql_query(
+        "SELECT date AS transactionDate, change FROM insider_daily "
+        "WHERE symbol=? AND date BETWEEN ? AND ? ORDER BY date",
+        _connect(), params=(symbol.upper(), start, end), parse_dates=["transactionDate"],
+    )
@@ -0,0 +1,200 @@
+import atexit
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+from components.config import (
+    CACHE_DIR, TRACE_BUFFER, TRACE_ENABLED, TRACE_FLUSH_ROWS, TRACE_FLUSH_SECONDS, TRACE_MAX_BYTES,
+)
+
+TRACE_PATH = os.path.join(CACHE_DIR, "trace.jsonl")
+
+# 最近的量測紀錄（本程序），Diagnostics 頁面讀這裡
+_records = deque(maxlen=TRACE_BUFFER)
+_write_lock = threading.Lock()
+# 還沒寫進 trace.jsonl 的紀錄與上次寫檔時間；累積一批才開檔一次
+_pending = []
+_last_flush = time.monotonic()
+# 目前所在的 span，讓底層（快取、HTTP session）可以把資訊補進去
+_current = contextvars.ContextVar("instrument_span", default=None)
+# 有開 tracemalloc 時，尚未結束的 span（跨 thread）
+_open_spans = []
+_peak_lock = threading.Lock()
+
+
+def _row_count(value):
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        value = value.get("data")
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def flush():
+    """把累積的紀錄寫進 trace.jsonl；檔案超過 TRACE_MAX_BYTES 時先換成 trace.jsonl.1（只留一份舊檔）。"""
+    global _last_flush
+    with _write_lock:
+        _last_flush = time.monotonic()
+        if not _pending:
+            return
+        lines = "".join(json.dumps(record, default=str) + "\n" for record in _pending)
+        _pending.clear()
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        try:
+            if os.path.getsize(TRACE_PATH) + len(lines) > TRACE_MAX_BYTES:
+                os.replace(TRACE_PATH, f"{TRACE_PATH}.1")
+        except FileNotFoundError:
+            pass
+        with open(TRACE_PATH, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def _write(record):
+    _records.append(record)
+    if not TRACE_ENABLED:
+        return
+    with _write_lock:
+        _pending.append(record)
+        due = len(_pending) >= TRACE_FLUSH_ROWS or time.monotonic() - _last_flush >= TRACE_FLUSH_SECONDS
+    if due:
+        flush()
+
+
+if TRACE_ENABLED:
+    atexit.register(flush)
+
+
+@contextmanager
+def span(stage, **fields):
+    """
+    量測一段程式的 wall time。區塊內可以對 yield 出來的 dict 補欄位（rows、cache…），
+    底層呼叫 annotate() / add_bytes() 也會寫到這個 span。
+    """
+    record = {"stage": stage, "cache": None, "rows": None, "bytes": 0, **fields}
+    # 有開 tracemalloc（benchmark）時另外記這段的記憶體峰值；平常不開，沒有額外成本
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        with _peak_lock:
+            base, peak_so_far = tracemalloc.get_traced_memory()
+            _carry_peak(peak_so_far)
+            tracemalloc.reset_peak()
+            _open_spans.append(record)
+    token = _current.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as exc:
+        record["error"] = type(exc).__name__
+        raise
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        record["ts"] = time.time()
+        _current.reset(token)
+        if tracing:
+            with _peak_lock:
+                _open_spans[:] = [r for r in _open_spans if r is not record]
+                peak = max(tracemalloc.get_traced_memory()[1], record.pop("_peak", 0))
+            record["peak_bytes"] = peak - base
+        _write(record)
+
+
+def _carry_peak(peak):
+    # reset_peak() 是全域的（所有 thread 共用）：重設前把目前峰值交給還沒結束的 span，結束時再取最大值
+    for record in _open_spans:
+        record["_peak"] = max(record.get("_peak", 0), peak)
+
+
+def timed(stage):
+    """decorator 版本的 span，並自動記錄回傳值的筆數。"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage) as record:
+                result = fn(*args, **kwargs)
+                if record["rows"] is None:
+                    record["rows"] = _row_count(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def annotate(**fields):
+    """在目前的 span 上補充欄位（例如 cache="memory"）；不在 span 內時忽略。"""
+    record = _current.get()
+    if record is not None:
+        record.update(fields)
+
+
+def add_bytes(n):
+    """HTTP 層回報收到的位元組數，累加到目前的 span。"""
+    record = _current.get()
+    if record is not None:
+        record["bytes"] += n
+
+
+def records():
+    return list(_records)
+
+
+def clear():
+    """清空記憶體裡的量測紀錄（benchmark 每個階段開始前呼叫）。"""
+    _records.clear()
+
+
+def _quantile(sorted_values, q):
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summary():
+    """依 stage 彙總：次數、總計 / p50 / p95 / max 秒數、快取命中率、平均筆數、總位元組。"""
+    by_stage = {}
+    for record in records():
+        by_stage.setdefault(record["stage"], []).append(record)
+    rows = []
+    for stage, items in sorted(by_stage.items()):
+        seconds = sorted(r["seconds"] for r in items)
+        cached = [r["cache"] for r in items if r["cache"] is not None]
+        counted = [r["rows"] for r in items if r["rows"] is not None]
+        rows.append({
+            "stage": stage,
+            "count": len(items),
+            "total_ms": sum(seconds) * 1000,
+            "p50_ms": _quantile(seconds, 0.5) * 1000,
+            "p95_ms": _quantile(seconds, 0.95) * 1000,
+            "max_ms": seconds[-1] * 1000,
+            "cache_hit_rate": sum(c != "miss" for c in cached) / len(cached) if cached else None,
+            "avg_rows": sum(counted) / len(counted) if counted else None,
+            "bytes": sum(r["bytes"] for r in items),
+            "errors": sum("error" in r for r in items),
+        })
+    return rows
+
+
+def prometheus_text():
+    """
+    Prometheus exposition 格式的指標：stage 耗時是 summary（quantile + _sum + _count），
+    另外兩個是 counter。每個指標的樣本都緊接在自己的 # TYPE 後面。
+    """
+    rows = summary()
+    labels = [row["stage"].replace("\\", "\\\\").replace('"', '\\"') for row in rows]
+    lines = ["# TYPE dashboard_stage_seconds summary"]
+    for label, row in zip(labels, rows):
+        lines.append(f'dashboard_stage_seconds{{stage="{label}",quantile="0.5"}} {row["p50_ms"] / 1000:.6f}')
+        lines.append(f'dashboard_stage_seconds{{stage="{label}",quantile="0.95"}} {row["p95_ms"] / 1000:.6f}')
+        lines.append(f'dashboard_stage_seconds_sum{{stage="{label}"}} {row["total_ms"] / 1000:.6f}')
+        lines.append(f'dashboard_stage_seconds_count{{stage="{label}"}} {row["count"]}')
+    lines.append("# TYPE dashboard_stage_bytes_total counter")
+    lines += [f'dashboard_stage_bytes_total{{stage="{label}"}} {row["bytes"]}' for label, row in zip(labels, rows)]
+    lines.append("# TYPE dashboard_stage_errors_total counter")
+    lines += [f'dashboard_stage_errors_total{{stage="{label}"}} {row["errors"]}' for label, row in zip(labels, rows)]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,43 @@
+import numpy as np
+
+from components.config import MAX_CANDLES
+
+# 解析度由細到粗：(pandas resample 規則, 顯示名稱, 約略每根包含的交易日)
+RESOLUTIONS = [
+    (None, "Daily", 1),
+    ("W-FRI", "Weekly", 5),
+    ("ME", "Monthly", 21),
+    ("QE", "Quarterly", 63),
+]
+OHLCV_AGG = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+
+def resample_ohlcv(df, rule):
+    """把日 K 合併成週 / 月 K，開高低收量各自用正確的聚合方式。"""
+    if rule is None:
+        return df
+    return df.resample(rule).agg(OHLCV_AGG).dropna(subset=["Open"])
+
+
+def choose_resolution(n_bars, max_bars=MAX_CANDLES):
+    """選出能讓 K 棒數量不超過 max_bars 的最細解析度。"""
+    for rule, label, days in RESOLUTIONS:
+        if n_bars / days <= max_bars:
+            return rule, label
+    return RESOLUTIONS[-1][0], RESOLUTIONS[-1][1]
+
+
+def level_of_detail(df, start=None, end=None, max_bars=MAX_CANDLES):
+    """
+    只切出可見區間，再依區間長度決定解析度：
+    看長期時自動變成週 / 月 K，縮小區間就回到完整的日 K。
+    回傳 (要畫的 DataFrame, 解析度名稱)。
+    """
+    window = df.loc[start:end]
+    rule, label = choose_resolution(len(window), max_bars)
+    return resample_ohlcv(window, rule), label
+
+
+def up_mask(df):
+    """收盤 >= 開盤 的 K 棒為 1，其餘為 0（一次向量化比較，不逐根迴圈）。"""
+    return (df["Close"].to_numpy() >= df["Open"].to_numpy()).astype(np.uint8)
@@ -0,0 +1,152 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from components.utils import get_ic
+from components.instrument import timed
+
+# 損益表中會用到的科目（趨勢圖 + Sankey 共用）
+STATEMENT_ITEMS = [
+    "Total Revenue", "Cost Of Revenue", "Gross Profit",
+    "Operating Expense", "Operating Income", "EBITDA",
+    "Pretax Income", "Tax Provision", "Net Income",
+    "Basic EPS", "Diluted EPS"
+]
+# 流量科目才有 TTM（EPS 也可加總成 TTM EPS）
+TTM_ITEMS = ["Total Revenue", "Gross Profit", "Operating Income", "EBITDA", "Net Income", "Diluted EPS"]
+GROWTH_ITEMS = {
+    "Total Revenue": "Revenue",
+    "Net Income": "Net Income",
+    "Basic EPS": "Basic EPS",
+    "Diluted EPS": "Diluted EPS",
+}
+MAX_STORED = 512
+# 對齊前期時，報表日期與目標日期容許的誤差（會計年度以週計的公司季底日期會差幾天）
+PERIOD_TOLERANCE = pd.Timedelta(days=20)
+
+# (symbol, period_type, statement hash) -> 已算好的指標表
+_store = OrderedDict()
+_store_lock = threading.Lock()
+
+
+def to_panel(statements):
+    """
+    {symbol: get_ic 的報表矩陣(期別 x 科目, float)} -> MultiIndex (Symbol, ReportDate) x 科目 的數值表。
+    矩陣已經是數值型態，只需挑欄位再堆疊。
+    """
+    frames = {symbol.upper(): df.reindex(columns=STATEMENT_ITEMS) for symbol, df in statements.items()}
+    if not frames:
+        empty_index = pd.MultiIndex.from_arrays([[], pd.DatetimeIndex([])], names=["Symbol", "ReportDate"])
+        return pd.DataFrame(columns=STATEMENT_ITEMS, index=empty_index, dtype=float)
+    panel = pd.concat(frames, names=["Symbol", "ReportDate"])
+    return panel.sort_index()
+
+
+def _safe_div(a, b):
+    return a / b.where(b != 0)
+
+
+def _growth(current, previous):
+    return (current - previous) / previous.abs().where(previous != 0) * 100
+
+
+def _previous(df, cols, offset):
+    """
+    每一列往前 offset（例如一年）的那一期數值，依報表日期對齊而不是依位置 shift：
+    中間缺了一季或前面有期別被濾掉時，也不會拿錯的期別來比。找不到對應期別時為 NaN。
+    """
+    if df.empty:
+        return df[cols]
+    keys = df.index.to_frame(index=False)
+    keys["Target"] = keys["ReportDate"] - offset
+    values = df[cols].reset_index().rename(columns={"ReportDate": "Target"})
+    values["Target"] = values["Target"].astype(keys["Target"].dtype)
+    matched = pd.merge_asof(
+        keys.sort_values("Target"), values.sort_values("Target"), on="Target", by="Symbol",
+        direction="nearest", tolerance=PERIOD_TOLERANCE,
+    )
+    return matched.set_index(["Symbol", "ReportDate"])[cols].reindex(df.index)
+
+
+@timed("metrics.compute")
+def compute_metrics(panel, period_type="quarterly"):
+    """
+    對整張 panel 向量化計算所有衍生指標，單檔或多檔都適用：
+    - 毛利率 / 營益率 / 淨利率
+    - YoY 成長率（比一年前同一期），季度另算 QoQ（比三個月前那一期），都依報表日期對齊
+    - TTM（近四季加總，以 cumsum 差分計算，不逐檔 rolling；四季必須連續）
+    - 自第一期起算的營收 CAGR
+    """
+    df = panel.reindex(columns=STATEMENT_ITEMS).sort_index()
+    out = df.copy()
+    dates = pd.Series(df.index.get_level_values("ReportDate"), index=df.index)
+
+    out["Gross Margin (%)"] = _safe_div(df["Gross Profit"], df["Total Revenue"]) * 100
+    out["Operating Margin (%)"] = _safe_div(df["Operating Income"], df["Total Revenue"]) * 100
+    out["Net Margin (%)"] = _safe_div(df["Net Income"], df["Total Revenue"]) * 100
+
+    growth_cols = list(GROWTH_ITEMS)
+    prev = _previous(df, growth_cols, pd.DateOffset(years=1))
+    for col, name in GROWTH_ITEMS.items():
+        out[f"{name} YoY (%)"] = _growth(df[col], prev[col])
+    if period_type == "quarterly":
+        prev_q = _previous(df, growth_cols, pd.DateOffset(months=3))
+        for col, name in GROWTH_ITEMS.items():
+            out[f"{name} QoQ (%)"] = _growth(df[col], prev_q[col])
+
+        # TTM：cumsum(t) - cumsum(t-4)；視窗內任何一期缺值就當作 NaN
+        values = df[TTM_ITEMS]
+        csum = values.fillna(0).groupby(level="Symbol").cumsum()
+        ccount = values.notna().astype(int).groupby(level="Symbol").cumsum()
+        prev_sum = csum.groupby(level="Symbol").shift(4).fillna(0)
+        prev_count = ccount.groupby(level="Symbol").shift(4).fillna(0)
+        # 四期之中缺了一季時（第一期離現在超過 9 個月），視窗就不是連續四季
+        span = dates - dates.groupby(level="Symbol").shift(3)
+        contiguous = span <= pd.Timedelta(days=9 * 31) + PERIOD_TOLERANCE
+        ttm = (csum - prev_sum).where((ccount - prev_count) == 4).where(contiguous, axis=0)
+    else:
+        ttm = df[TTM_ITEMS]
+    for col in TTM_ITEMS:
+        out[f"TTM {col}"] = ttm[col]
+
+    # CAGR：以第一個有營收的期別為基期
+    revenue = df["Total Revenue"]
+    valid_dates = dates.where(revenue.notna())
+    base_revenue = revenue.groupby(level="Symbol").transform("first")
+    base_date = valid_dates.groupby(level="Symbol").transform("min")
+    years = (dates - base_date).dt.days / 365.25
+    ratio = _safe_div(revenue, base_revenue).where(base_revenue > 0)
+    cagr = (ratio.where(ratio > 0) ** (1 / years.where(years > 0)) - 1) * 100
+    out["Revenue CAGR (%)"] = cagr.where(years >= 0.98)  # 不滿一年不計算（容許季底日期差幾天）
+    return out
+
+
+def statement_hash(df):
+    """損益表內容的雜湊，內容不變就沿用已算好的指標。"""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    digest.update(str(list(df.columns)).encode())
+    return digest.hexdigest()
+
+
+def get_metrics(symbol, period_type="quarterly"):
+    """
+    取得單一股票的完整指標表（index=ReportDate，由舊到新）。
+    趨勢圖與 Sankey 都讀這一份，同一份財報只計算一次。
+    """
+    df = get_ic(symbol, type=period_type)
+    if df is None or df.empty:
+        return pd.DataFrame()
+    key = (symbol.upper(), period_type, statement_hash(df))
+    with _store_lock:
+        metrics = _store.get(key)
+        if metrics is not None:
+            _store.move_to_end(key)
+            return metrics
+    metrics = compute_metrics(to_panel({symbol: df}), period_type).xs(symbol.upper(), level="Symbol")
+    with _store_lock:
+        _store[key] = metrics
+        while len(_store) > MAX_STORED:
+            _store.popitem(last=False)
+    return metrics
@@ -0,0 +1,186 @@
+import datetime
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from components.config import CACHE_DIR, CACHE_TTL, NEWS_DAYS, THUMBNAIL_SIZE, THUMBNAIL_RETRY_SECONDS
+from components.utils import _fetch_news
+from components.instrument import timed
+from components.cache import open_db, single_flight
+
+INGEST_INTERVAL = CACHE_TTL["news"]
+THUMB_DIR = os.path.join(CACHE_DIR, "thumbs")
+
+_write_lock = threading.Lock()
+_conns = threading.local()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS news (
+    symbol TEXT NOT NULL,
+    url_key TEXT NOT NULL,          -- sha1(url)；沒有網址時改用 Finnhub id 或標題（見 _url_key）
+    headline_key TEXT NOT NULL,     -- sha1(正規化後的標題)，不同網址的同一篇也視為重複；沒有標題時是空字串
+    id INTEGER,
+    datetime INTEGER NOT NULL,
+    headline TEXT,
+    summary TEXT,
+    url TEXT,
+    source TEXT,
+    image TEXT,
+    PRIMARY KEY (symbol, url_key)
+);
+-- 只有標題不是空的才依標題去重，沒有標題的新聞不會互相擋掉（舊版的索引不分空白標題，直接換掉）
+DROP INDEX IF EXISTS idx_news_headline;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_news_headline_nonempty ON news (symbol, headline_key) WHERE headline_key != '';
+CREATE INDEX IF NOT EXISTS idx_news_symbol_time ON news (symbol, datetime DESC);
+CREATE TABLE IF NOT EXISTS news_ingest_log (
+    symbol TEXT PRIMARY KEY,
+    checked_at REAL NOT NULL
+);
+"""
+
+
+def _connect():
+    conn = getattr(_conns, "conn", None)
+    if conn is None:
+        conn = open_db("news.sqlite")
+        conn.row_factory = sqlite3.Row
+        conn.executescript(SCHEMA)
+        _conns.conn = conn
+    return conn
+
+
+def _sha1(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _url_key(article):
+    """
+    主鍵用的網址雜湊。沒有網址的新聞不能都算成 sha1("")（不同標題會被併成一筆），
+    改用 Finnhub 的 id，連 id 都沒有時用標題。
+    """
+    url = article.get("url") or ""
+    if url:
+        return _sha1(url)
+    if article.get("id") is not None:
+        return _sha1(f"id:{article['id']}")
+    return _sha1(f"headline:{article.get('headline') or ''}")
+
+
+def _headline_key(headline):
+    """正規化後標題的雜湊；沒有標題時回傳空字串（不參與標題去重）。"""
+    normalized = " ".join((headline or "").lower().split())
+    return _sha1(normalized) if normalized else ""
+
+
+@timed("news_store.ingest")
+def ingest(symbol, force=False, client=None):
+    """
+    只抓最新一篇已存新聞當天之後的新聞，依網址與標題去重後寫入本地。
+    上次檢查未超過 INGEST_INTERVAL 時不打 API（force=True 除外）。回傳新增篇數。
+    """
+    symbol = symbol.upper()
+    # 多個程序同時打開同一檔時只有一個去打 Finnhub；其他的等它寫完，看到新的 checked_at 就直接回傳
+    with single_flight(("news", symbol)):
+        return _ingest(symbol, force, client)
+
+
+def _ingest(symbol, force, client):
+    conn = _connect()
+    checked = conn.execute("SELECT checked_at FROM news_ingest_log WHERE symbol=?", (symbol,)).fetchone()
+    if not force and checked is not None and time.time() - checked[0] < INGEST_INTERVAL:
+        return 0
+
+    newest = conn.execute("SELECT MAX(datetime) FROM news WHERE symbol=?", (symbol,)).fetchone()[0]
+    earliest = datetime.date.today() - datetime.timedelta(days=NEWS_DAYS)
+    # Finnhub 只接受日期，所以從最新一篇的當天開始抓，重複的靠唯一鍵略過
+    start = max(earliest, datetime.datetime.fromtimestamp(newest, datetime.UTC).date()) if newest else earliest
+    kwargs = {} if client is None else {"client": client}
+    articles = _fetch_news(symbol, start=start, **kwargs) or []
+    rows = [
+        (
+            symbol, _url_key(a), _headline_key(a.get("headline")),
+            a.get("id"), a.get("datetime"), a.get("headline"), a.get("summary"),
+            a.get("url"), a.get("source"), a.get("image"),
+        )
+        for a in articles
+        if a.get("datetime") and (a.get("url") or a.get("headline"))
+    ]
+    with _write_lock:
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO news "
+            "(symbol, url_key, headline_key, id, datetime, headline, summary, url, source, image) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        inserted = conn.total_changes - before
+        conn.execute("INSERT OR REPLACE INTO news_ingest_log (symbol, checked_at) VALUES (?, ?)", (symbol, time.time()))
+        conn.commit()
+    return inserted
+
+
+def as_of(symbol):
+    """上次向 Finnhub 檢查新新聞的時間（epoch 秒），沒檢查過時回傳 None。"""
+    row = _connect().execute("SELECT checked_at FROM news_ingest_log WHERE symbol=?", (symbol.upper(),)).fetchone()
+    return row[0] if row else None
+
+
+def iter_news(symbol, batch_size=5, days=NEWS_DAYS):
+    """
+    由新到舊、一批一批產生最近 days 天的新聞（keyset 分頁）。
+    是 generator：只有真的要下一批時才查下一頁。
+    """
+    since = int(time.time()) - days * 86400
+    cursor = (2 ** 62, "")
+    while True:
+        rows = _connect().execute(
+            "SELECT * FROM news WHERE symbol=? AND datetime >= ? AND (datetime, url_key) < (?, ?) "
+            "ORDER BY datetime DESC, url_key DESC LIMIT ?",
+            (symbol.upper(), since, *cursor, batch_size),
+        ).fetchall()
+        if not rows:
+            return
+        yield [dict(row) for row in rows]
+        if len(rows) < batch_size:
+            return
+        cursor = (rows[-1]["datetime"], rows[-1]["url_key"])
+
+
+@timed("news_store.thumbnail")
+def thumbnail(image_url):
+    """
+    下載新聞圖片並縮成小圖存在本地，回傳本地路徑；失敗時回傳 None。
+    失敗也會留下標記檔，THUMBNAIL_RETRY_SECONDS 內不會每次重跑都去打同一個壞掉的網址。
+    """
+    key = _sha1(image_url)
+    path = os.path.join(THUMB_DIR, f"{key}.jpg")
+    failed_marker = os.path.join(THUMB_DIR, f"{key}.fail")
+    if os.path.exists(path):
+        return path
+    try:
+        if time.time() - os.path.getmtime(failed_marker) < THUMBNAIL_RETRY_SECONDS:
+            return None
+    except FileNotFoundError:
+        pass
+    os.makedirs(THUMB_DIR, exist_ok=True)
+    try:
+        import requests
+        from io import BytesIO
+        from PIL import Image
+
+        response = requests.get(image_url, timeout=5)
+        response.raise_for_status()
+        image = Image.open(BytesIO(response.content)).convert("RGB")
+        image.thumbnail(THUMBNAIL_SIZE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        image.save(tmp_path, format="JPEG", quality=80, optimize=True)
+        os.replace(tmp_path, path)
+        if os.path.exists(failed_marker):
+            os.remove(failed_marker)
+        return path
+    except Exception:
+        open(failed_marker, "w").close()
+        os.utime(failed_marker)  # 標記檔已存在時（過期後重試又失敗）也要重新計時
+        return None
@@ -1,78 +1,102 @@
 import streamlit as st
-import yfinance as yf
 import plotly.graph_objects as go
-from components.config import FINNCLIENT, STARTDATE
+from components.config import STARTDATE, NEWS_BATCH, SECTION_TIMEOUT
 import datetime
+import time
 import pandas as pd
+import numpy as np
 from plotly.subplots import make_subplots
 import textwrap
-from components.utils import format_number
-def get_candle_data(symbol, start_date, end_date):
-    """
-    使用 Finnhub Client 取得指定區間的日 K 線資料，並轉換成適合 mplfinance 的 DataFrame。
-    """
-    end_dt_inclusive = end_date + datetime.timedelta(days=1)
+import itertools
+from components.utils import format_number, get_profile
+from components.news_store import ingest as ingest_news, iter_news, thumbnail, as_of as news_as_of
+from components.tickers import get_info
+from components.pricestore import load_prices, read_store, as_of as prices_as_of
+from components.prefetch import prefetch, as_ready
+from components.cache import as_of as cache_as_of
+from components import archive
+from components.sections import section, widget_key
+from components.figcache import cached_figure, show_figure, compact_values, compact_dates
+from components.instrument import timed
+from components.lod import level_of_detail, up_mask
+from components.indicators import INDICATORS, get_indicator
 
-    candle_df = yf.download(
-        symbol,
-        start=start_date,
-        end=end_dt_inclusive,
-        interval='1d'
-    )
-    
+
+def fetch_candles(symbol, start_date, end_date):
+    """從本地價格檔取日 K（只補抓缺少的最新幾根），只留 OHLCV 欄位。"""
+    candle_df = load_prices(symbol, start_date, end_date)
     if candle_df.empty:
         return pd.DataFrame()
-    candle_df.columns = candle_df.columns.get_level_values(0)
-    
-    # 只留我們要用的欄位
-    candle_df = candle_df[['Open', 'High', 'Low', 'Close', 'Volume']].astype(float)
-  
-    # 讓 index 名稱是 "Date"
-    candle_df.index.name = "Date"
+    return candle_df
 
-    #plot
-    st.subheader("Daily Candlestick Chart")
-    if candle_df.empty:
-        st.write("No candlestick data for this symbol and date range.")
-        return
 
+def build_candle_figure(candle_df, studies=None):
+    """
+    K 線 + 成交量圖。數值與日期都以 typed array 傳給前端，長歷史也不會膨脹成巨大的 JSON。
+    studies: {指標名稱: 與 candle_df 對齊的指標表}；均線類疊在價格上，RSI / MACD 各自一個面板。
+    """
+    studies = studies or {}
+    panels = [name for name in studies if not INDICATORS[name]["overlay"]]
     fig = make_subplots(
-        rows=1, cols=1, 
+        rows=1 + len(panels), cols=1,
         shared_xaxes=True, 
-        specs=[[{"secondary_y": True}]]  # 開啟次 Y 軸
+        row_heights=[0.6] + [0.4 / len(panels)] * len(panels) if panels else None,
+        vertical_spacing=0.03,
+        specs=[[{"secondary_y": True}]] + [[{}]] * len(panels)  # 開啟次 Y 軸
     )
+    dates = compact_dates(candle_df.index)
 
     # K 線圖
     fig.add_trace(go.Candlestick(
-        x=candle_df.index,
-        open=candle_df['Open'],
-        high=candle_df['High'],
-        low=candle_df['Low'],
-        close=candle_df['Close'],
+        x=dates,
+        open=compact_values(candle_df['Open']),
+        high=compact_values(candle_df['High']),
+        low=compact_values(candle_df['Low']),
+        close=compact_values(candle_df['Close']),
         increasing_line_color='green',  # 上漲顏色
         decreasing_line_color='red',    # 下跌顏色
         name='Candlestick'
     ), secondary_y=True)
 
-    # 成交量顏色（用紅綠做區分）
-    volume_colors = [
-        'green' if close >= open_ else 'red'
-        for open_, close in zip(candle_df['Open'], candle_df['Close'])
-    ]
+    # 成交量顏色（用紅綠做區分）：0/1 陣列 + 兩色 colorscale，一次算完
+    volume_colors = up_mask(candle_df)
 
     # 成交量 (Bar)
     fig.add_trace(go.Bar(
-        x=candle_df.index,
-        y=candle_df['Volume'],
-        marker_color=volume_colors,
+        x=dates,
+        y=compact_values(candle_df['Volume'], dtype=np.float64),
+        marker=dict(color=volume_colors, colorscale=[[0, 'red'], [1, 'green']], cmin=0, cmax=1),
         opacity=0.5,
         name="Volume"
     ), secondary_y=False)
 
+    # 指標：均線類疊在價格軸上，其餘放在下方的面板
+    for name, values in studies.items():
+        if INDICATORS[name]["overlay"]:
+            for col in values.columns:
+                fig.add_trace(go.Scatter(
+                    x=dates, y=compact_values(values[col]), mode="lines", line=dict(width=1), name=col
+                ), secondary_y=True)
+            continue
+        row = 2 + panels.index(name)
+        for col in values.columns:
+            if col == "Hist":
+                fig.add_trace(go.Bar(x=dates, y=compact_values(values[col]), name=col, opacity=0.5), row=row, col=1)
+            else:
+                fig.add_trace(go.Scatter(
+                    x=dates, y=compact_values(values[col]), mode="lines", line=dict(width=1), name=col
+                ), row=row, col=1)
+        if name == "RSI":
+            for level in (30, 70):
+                fig.add_hline(y=level, line_dash="dot", line_color="gray", row=row, col=1)
+        fig.update_yaxes(title_text=name, row=row, col=1)
+
     # 調整 Layout
     fig.update_layout(
+        height=450 + 180 * len(panels),
         title="Stock Price & Volume Chart",
         xaxis_title="Date",
+        xaxis_type="date",      # x 是 epoch 毫秒，指定為日期軸
         yaxis_title="Volume",   # 左側 Y 軸
         yaxis2_title="Price",   # 右側 Y 軸
         xaxis_rangeslider_visible=False,
@@ -81,93 +105,221 @@ def get_candle_data(symbol, start_date, end_date):
         bargap=0.2,
         bargroupgap=0.2
     )
+    return fig
+
+
+def get_candle_data(symbol, start_date, end_date, candle_df=None):
+    """
+    取得指定區間的日 K 線資料並畫出 K 線 + 成交量圖。
+    若已預先抓好 candle_df 就直接使用。
+    """
+    if candle_df is None:
+        candle_df = fetch_candles(symbol, start_date, end_date)
+    if candle_df.empty:
+        return pd.DataFrame()
+
+    # 可見區間：區間越長解析度越粗，縮小區間就回到完整日 K
+    first_day, last_day = candle_df.index[0].date(), candle_df.index[-1].date()
+    visible_range = (first_day, last_day)
+    if first_day < last_day:  # 只有一根 K 棒時 st.slider 的 min == max 會出錯，不用選區間
+        visible_range = st.slider(
+            "Visible range",
+            min_value=first_day,
+            max_value=last_day,
+            value=(first_day, last_day),
+            key=widget_key(f"candle_range_{symbol}")
+        )
+    selected = st.multiselect("Indicators", list(INDICATORS), key=widget_key(f"indicators_{symbol}"))
+    visible_df, resolution = level_of_detail(candle_df, *map(pd.Timestamp, visible_range))
+    # 指標一律用完整日 K 計算（有快取、可增量更新），週 / 月 K 時取每根 K 棒期末的值
+    studies = {
+        name: get_indicator(symbol, name, candle_df).reindex(visible_df.index, method="ffill")
+        for name in selected
+    }
+
+    #plot
+    st.subheader(f"{resolution} Candlestick Chart")
+    fig = cached_figure(
+        "candles", (visible_df, *studies.values()), {"resolution": resolution, "studies": tuple(studies)},
+        lambda: build_candle_figure(visible_df, studies)
+    )
 
     # 在 Streamlit 中顯示
-    st.plotly_chart(fig, use_container_width=True)
+    show_figure(fig, "candles", use_container_width=True)
+
+
+def prefetch_overview(symbol):
+    """Overview 頁面用到的所有請求一次同時發出。"""
+    start_date = datetime.datetime.strptime(STARTDATE, "%Y-%m-%d")
+    end_date = datetime.datetime.today()
+    return prefetch({
+        "profile": lambda: get_profile(symbol),
+        "info": lambda: get_info(symbol),
+        "candles": lambda: fetch_candles(symbol, start_date, end_date),
+        "news": lambda: ingest_news(symbol),
+    })
 
 
-def show_overview(symbol):
-    # 下載股票數據
-    stock_data = yf.Ticker(symbol)
-    profile = FINNCLIENT.company_profile2(symbol=symbol)
+def show_basic_info(profile, info):
     weburl = profile.get("weburl", "N/A")
     logo_url = profile.get("logo", "")
+    if logo_url:
+        st.markdown(
+            f"""
+            <div style="display: flex; align-items: center;">
+                <img src="{logo_url}" width="50" style="margin-right: 10px;">
+                <h3 style="margin: 0;">Basic Info</h3>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+    else:
+        st.subheader("📌 Basic info")
+    st.write(f"**Company Name:** {info.get('longName', 'N/A')}")
+    st.write(f"**Symbol:** {info.get('symbol', 'N/A')}")
+    st.write(f"**MarketCap:** {format_number(info.get('marketCap', 'N/A'))} USD")
+    st.write(f"**Price:** {info.get('currentPrice', 'N/A')} USD")
+    st.write(f"**PE Ratio:** {info.get('trailingPE', 'N/A')}")
+    st.write(f"**EPS:** {info.get('trailingEps', 'N/A')}")
+    st.write(f"**Industry:** {info.get('industry')}")
+    st.write(f"**Sector:** {info.get('sector', 'Unknown Sector')}")
+    with st.expander("📖 Click to view Business Summary"):
+        st.write(f"**Business Summary:** {info.get('longBusinessSummary', 'Unknown summary')}")
+    if weburl != "N/A":
+        st.markdown(f"[🌐 Company Website]({weburl})", unsafe_allow_html=True)
+
+
+def fundamentals_as_of(symbol, info):
+    """
+    有兩天以上的基本面快照時顯示日期 slider；拉到過去的日期就改用那天存下的數值，
+    那天沒有的數值欄位不顯示（避免把今天的股價配上過去的日期）。
+    """
+    days = archive.dates(symbol, "info")
+    if len(days) < 2:
+        return info
+    day = st.select_slider("Fundamentals as of", options=days, value=days[-1], key=widget_key(f"info_asof_{symbol}"))
+    if day == days[-1]:
+        return info
+    text = {k: v for k, v in info.items() if not isinstance(v, (int, float)) or isinstance(v, bool)}
+    return {**text, **(archive.at(symbol, "info", day) or {})}
+
+
+def build_valuation_history_figure(symbol, history):
+    """歷史快照裡的本益比走勢。"""
+    fig = go.Figure()
+    for col in ("trailingPE", "forwardPE"):
+        if col in history:
+            fig.add_trace(go.Scatter(x=history["AsOf"], y=history[col], mode="lines+markers", name=col))
+    fig.update_layout(title=f"{symbol.upper()} PE ratio history", height=300, margin=dict(t=40, b=20))
+    return fig
+
+
+def show_basic_info_history(symbol, profile, info):
+    show_basic_info(profile, fundamentals_as_of(symbol, info))
+    history = archive.history(symbol, "info")
+    if len(history) > 1 and any(col in history for col in ("trailingPE", "forwardPE")):
+        with st.expander("📈 PE ratio history"):
+            fig = cached_figure("valuation_history", history, {"symbol": symbol.upper()},
+                                lambda: build_valuation_history_figure(symbol, history))
+            show_figure(fig, "valuation_history", use_container_width=True)
+
+
+@timed("page.show_overview")
+def show_overview(symbol, futures=None):
+    # 所有資料同時開始下載，哪一區先到齊就先畫哪一區
+    if futures is None:
+        futures = prefetch_overview(symbol)
     # 創建左右兩欄布局
     col1, col2 = st.columns([1, 2])  # 左邊 1，右邊 2（右側較大）
+    with col2:
+        st.subheader("📈 K chart")
 
-    with col1:  # **左邊顯示基本資訊**
-
-        info = stock_data.info
-        if logo_url:
-                st.markdown(
-                    f"""
-                    <div style="display: flex; align-items: center;">
-                        <img src="{logo_url}" width="50" style="margin-right: 10px;">
-                        <h3 style="margin: 0;">Basic Info</h3>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
+    sections = {
+        "basic": [futures["profile"], futures["info"]],
+        "chart": [futures["candles"]],
+    }
+    # 整頁共用一個時間預算：到期時還沒到齊的區塊改畫上一份 snapshot
+    deadline = time.monotonic() + SECTION_TIMEOUT
+    for name in as_ready(sections, timeout=SECTION_TIMEOUT):
+        budget = deadline - time.monotonic()
+        if name == "basic":
+            with col1:  # **左邊顯示基本資訊**
+                section(
+                    "Basic info", symbol.upper(), sections["basic"],
+                    lambda profile, info: show_basic_info_history(symbol, profile, info),
+                    as_of=lambda: cache_as_of(symbol, "info"), timeout=budget
+                )
+        elif name == "chart":
+            with col2:  # k chart
+                # 顯示 K 線；抓不到時直接畫本地價格檔
+                section(
+                    "K chart", symbol.upper(), sections["chart"],
+                    lambda candle_df: get_candle_data(symbol, None, None, candle_df=candle_df),
+                    as_of=lambda: prices_as_of(symbol), fallback=lambda: [read_store(symbol)], timeout=budget
                 )
-        else:
-            st.subheader("📌 Basic info")
-        st.write(f"**Company Name:** {info.get('longName', 'N/A')}")
-        st.write(f"**Symbol:** {info.get('symbol', 'N/A')}")
-        st.write(f"**MarketCap:** {format_number(info.get('marketCap', 'N/A'))} USD")
-        st.write(f"**Price:** {info.get('currentPrice', 'N/A')} USD")
-        st.write(f"**PE Ratio:** {info.get('trailingPE', 'N/A')}")
-        st.write(f"**EPS:** {info.get('trailingEps', 'N/A')}")
-        st.write(f"**Industry:** {info.get("industry")}")
-        st.write(f"**Sector:** { info.get("sector", "Unknown Sector")}")
-        with st.expander("📖 Click to view Business Summary"):
-            st.write(f"**Business Summary:** {info.get("longBusinessSummary", "Unknown summary")}")
-        if weburl != "N/A":
-            st.markdown(f"[🌐 Company Website]({weburl})", unsafe_allow_html=True)
     
-    with col2:  # k chart
-        st.subheader("📈 K chart")
-        # 顯示 K 線
-        get_candle_data(symbol, datetime.datetime.strptime(STARTDATE, "%Y-%m-%d"), datetime.datetime.today())
     
+
+@timed("page.show_news")
+def show_news(symbol, news_future=None):
+    # 先把新新聞增量寫進本地，再從本地分批讀出來顯示；
+    # 抓新聞逾時或失敗時照樣顯示本地已有的新聞
+    st.write(f"**{symbol} 的最新新聞**")
+    section(
+        "News", symbol.upper(), [news_future or (lambda: ingest_news(symbol))],
+        lambda inserted: show_news_feed(symbol),
+        as_of=lambda: news_as_of(symbol), fallback=lambda: [0]
+    )
+
+
+@st.fragment
+def show_news_feed(symbol):
+    """按 "Show more" 只重跑這個區塊，每次多讀一批，不重抓 API。"""
+    batches_key = f"news_batches_{symbol}"
+    batches = st.session_state.setdefault(batches_key, 1)
+
+    shown = 0
+    for batch in itertools.islice(iter_news(symbol, NEWS_BATCH), batches):
+        # 這一批的縮圖並行準備（本地已有就直接用）
+        thumbs = prefetch({a["image"]: (lambda url=a["image"]: thumbnail(url)) for a in batch if a["image"]})
+        for article in batch:
+            shown += 1
+            show_article(shown, article, thumbs.get(article["image"]))
+
+    if shown == 0:
+        st.write("No news in the last week.")
+    elif shown == batches * NEWS_BATCH:
+        st.button("Show more", key=widget_key(f"news_more_{symbol}"), on_click=_load_more_news, args=(batches_key,))
+
+
+def _load_more_news(batches_key):
+    st.session_state[batches_key] += 1
+
+
+def show_article(i, article, thumb_future=None):
+    headline = article.get("headline") or "No Title"
+    summary = article.get("summary") or ""
+    news_url = article.get("url") or "#"
+    source = article.get("source") or ""
+    dt = article.get("datetime")  # Unix 時間戳記
+
+    # 顯示標題
+    st.subheader(f"{i}. {headline}")
     
+    # 若有圖片就顯示本地縮圖（不直接從第三方網站載入原圖）
+    thumb_path = thumb_future.result() if thumb_future is not None else None
+    if thumb_path:
+        st.image(thumb_path, width=300)
 
-def show_news(symbol):
-    news = FINNCLIENT.company_news(symbol,_from=(datetime.datetime.today()-datetime.timedelta(days=7)).strftime('%Y-%m-%d'), to=datetime.datetime.today().strftime('%Y-%m-%d'))
-    show_all = st.button("Show more")
+    # 若想摘要只顯示部分，可以裁剪 summary
+    short_summary = textwrap.shorten(summary, width=300, placeholder="...")
+    st.write(short_summary)
     
-    if show_all:
-        news_to_display = news  # 顯示全部
-    else:
-        news_to_display = news[:5]  # 顯示前5則
+    # 顯示來源 & 時間
+    st.write(f"**Source**: {source}")
+    st.write(f"**DateTime**: {datetime.datetime.fromtimestamp(dt,datetime.UTC)}")
 
-    st.write(f"**{symbol} 的最新新聞**")
+    # 新聞連結
+    st.markdown(f"[Read more]({news_url})")
     
-    # 3) 逐篇展示
-    for i, article in enumerate(news_to_display):
-        headline = article.get("headline", "No Title")
-        image_url = article.get("image")
-        summary = article.get("summary", "")
-        news_url = article.get("url", "#")
-        source = article.get("source", "")
-        dt = article.get("datetime", "")  # 可能是時間戳記，可再處理格式
-
-        # 顯示標題
-        st.subheader(f"{i+1}. {headline}")
-        
-        # 若有圖片就顯示
-        if image_url:
-            st.image(image_url, width=300)
-
-        # 若想摘要只顯示部分，可以裁剪 summary
-        short_summary = textwrap.shorten(summary, width=300, placeholder="...")
-        st.write(short_summary)
-        
-        # 顯示來源 & 時間
-        st.write(f"**Source**: {source}")
-        st.write(f"**DateTime**: {datetime.datetime.fromtimestamp(dt,datetime.UTC)}")
-        # 若要轉成人類可讀時間，可以用 datetime.fromtimestamp(dt)
-        # st.write(f"**DateTime**: {datetime.fromtimestamp(dt).strftime('%Y-%m-%d %H:%M:%S')}")
-
-        # 新聞連結
-        st.markdown(f"[Read more]({news_url})")
-        
-        st.write("---")  # 分隔線
+    st.write("---")  # 分隔線
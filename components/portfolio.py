@@ -0,0 +1,90 @@
+import streamlit as st
+import plotly.express as px
+
+from components.risk import parse_holdings, price_matrix, risk_model, portfolio_stats, MIN_PRICES
+from components.figcache import cached_figure, show_figure
+from components.instrument import timed
+
+MAX_HEATMAP = 60  # 相關係數熱圖最多畫幾檔（依權重取前幾名）
+
+
+def build_value_figure(value, drawdown):
+    fig1 = px.line(value, title="Portfolio value")
+    fig1.update_layout(showlegend=False, xaxis_title="", yaxis_title="")
+    fig2 = px.area(drawdown * 100, title="Drawdown (%)")
+    fig2.update_layout(showlegend=False, xaxis_title="", yaxis_title="")
+    fig2.update_traces(line_color="red")
+    return fig1, fig2
+
+
+def build_rolling_vol_figure(rolling_vol):
+    fig = px.line(rolling_vol * 100, title="Rolling 21-day volatility (annualized, %)")
+    fig.update_layout(showlegend=False, xaxis_title="", yaxis_title="")
+    return fig
+
+
+def build_weights_figure(holdings):
+    df = holdings.sort_values("Weight (%)", ascending=False).reset_index(names="Symbol")
+    fig = px.bar(df, x="Symbol", y=["Weight (%)", "Risk contribution (%)"], barmode="group", title="Weight vs risk contribution")
+    fig.update_layout(xaxis_title="", yaxis_title="%")
+    return fig
+
+
+def build_correlation_figure(corr):
+    fig = px.imshow(corr, zmin=-1, zmax=1, color_continuous_scale="RdBu", title="Correlation of daily returns")
+    fig.update_layout(height=max(400, 14 * len(corr)))
+    return fig
+
+
+@timed("page.show_portfolio")
+def show_portfolio(holdings_text, start):
+    holdings = parse_holdings(holdings_text)
+    if not holdings:
+        st.info("Enter at least one holding, e.g. `AAPL 10, MSFT 5`.")
+        return
+
+    with st.spinner(f"Loading prices for {len(holdings)} holdings..."):
+        close, missing = price_matrix(list(holdings), start)
+    if missing:
+        st.caption(f"No price data: {', '.join(missing)}")
+    if len(close) < MIN_PRICES:
+        st.warning("Not enough overlapping price history for these holdings.")
+        return
+    if close.index[0].date() > start:
+        st.caption(f"Aligned from {close.index[0].date()}, the first day every holding has a price.")
+
+    model = risk_model(close)
+    stats = portfolio_stats(close, holdings, model)
+
+    # 1) 總覽
+    cols = st.columns(4)
+    cols[0].metric("Value", f"{stats['value'].iloc[-1]:,.0f}")
+    cols[1].metric("Total return", f"{stats['total_return']:.1%}")
+    cols[2].metric("Volatility (ann.)", f"{stats['volatility']:.1%}")
+    cols[3].metric("Max drawdown", f"{stats['max_drawdown']:.1%}")
+
+    # 2) 市值與回撤
+    fig1, fig2 = cached_figure(
+        "portfolio_value", (stats["value"], stats["drawdown"]), {},
+        lambda: build_value_figure(stats["value"], stats["drawdown"])
+    )
+    colA, colB = st.columns(2)
+    show_figure(fig1, "portfolio_value", colA, use_container_width=True)
+    show_figure(fig2, "portfolio_value", colB, use_container_width=True)
+    fig = cached_figure("portfolio_vol", stats["rolling_vol"], {}, lambda: build_rolling_vol_figure(stats["rolling_vol"]))
+    show_figure(fig, "portfolio_vol", use_container_width=True)
+
+    # 3) 持股明細、權重與風險貢獻
+    st.subheader("Holdings")
+    st.dataframe(stats["holdings"].sort_values("Weight (%)", ascending=False), use_container_width=True)
+    fig = cached_figure("portfolio_weights", stats["holdings"], {}, lambda: build_weights_figure(stats["holdings"]))
+    show_figure(fig, "portfolio_weights", use_container_width=True)
+
+    # 4) 相關係數（持股太多時只畫權重最大的幾檔）
+    top = stats["holdings"]["Weight (%)"].nlargest(MAX_HEATMAP).index
+    corr = model["corr"].loc[top, top]
+    st.subheader(f"Correlation (top {len(top)} by weight)")
+    fig = cached_figure("portfolio_corr", corr, {}, lambda: build_correlation_figure(corr))
+    show_figure(fig, "portfolio_corr", use_container_width=True)
+    with st.expander("Covariance matrix (annualized)"):
+        st.dataframe(model["cov"], use_container_width=True)
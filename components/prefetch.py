@@ -0,0 +1,71 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from components.config import PREFETCH_WORKERS
+
+log = logging.getLogger(__name__)
+
+# 全程序共用的 thread pool，所有頁面的網路請求都丟到這裡並行執行
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+# 正在背景更新的 key，同一個 key 不重複排隊
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+
+def submit(fn, *args, **kwargs):
+    return _executor.submit(fn, *args, **kwargs)
+
+
+def revalidate(key, fn):
+    """
+    stale-while-revalidate 的背景更新：呼叫端先用舊資料，fn() 在 thread pool 裡重抓。
+    同一個 key 已經在更新中就不再排隊；失敗只記 log，下次讀到舊資料時會再試。
+    """
+    with _revalidating_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+
+    def run():
+        try:
+            fn()
+        except Exception:
+            log.warning("background refresh of %r failed", key, exc_info=True)
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(key)
+
+    _executor.submit(run)
+
+
+def prefetch(jobs):
+    """
+    同時啟動多個互不相依的抓取工作。
+    jobs: {名稱: 無參數 callable}，回傳 {名稱: Future}。
+    """
+    return {name: _executor.submit(job) for name, job in jobs.items()}
+
+
+def as_ready(sections, timeout=None):
+    """
+    sections: {區塊名稱: [該區塊需要的 Future, ...]}
+    哪個區塊的資料先到齊就先 yield 哪個，讓畫面不必等最慢的請求。
+    有給 timeout 時，時間到就把還沒到齊的區塊也一起 yield（由呼叫端處理逾時）。
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    remaining = dict(sections)
+    while remaining:
+        ready = [name for name, futures in remaining.items() if all(f.done() for f in futures)]
+        if not ready:
+            left = None if deadline is None else deadline - time.monotonic()
+            if left is not None and left <= 0:
+                ready = list(remaining)
+            else:
+                pending = {f for futures in remaining.values() for f in futures if not f.done()}
+                wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+                continue
+        for name in ready:
+            del remaining[name]
+            yield name
@@ -0,0 +1,167 @@
+import os
+import time
+from urllib.parse import quote
+
+import pandas as pd
+
+from components.config import CACHE_DIR, PRICE_REFRESH_SECONDS
+from components.tickers import get_ticker, download
+from components.instrument import timed, annotate
+from components.cache import single_flight
+from components.prefetch import revalidate
+
+OHLCV = ["Open", "High", "Low", "Close", "Volume"]
+PRICE_DIR = os.path.join(CACHE_DIR, "prices")
+
+
+def _path(symbol):
+    # symbol 來自使用者輸入：跳脫 / 等字元，檔名不會跑出 PRICE_DIR
+    return os.path.join(PRICE_DIR, f"{quote(symbol, safe='^=')}.parquet")
+
+
+def covered_from(stored):
+    """
+    本地檔案確定「這天之前沒有資料」的日期：往前補抓時記下的 start（存在 attrs）。
+    start 落在假日、或股票在 start 之後才上市時，第一根 K 棒會晚於 start，但不用再補。
+    舊檔沒有記錄時就用第一根 K 棒。
+    """
+    value = stored.attrs.get("covered_from")
+    return min(pd.Timestamp(value), stored.index[0]) if value else stored.index[0]
+
+
+def _empty():
+    return pd.DataFrame(columns=OHLCV, index=pd.DatetimeIndex([], name="Date"), dtype=float)
+
+
+def _clean(df):
+    """只留 OHLCV，index 統一成不帶時區的日期。"""
+    if df is None or df.empty:
+        return _empty()
+    df = df[OHLCV].astype(float)
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    df.index = df.index.normalize()
+    df.index.name = "Date"
+    return df
+
+
+@timed("pricestore.download")
+def _download(symbol, start, end):
+    """從 yfinance 抓 [start, end) 的日 K。"""
+    return _clean(get_ticker(symbol).history(start=start, end=end, interval="1d"))
+
+
+def read_store(symbol):
+    """只讀本地檔案，不碰網路；沒有資料時回傳空表。"""
+    path = _path(symbol.upper())
+    if not os.path.exists(path):
+        return _empty()
+    return pd.read_parquet(path)
+
+
+def as_of(symbol):
+    """本地價格檔的更新時間（epoch 秒），沒有檔案時回傳 None。"""
+    path = _path(symbol.upper())
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def _write_store(symbol, df, since=None):
+    """since：確認過這天之前沒有資料（covered_from），記在 Parquet 的 metadata 裡。"""
+    if since is not None:
+        df.attrs["covered_from"] = pd.Timestamp(since).date().isoformat()
+    os.makedirs(PRICE_DIR, exist_ok=True)
+    path = _path(symbol)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path)
+    os.replace(tmp_path, path)  # 原子替換，讀取端不會看到寫一半的檔案
+
+
+@timed("pricestore.sync")
+def sync(symbol, start, force=False):
+    """
+    讓本地價格檔至少涵蓋 start 到今天：
+    - 檔案最近才更新過就直接用；過期但已涵蓋 start 時也先回本地資料，背景再補抓
+      （force=True 時一律當場補抓，給背景 worker 用）
+    - 只補抓最後一根 K 棒之後的資料（最後一根可能是盤中未收盤，所以重抓）
+    - start 早於已確認的 covered_from 時才往前補
+    """
+    symbol = symbol.upper()
+    start = pd.Timestamp(start).normalize()
+    tomorrow = pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+    # 同一檔股票同時只允許一個 thread / 程序更新檔案，其他的等它寫完再讀
+    with single_flight(("prices", symbol)):
+        stored = read_store(symbol)
+        path = _path(symbol)
+        since = start if stored.empty else min(start, covered_from(stored))
+        if stored.empty:
+            merged = _download(symbol, start, tomorrow)
+        else:
+            first, last = stored.index[0], stored.index[-1]
+            fresh = not force and os.path.exists(path) and time.time() - os.path.getmtime(path) < PRICE_REFRESH_SECONDS
+            covered = covered_from(stored) <= start
+            if fresh and covered:
+                return stored
+            if covered and not force:
+                # 只是過期：先回本地資料，補最新 K 棒的工作丟到背景
+                annotate(cache="stale")
+                revalidate(("prices", symbol), lambda: sync(symbol, start, force=True))
+                return stored
+            parts = []
+            if not covered:
+                parts.append(_download(symbol, start, first))
+            tail = _download(symbol, last, tomorrow)
+            parts.append(stored if tail.empty else stored[stored.index < last])
+            parts.append(tail)
+            merged = pd.concat(parts)
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        if not merged.empty:
+            # 已從 start 抓過：就算 start 之後幾天才有第一根 K 棒，下次也不用再往前補
+            _write_store(symbol, merged, since=since)
+        return merged
+
+
+@timed("pricestore.sync_many")
+def sync_many(symbols, start):
+    """
+    多檔一起同步：需要更新的股票合併成一次批次下載，再各自併回本地檔案。
+    回傳 {symbol: 日 K}（沒有資料的 symbol 是空表）。
+    """
+    symbols = [symbol.upper() for symbol in dict.fromkeys(symbols)]
+    start = pd.Timestamp(start).normalize()
+    tomorrow = pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+    prices = {symbol: read_store(symbol) for symbol in symbols}
+
+    # 每檔要從哪天開始抓：沒有檔案或沒涵蓋 start 就從 start，只是過期就從最後一根
+    # 起點相同的合併成一次批次下載，只是過期的股票不會被拉去從 start 重抓
+    groups = {}
+    for symbol, stored in prices.items():
+        if stored.empty or covered_from(stored) > start:
+            groups.setdefault(start, []).append(symbol)
+        elif time.time() - os.path.getmtime(_path(symbol)) >= PRICE_REFRESH_SECONDS:
+            groups.setdefault(stored.index[-1], []).append(symbol)
+
+    for since, batch in groups.items():
+        downloaded = download(batch, since, tomorrow)
+        for symbol in batch:
+            new = _clean(downloaded.get(symbol))
+            with single_flight(("prices", symbol)):
+                stored = read_store(symbol)  # 下載期間別的程序可能已經寫過
+                if not new.empty:
+                    covered = start if stored.empty else min(start, covered_from(stored))
+                    stored = pd.concat([stored[stored.index < new.index[0]], new])
+                    stored = stored[~stored.index.duplicated(keep="last")].sort_index()
+                    _write_store(symbol, stored, since=covered)
+            prices[symbol] = stored
+    return prices
+
+
+def load_prices(symbol, start_date, end_date):
+    """回傳 [start_date, end_date] 的日 K，必要時先增量同步。"""
+    prices = sync(symbol, start_date)
+    return prices.loc[pd.Timestamp(start_date).normalize():pd.Timestamp(end_date)]
+
+
+def read_window(symbol, start_date, end_date):
+    """直接從本地檔案切出任意區間，完全不打網路。"""
+    prices = read_store(symbol)
+    return prices.loc[pd.Timestamp(start_date).normalize():pd.Timestamp(end_date)]
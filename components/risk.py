@@ -0,0 +1,126 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from components.pricestore import sync_many
+from components.figcache import data_hash
+from components.instrument import timed, annotate
+
+TRADING_DAYS = 252
+VOL_WINDOW = 21  # 滾動波動度視窗（約一個月）
+MAX_STORED = 64
+MIN_PRICES = 3  # 兩筆日報酬才算得出樣本共變異數（ddof=1）
+
+# (symbols, 第一天, 最後一根, 最後一根的雜湊) -> 報酬與共變異數等不依持股數量的結果
+_store = OrderedDict()
+_store_lock = threading.Lock()
+
+
+def parse_holdings(text):
+    """'AAPL 10, MSFT:5 nvda' -> {'AAPL': 10.0, 'MSFT': 5.0, 'NVDA': 1.0}（沒寫股數就當 1 股）"""
+    holdings = {}
+    for symbol, shares in re.findall(r"([A-Za-z][A-Za-z0-9.\-^=]*)\s*[: ]?\s*(\d+(?:\.\d+)?)?", text):
+        holdings[symbol.upper()] = holdings.get(symbol.upper(), 0.0) + float(shares or 1)
+    return holdings
+
+
+@timed("risk.price_matrix")
+def price_matrix(symbols, start):
+    """
+    所有持股的收盤價對齊成 日期 x 股票 的稠密矩陣：
+    休市日缺值沿用前一天，從所有持股都有價格的那天開始。
+    回傳 (收盤價 DataFrame, 沒有資料的 symbols)。
+    """
+    prices = sync_many(symbols, start)
+    close = pd.DataFrame({symbol: df["Close"] for symbol, df in prices.items() if not df.empty})
+    missing = [symbol for symbol in prices if symbol not in close.columns]
+    if close.empty:
+        return close, missing
+    close = close.sort_index().loc[pd.Timestamp(start):].ffill().dropna()
+    return close, missing
+
+
+@timed("risk.model")
+def risk_model(close):
+    """
+    日報酬、年化共變異數 / 相關係數 / 波動度。
+    只和價格有關，同一組股票在出現新 K 棒之前都沿用快取。
+    至少要 MIN_PRICES 天的價格（兩筆報酬），共變異數才有意義。
+    """
+    if len(close) < MIN_PRICES:
+        raise ValueError(f"risk_model needs at least {MIN_PRICES} days of prices, got {len(close)}")
+    key = (tuple(close.columns), close.index[0], close.index[-1], data_hash(close.iloc[-1]))
+    with _store_lock:
+        model = _store.get(key)
+        if model is not None:
+            _store.move_to_end(key)
+            annotate(cache="memory")
+            return model
+    annotate(cache="miss")
+
+    prices = close.to_numpy(dtype=float)
+    returns = prices[1:] / prices[:-1] - 1
+    cov = np.cov(returns, rowvar=False).reshape(len(close.columns), -1) * TRADING_DAYS
+    vol = np.sqrt(np.diag(cov))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov / np.outer(vol, vol)
+    model = {
+        "returns": returns,
+        "cov": pd.DataFrame(cov, index=close.columns, columns=close.columns),
+        "corr": pd.DataFrame(corr, index=close.columns, columns=close.columns),
+        "vol": pd.Series(vol, index=close.columns),
+    }
+    with _store_lock:
+        _store[key] = model
+        while len(_store) > MAX_STORED:
+            _store.popitem(last=False)
+    return model
+
+
+def rolling_std(x, window):
+    """一維序列的滾動標準差（滑動視窗，一次向量化），前 window-1 個是 NaN。"""
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window).std(axis=-1, ddof=1)
+    return out
+
+
+@timed("risk.portfolio")
+def portfolio_stats(close, holdings, model):
+    """
+    依持股數量算出組合層級的結果（全部是矩陣運算）：
+    市值、權重、報酬、滾動波動度、回撤，以及各持股的風險貢獻。
+    """
+    prices = close.to_numpy(dtype=float)
+    shares = np.array([holdings[symbol] for symbol in close.columns], dtype=float)
+    value = prices @ shares
+    weights = prices[-1] * shares / value[-1]
+    returns = value[1:] / value[:-1] - 1
+
+    cov = model["cov"].to_numpy()
+    port_vol = float(np.sqrt(weights @ cov @ weights))
+    contribution = weights * (cov @ weights) / port_vol if port_vol else np.zeros_like(weights)
+    drawdown = value / np.maximum.accumulate(value) - 1
+
+    dates = close.index
+    return {
+        "value": pd.Series(value, index=dates, name="Value"),
+        "returns": pd.Series(returns, index=dates[1:], name="Return"),
+        "rolling_vol": pd.Series(rolling_std(returns, VOL_WINDOW) * np.sqrt(TRADING_DAYS), index=dates[1:], name="Volatility"),
+        "drawdown": pd.Series(drawdown, index=dates, name="Drawdown"),
+        "holdings": pd.DataFrame({
+            "Shares": shares,
+            "Price": prices[-1],
+            "Value": prices[-1] * shares,
+            "Weight (%)": weights * 100,
+            "Volatility (%)": model["vol"].to_numpy() * 100,
+            "Risk contribution (%)": contribution / port_vol * 100 if port_vol else contribution,
+        }, index=close.columns),
+        "total_return": value[-1] / value[0] - 1,
+        "volatility": port_vol,
+        "max_drawdown": drawdown.min(),
+    }
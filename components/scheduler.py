@@ -0,0 +1,151 @@
+import functools
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# 數字越小越優先：使用者正在等的頁面請求 > 背景更新
+INTERACTIVE = 0
+BACKGROUND = 10
+
+MAX_RETRIES = 3
+
+
+class TokenBucket:
+    """每秒補充 rate 個 token，最多累積 capacity 個；acquire() 拿不到就等。"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class FinnhubScheduler:
+    """
+    放在 Finnhub client 前面的排程器：
+    - token bucket 控制每分鐘呼叫數，不超過 API 額度
+    - 相同參數且還在排隊/執行中的請求合併成一次上游呼叫
+    - priority queue 讓互動請求插隊到背景更新前面；互動請求合併到還在排隊的背景請求時，整個請求升級成互動
+    - 429 時不佔住 worker 睡覺，而是等退避時間到了才重新排隊
+    client 只要有對應的方法即可，測試時可以換成本地的假 client。
+    也可以只給 client_factory，第一次呼叫時才建立 client 與 worker threads，
+    沒用到 Finnhub 的頁面就不必付出這些成本。
+    """
+
+    def __init__(self, client=None, calls_per_minute=60, burst=10, workers=4, client_factory=None, backoff=1.0):
+        self._client = client
+        self.backoff = backoff  # 429 第 n 次重試前等 backoff * 2**n 秒
+        self._client_factory = client_factory
+        self._bucket = TokenBucket(calls_per_minute / 60, burst)
+        self._queue = queue.PriorityQueue()
+        # key -> 請求狀態：future、目前 priority、呼叫參數、state（queued / running / backoff）
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._workers = workers
+        self._started = False
+
+    def _start(self):
+        # 呼叫端已持有 self._lock
+        if self._client is None:
+            self._client = self._client_factory()
+        for i in range(self._workers):
+            threading.Thread(target=self._worker, name=f"finnhub-{i}", daemon=True).start()
+        self._started = True
+
+    def set_client(self, client):
+        """換掉上游 client（例如 benchmark 用的本地 fixture client），之後的呼叫都走新的 client。"""
+        with self._lock:
+            self._client = client
+
+    def submit(self, method, *args, priority=INTERACTIVE, **kwargs):
+        key = (method, args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            if not self._started:
+                self._start()
+            entry = self._inflight.get(key)
+            if entry is None:
+                entry = {"future": Future(), "priority": priority, "method": method, "args": args,
+                         "kwargs": kwargs, "state": "queued"}
+                self._inflight[key] = entry
+                self._queue.put((priority, next(self._seq), key, 0))
+            elif priority < entry["priority"]:
+                # 較優先的呼叫端加入：用新的 priority 再排一次，舊的那筆出隊時會被略過
+                entry["priority"] = priority
+                if entry["state"] == "queued":
+                    self._queue.put((priority, next(self._seq), key, 0))
+        return entry["future"]
+
+    def call(self, method, *args, priority=INTERACTIVE, **kwargs):
+        return self.submit(method, *args, priority=priority, **kwargs).result()
+
+    def _requeue(self, key, attempt):
+        """退避時間到了，用請求目前的 priority 重新排隊。"""
+        with self._lock:
+            entry = self._inflight[key]
+            entry["state"] = "queued"
+            self._queue.put((entry["priority"], next(self._seq), key, attempt))
+
+    def _worker(self):
+        from components.instrument import span  # 避免與 components.config 循環 import
+        while True:
+            priority, _, key, attempt = self._queue.get()
+            with self._lock:
+                entry = self._inflight.get(key)
+                # 升級 priority 後留在佇列裡的舊紀錄
+                if entry is None or entry["state"] != "queued" or entry["priority"] != priority:
+                    continue
+                entry["state"] = "running"
+            self._bucket.acquire()
+            method = entry["method"]
+            try:
+                with span(f"finnhub.{method}", priority=priority, attempt=attempt):
+                    result = getattr(self._client, method)(*entry["args"], **entry["kwargs"])
+            except Exception as exc:
+                # 429：額度用完，退避時間到了再重新排隊，這段時間 worker 繼續處理其他請求
+                if getattr(exc, "status_code", None) == 429 and attempt < MAX_RETRIES:
+                    with self._lock:
+                        entry["state"] = "backoff"
+                    timer = threading.Timer(self.backoff * 2 ** attempt, self._requeue, args=(key, attempt + 1))
+                    timer.daemon = True
+                    timer.start()
+                    continue
+                with self._lock:
+                    self._inflight.pop(key)
+                entry["future"].set_exception(exc)
+            else:
+                with self._lock:
+                    self._inflight.pop(key)
+                entry["future"].set_result(result)
+
+
+class ScheduledClient:
+    """
+    與 finnhub.Client 相同的呼叫介面，但所有方法都經過 scheduler。
+    例如 FINNCLIENT.company_news(...) 不用改寫就會被限流與合併。
+    """
+
+    def __init__(self, scheduler, priority=INTERACTIVE):
+        self._scheduler = scheduler
+        self._priority = priority
+
+    def with_priority(self, priority):
+        return ScheduledClient(self._scheduler, priority)
+
+    def __getattr__(self, method):
+        return functools.partial(self._scheduler.call, method, priority=self._priority)
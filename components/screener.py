@@ -0,0 +1,52 @@
+import time
+
+import streamlit as st
+
+from components.universe import build_index, load_index, screen, COLUMNS
+from components.batch import parse_symbols
+from components.instrument import timed
+
+# 結果表顯示的欄位與格式
+DISPLAY = {
+    "marketCap": st.column_config.NumberColumn("Market cap", format="compact"),
+    "trailingPE": st.column_config.NumberColumn("PE", format="%.1f"),
+    "trailingEps": st.column_config.NumberColumn("EPS", format="%.2f"),
+    "currentPrice": st.column_config.NumberColumn("Price", format="%.2f"),
+    "grossMargin": st.column_config.NumberColumn("Gross margin (%)", format="%.1f"),
+    "operatingMargin": st.column_config.NumberColumn("Operating margin (%)", format="%.1f"),
+    "netMargin": st.column_config.NumberColumn("Net margin (%)", format="%.1f"),
+    "revenueYoY": st.column_config.NumberColumn("Revenue YoY (%)", format="%.1f"),
+}
+
+
+@timed("page.show_screener")
+def show_screener(symbols_text):
+    """基本面篩選：讀本地索引，按鈕才重新收集 universe 的資料。"""
+    if st.button("Add / refresh these symbols in the index"):
+        symbols = parse_symbols(symbols_text)
+        with st.spinner(f"Collecting info and income statements for {len(symbols)} symbols..."):
+            index, failed = build_index(symbols)
+        if failed:
+            st.caption(f"Failed: {', '.join(failed)}")
+    else:
+        index = load_index()
+    if index.empty:
+        st.info("No index yet. Press the button above to build it.")
+        return
+
+    expression = st.text_input(
+        "Filter", "marketCap > 10B and netMargin > 10",
+        help="Clauses joined by `and` or commas: `field op value`, op is one of > >= < <= = != ~ (contains). "
+             "Numbers accept K/M/B/T; quote text that contains `and` or commas, e.g. `longName ~ 'Apple, Inc'`. "
+             f"Fields: {', '.join(COLUMNS)}",
+    )
+    sort = st.text_input("Sort by", "-marketCap", help="Comma separated fields; prefix with - for descending.")
+    started = time.perf_counter()
+    try:
+        result = screen(expression, sort)
+    except ValueError as exc:
+        st.warning(str(exc))
+        return
+    elapsed = (time.perf_counter() - started) * 1000
+    st.caption(f"{len(result)} of {len(index)} symbols match · {elapsed:.1f} ms")
+    st.dataframe(result, hide_index=True, column_config=DISPLAY, use_container_width=True)
@@ -0,0 +1,127 @@
+"""
+頁面區塊的 stale-while-revalidate 外框：
+每個區塊最多等 SECTION_TIMEOUT 秒的資料，畫成功就記下這份資料當 "last good snapshot"；
+逾時、抓資料失敗或畫圖出錯時，改畫上一份 snapshot（或本地檔案的舊資料）並標示資料時間，
+不會讓一個慢的來源擋住整頁、也不會讓一個壞掉的區塊讓整頁掛掉。
+逾時的請求會留在 thread pool 裡繼續跑，寫進快取後下次重畫就是新資料。
+"""
+import contextvars
+import datetime
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, wait
+
+import streamlit as st
+
+from components.config import SECTION_TIMEOUT, CACHE_MAX_ITEMS
+from components.prefetch import submit
+from components.instrument import span
+
+# (區塊名稱, key) -> (as_of, 資料)
+_snapshots = OrderedDict()
+_snapshots_lock = threading.Lock()
+# 畫圖出錯後改畫 snapshot 時，同一輪會再建一次同樣的元件；這時 key 加字尾、圖表依序編號
+_retry = contextvars.ContextVar("section_retry", default=None)
+
+
+def format_as_of(ts):
+    """epoch 秒 -> 'As of 2025-01-31 14:05'；沒有時間時回傳空字串。"""
+    if ts is None:
+        return ""
+    return f"As of {datetime.datetime.fromtimestamp(ts):%Y-%m-%d %H:%M}"
+
+
+def _remember(key, as_of, data):
+    with _snapshots_lock:
+        _snapshots[key] = (as_of, data)
+        _snapshots.move_to_end(key)
+        while len(_snapshots) > CACHE_MAX_ITEMS:
+            _snapshots.popitem(last=False)
+
+
+def widget_key(key):
+    """區塊裡 widget 的 key；重畫 snapshot 時加上字尾，不會跟出錯那次已登記的 key 重複。"""
+    return key if _retry.get() is None else f"{key}:snapshot"
+
+
+def element_key(name):
+    """沒給 key 的元件（圖表、表格）重畫 snapshot 時用的 key；平常回傳 None，維持 Streamlit 自動產生的 id。"""
+    retry = _retry.get()
+    return None if retry is None else f"{name}:snapshot:{next(retry)}"
+
+
+def snapshot(name, key):
+    """上一份畫成功的 (as_of, 資料)，沒有時回傳 None。"""
+    with _snapshots_lock:
+        return _snapshots.get((name, key))
+
+
+def _safe(fn):
+    try:
+        return fn() if fn is not None else None
+    except Exception:
+        return None
+
+
+def section(name, key, jobs, render, as_of=None, fallback=None, timeout=SECTION_TIMEOUT):
+    """
+    畫一個頁面區塊。
+    jobs: 這一區要等的資料，Future 或 callable（callable 會丟進 thread pool）的 list
+    render(*results): 用資料畫出這一區
+    as_of(): 資料的時間（epoch 秒），顯示在區塊下方
+    fallback(): 沒有 snapshot 時拿本地舊資料的方法（不打網路），回傳與 results 相同結構的 list
+    回傳 True 表示畫的是最新資料。
+    """
+    futures = [job if isinstance(job, Future) else submit(job) for job in jobs]
+    with span(f"section.{name}") as record:
+        done, pending = wait(futures, timeout=max(timeout, 0))
+        reason = None
+        if pending:
+            reason = f"timed out after {timeout:.0f}s"
+        else:
+            errors = [f.exception() for f in futures if f.exception() is not None]
+            if errors:
+                reason = f"{type(errors[0]).__name__}: {errors[0]}"
+
+        placeholder = st.empty()
+        rendered = reason is None
+        if reason is None:
+            results = [f.result() for f in futures]
+            try:
+                with placeholder.container():
+                    render(*results)
+                    caption = format_as_of(_safe(as_of))
+                    if caption:
+                        st.caption(caption)
+                _remember((name, key), _safe(as_of), results)
+                record["outcome"] = "fresh"
+                return True
+            except Exception as exc:
+                reason = f"{type(exc).__name__}: {exc}"
+                placeholder.empty()
+
+        # 畫上一份 snapshot；這個程序沒畫過的話用本地檔案的舊資料
+        record["outcome"] = "snapshot"
+        entry = snapshot(name, key)
+        if entry is None and fallback is not None:
+            results = _safe(fallback)
+            if results is not None:
+                entry = (_safe(as_of), results)
+        if entry is None:
+            record["outcome"] = "unavailable"
+            placeholder.warning(f"{name} is unavailable right now ({reason}).")
+            return False
+        # 剛才畫到一半出錯的話，這一輪已登記過同樣的 widget key，重畫時換一組
+        token = _retry.set(itertools.count()) if rendered else None
+        try:
+            with placeholder.container():
+                render(*entry[1])
+                st.caption(" · ".join(part for part in (format_as_of(entry[0]), f"showing last good snapshot ({reason})") if part))
+        except Exception as exc:
+            record["outcome"] = "unavailable"
+            placeholder.warning(f"{name} is unavailable right now ({type(exc).__name__}: {exc}).")
+        finally:
+            if token is not None:
+                _retry.reset(token)
+        return False
@@ -0,0 +1,205 @@
+"""
+財報的精簡儲存格式：每份報表（symbol × income/balance/cashflow × quarterly/annual）
+存成一個 Parquet，內容是 期別 × 科目 的 float64 矩陣，由舊到新排序。
+科目名稱不存在每個檔案裡，而是透過共用的科目代碼表（items.json）轉成整數代碼當欄名，
+所有股票同一個科目的代碼相同，跨股票堆疊時直接對齊。
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+
+import pandas as pd
+
+from components.config import CACHE_DIR, CACHE_TTL, CACHE_MAX_ITEMS, CACHE_STALE_MAX
+from components.cache import single_flight
+from components.prefetch import revalidate
+from components.instrument import annotate
+
+STATEMENT_DIR = os.path.join(CACHE_DIR, "statements")
+ITEMS_PATH = os.path.join(STATEMENT_DIR, "items.json")
+
+# 科目代碼表：name -> code，以及 code -> name
+_codes = {}
+_names = []
+_codes_lock = threading.Lock()
+# 記憶體層：(symbol, statement, period) -> (檔案 mtime, 矩陣)
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def _load_codes():
+    # 呼叫端已持有 _codes_lock
+    if os.path.exists(ITEMS_PATH):
+        with open(ITEMS_PATH, encoding="utf-8") as f:
+            names = json.load(f)
+        if len(names) > len(_names):
+            _names[:] = names
+            _codes.clear()
+            _codes.update({name: code for code, name in enumerate(names)})
+
+
+def encode(names):
+    """科目名稱 -> 代碼；沒見過的科目追加到代碼表（跨程序以 single_flight 保護）。"""
+    with _codes_lock:
+        if not _names:
+            _load_codes()
+        missing = [name for name in names if name not in _codes]
+        if missing:
+            with single_flight("statement_items"):
+                _load_codes()  # 別的程序可能剛加過
+                for name in dict.fromkeys(missing):
+                    if name not in _codes:
+                        _codes[name] = len(_names)
+                        _names.append(name)
+                os.makedirs(STATEMENT_DIR, exist_ok=True)
+                tmp_path = f"{ITEMS_PATH}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(_names, f, ensure_ascii=False)
+                os.replace(tmp_path, ITEMS_PATH)
+        return [_codes[name] for name in names]
+
+
+def decode(codes):
+    """代碼 -> 科目名稱。"""
+    with _codes_lock:
+        if any(code >= len(_names) for code in codes):
+            _load_codes()
+        return [_names[code] for code in codes]
+
+
+def normalize(raw):
+    """
+    yfinance 的原始報表（科目 x 日期、object dtype、最新的在左邊）
+    -> 期別 x 科目 的 float64 矩陣（index=ReportDate 由舊到新），整張表一次轉型。
+    """
+    if raw is None or raw.empty:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="ReportDate"), dtype=float)
+    try:
+        matrix = raw.T.astype(float)
+    except (TypeError, ValueError):
+        matrix = raw.T.apply(pd.to_numeric, errors="coerce")  # 偶爾混進字串時才逐欄轉
+    matrix = matrix.loc[:, ~matrix.columns.duplicated()]
+    matrix.index = pd.DatetimeIndex(matrix.index, name="ReportDate")
+    matrix.columns.name = None
+    return matrix.sort_index()
+
+
+def _path(symbol, statement, period):
+    # symbol 來自使用者輸入：跳脫 / 等字元，檔名不會跑出 STATEMENT_DIR
+    return os.path.join(STATEMENT_DIR, f"{quote(symbol, safe='^=')}_{statement}_{period}.parquet")
+
+
+def _write(path, matrix):
+    """欄名換成科目代碼後寫成 Parquet（先寫暫存檔再 rename）。"""
+    stored = matrix.copy(deep=False)
+    stored.columns = [str(code) for code in encode(list(matrix.columns))]
+    os.makedirs(STATEMENT_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    stored.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _read(path, items=None):
+    """讀回矩陣；有指定 items 時只讀那幾欄（Parquet 按欄位讀取）。"""
+    columns = None
+    if items is not None:
+        with _codes_lock:
+            if not _names:
+                _load_codes()
+            columns = [str(_codes[name]) for name in items if name in _codes]
+    try:
+        matrix = pd.read_parquet(path, columns=columns)
+    except Exception:
+        # 指定的科目這份報表沒有：讀全部再挑
+        matrix = pd.read_parquet(path)
+    matrix.columns = decode([int(code) for code in matrix.columns])
+    if items is not None:
+        matrix = matrix.reindex(columns=items)
+    return matrix
+
+
+def _remember(key, mtime, matrix):
+    with _memory_lock:
+        _memory[key] = (mtime, matrix)
+        _memory.move_to_end(key)
+        while len(_memory) > CACHE_MAX_ITEMS:
+            _memory.popitem(last=False)
+
+
+def get_statement(symbol, statement, period, fetch, force=False):
+    """
+    取得一份報表矩陣。Parquet 檔超過 CACHE_TTL[statement] 才呼叫 fetch() 重抓
+    （過期不到 CACHE_STALE_MAX 時先回舊檔、在背景重抓），抓回空表或重抓失敗時沿用舊檔。記憶體裡的副本以檔案 mtime 判斷是否仍有效。
+    """
+    symbol = symbol.upper()
+    key = (symbol, statement, period)
+    path = _path(symbol, statement, period)
+    ttl = CACHE_TTL[statement]
+
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    age = None if mtime is None else time.time() - mtime
+    if not force and age is not None and age < ttl + CACHE_STALE_MAX:
+        if age >= ttl:
+            # 過期不久：先回舊檔，背景重抓
+            revalidate(("statement",) + key, lambda: get_statement(symbol, statement, period, fetch, force=True))
+        with _memory_lock:
+            entry = _memory.get(key)
+            if entry is not None and entry[0] == mtime:
+                _memory.move_to_end(key)
+                annotate(cache="memory" if age < ttl else "stale")
+                return entry[1]
+        matrix = _read(path)
+        _remember(key, mtime, matrix)
+        annotate(cache="disk" if age < ttl else "stale")
+        return matrix
+
+    with single_flight(("statement",) + key):
+        # 等鎖的期間別人可能已經更新過
+        if not force and os.path.exists(path) and os.path.getmtime(path) != mtime:
+            mtime = os.path.getmtime(path)
+            matrix = _read(path)
+            _remember(key, mtime, matrix)
+            annotate(cache="shared")
+            return matrix
+        annotate(cache="miss")
+        try:
+            matrix = normalize(fetch())
+        except Exception:
+            # 重抓失敗時有舊檔就先用舊檔；背景重抓（force）照樣丟出去讓呼叫端記錄
+            if force or mtime is None:
+                raise
+            annotate(cache="stale")
+            return _read(path)
+        if matrix.empty:
+            if mtime is None:
+                return matrix
+            annotate(cache="stale")
+            return _read(path)
+        _write(path, matrix)
+        _remember(key, os.path.getmtime(path), matrix)
+    return matrix
+
+
+def as_of(symbol, statement, period):
+    """本地報表檔的更新時間（epoch 秒），沒有檔案時回傳 None。"""
+    path = _path(symbol.upper(), statement, period)
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def stack(symbols, statement, period, items=None):
+    """
+    不打網路，直接從本地檔案把多檔股票同一種報表堆成
+    MultiIndex (Symbol, ReportDate) x 科目 的矩陣；只讀需要的科目欄位。
+    """
+    frames = {}
+    for symbol in symbols:
+        path = _path(symbol.upper(), statement, period)
+        if os.path.exists(path):
+            frames[symbol.upper()] = _read(path, items)
+    if not frames:
+        index = pd.MultiIndex.from_arrays([[], []], names=["Symbol", "ReportDate"])
+        return pd.DataFrame(columns=items, index=index, dtype=float)
+    return pd.concat(frames, names=["Symbol", "ReportDate"])
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+from components.cache import get_or_fetch
+from components.archive import record
+from components.config import TICKER_POOL_SIZE, TICKER_MAX_AGE
+from components.instrument import timed, add_bytes
+
+# 全程序共用的 Ticker 物件：symbol -> (建立時間, Ticker, 已讀過的屬性)，依最近使用排序，超過上限就淘汰最舊的
+_tickers = OrderedDict()
+_lock = threading.Lock()
+_session = None
+_factory = None
+
+
+def _make_session():
+    """
+    建立一個 keep-alive 的 HTTP session 給所有 Ticker 共用。
+    新版 yfinance 要求 curl_cffi session；沒有安裝時退回 requests 的連線池。
+    收到的位元組數會回報給 components.instrument。
+    """
+    try:
+        from curl_cffi import requests as curl_requests
+    except ImportError:
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.hooks["response"].append(lambda response, *args, **kwargs: add_bytes(len(response.content)))
+        return session
+
+    class MeteredSession(curl_requests.Session):
+        def request(self, *args, **kwargs):
+            response = super().request(*args, **kwargs)
+            add_bytes(len(response.content))
+            return response
+
+    return MeteredSession(impersonate="chrome")
+
+
+def set_ticker_factory(factory):
+    """
+    替換建立 Ticker 的函式 factory(symbol, session)，例如 benchmark 用本地 fixture 取代 Yahoo。
+    傳 None 還原成 yf.Ticker；已在 pool 裡的 Ticker 會一併清掉。
+    """
+    global _factory
+    with _lock:
+        _factory = factory
+        _tickers.clear()
+
+
+def get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _make_session()
+        return _session
+
+
+def get_ticker(symbol, dataset=None):
+    """
+    取得共用的 yf.Ticker，同一個 symbol 短時間內只建立一次。
+    Ticker 會把抓過的資料（info、財報、持股…）留在物件裡，重抓時必須換新的才拿得到新資料：
+    dataset 是接下來要讀的屬性，pool 裡的 Ticker 已經讀過它就換一個新的；
+    超過 TICKER_MAX_AGE 也一律換新。
+    """
+    symbol = symbol.upper()
+    session = get_session()
+    now = time.monotonic()
+    with _lock:
+        entry = _tickers.get(symbol)
+        if entry is None or now - entry[0] > TICKER_MAX_AGE or dataset in entry[2]:
+            if _factory is not None:
+                entry = (now, _factory(symbol, session), set())
+            else:
+                import yfinance as yf  # 延後載入：只有真的要抓 Yahoo 資料時才 import
+                entry = (now, yf.Ticker(symbol, session=session), set())
+            _tickers[symbol] = entry
+        if dataset is not None:
+            entry[2].add(dataset)
+        ticker = entry[1]
+        _tickers.move_to_end(symbol)
+        while len(_tickers) > TICKER_POOL_SIZE:
+            _tickers.popitem(last=False)
+    return ticker
+
+
+@timed("tickers.download")
+def download(symbols, start, end):
+    """
+    多檔日 K 一次下載（yf.download 單一批次請求，共用同一個 session），回傳 {symbol: DataFrame}。
+    有設定 ticker factory 時改由各個 Ticker 的 history() 組成。
+    """
+    symbols = [symbol.upper() for symbol in symbols]
+    if _factory is not None:
+        return {symbol: get_ticker(symbol).history(start=start, end=end, interval="1d") for symbol in symbols}
+    import yfinance as yf
+    data = yf.download(
+        symbols, start=start, end=end, interval="1d", group_by="ticker",
+        session=get_session(), progress=False, threads=True,
+    )
+    if data is None or data.empty:
+        return {}
+    available = set(data.columns.get_level_values(0))
+    return {symbol: data[symbol].dropna(how="all") for symbol in symbols if symbol in available}
+
+
+@timed("tickers.get_info")
+def get_info(symbol):
+    """ticker.info 的快取版本，Overview 與其他頁面共用同一份 payload。"""
+    return get_or_fetch(symbol, "info", None, lambda: _fetch_info(symbol))
+
+
+def _fetch_info(symbol):
+    # 每次重抓順便存一份當天的基本面快照（本益比、市值…的歷史）
+    return record(symbol, "info", get_ticker(symbol, "info").info)
@@ -0,0 +1,219 @@
+"""
+篩選器用的本地股票索引：每檔一列，欄位是 Overview 會讀的 info 數值與最新一期的利潤率，
+存成 CACHE_DIR/screener/universe.parquet。篩選 / 排序直接對欄位陣列做向量化運算，
+側邊欄的代號 / 公司名稱搜尋則用排序好的前綴索引（bisect）。
+"""
+import bisect
+import operator
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from components.config import CACHE_DIR
+from components.batch import load_income_statements, latest_snapshot
+from components.metrics import compute_metrics
+from components.prefetch import prefetch
+from components.tickers import get_info
+from components.instrument import timed
+
+SCREENER_DIR = os.path.join(CACHE_DIR, "screener")
+INDEX_PATH = os.path.join(SCREENER_DIR, "universe.parquet")
+INFO_FIELDS = ["longName", "sector", "industry", "marketCap", "trailingPE", "trailingEps", "currentPrice"]
+# 欄名 -> metrics 的欄位（最新一季）
+METRIC_FIELDS = {
+    "grossMargin": "Gross Margin (%)",
+    "operatingMargin": "Operating Margin (%)",
+    "netMargin": "Net Margin (%)",
+    "revenueYoY": "Revenue YoY (%)",
+}
+TEXT_FIELDS = ["longName", "sector", "industry"]
+COLUMNS = ["symbol", *INFO_FIELDS, *METRIC_FIELDS, "reportDate"]
+SUFFIXES = {"K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+QUOTED = re.compile(r'"[^"]*"|\'[^\']*\'')
+OPERATORS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+    "=": operator.eq, "==": operator.eq, "!=": operator.ne,
+}
+
+# 讀進記憶體的索引：檔案 mtime、表、欄位陣列、前綴索引（keys 排序好，values 是對應的 symbol）
+_index = {"mtime": -1}  # -1：還沒讀過
+_index_lock = threading.Lock()
+
+
+def _empty():
+    return pd.DataFrame(columns=COLUMNS)
+
+
+def _info_row(symbol):
+    info = get_info(symbol) or {}
+    # 查無此股時 yfinance 仍回傳一個幾乎是空的 dict，不能當成一列全是 NaN 的資料
+    if not info.get("longName") or info.get("marketCap") is None:
+        raise ValueError(f"no longName / marketCap in info for {symbol}")
+    return {"symbol": symbol, **{field: info.get(field) for field in INFO_FIELDS}}
+
+
+@timed("universe.build")
+def build_index(symbols):
+    """
+    並行收集 symbols 的 info 與損益表（都走既有快取），更新本地索引。
+    不在這次清單裡的 symbol 保留原本的資料。回傳 (索引, 失敗的 symbol 清單)。
+    """
+    futures = prefetch({s: (lambda s=s: _info_row(s)) for s in symbols})
+    rows, failed = [], []
+    for symbol, future in futures.items():
+        try:
+            rows.append(future.result())
+        except Exception:
+            failed.append(symbol)
+    if not rows:
+        return load_index(), failed
+    new = pd.DataFrame(rows).set_index("symbol")
+
+    # 利潤率：整個 universe 的損益表堆成一張 panel，一次向量化算完再取最新一期
+    metrics = latest_snapshot(compute_metrics(load_income_statements(list(new.index))))
+    if not metrics.empty:
+        margins = metrics[list(METRIC_FIELDS.values())].rename(columns={v: k for k, v in METRIC_FIELDS.items()})
+        new = new.join(margins.assign(reportDate=metrics["ReportDate"]))
+    new = new.reset_index().reindex(columns=COLUMNS)
+
+    old = load_index()
+    index = pd.concat([old[~old["symbol"].isin(new["symbol"])], new], ignore_index=True)
+    index = index.sort_values("symbol", ignore_index=True)
+    for col in INFO_FIELDS + list(METRIC_FIELDS):
+        if col not in TEXT_FIELDS:
+            index[col] = pd.to_numeric(index[col], errors="coerce").astype(float)
+    index["longName"] = index["longName"].fillna("").astype(str)
+    for col in ("sector", "industry"):
+        index[col] = index[col].fillna("Unknown").astype(str).astype("category")
+    os.makedirs(SCREENER_DIR, exist_ok=True)
+    tmp_path = f"{INDEX_PATH}.{os.getpid()}.tmp"
+    index.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, INDEX_PATH)
+    return index, failed
+
+
+def _build_prefix(index):
+    """代號、公司全名、公司名稱裡的每個字都當成搜尋鍵，排序後給 bisect 用。"""
+    pairs = []
+    for symbol, name in zip(index["symbol"], index["longName"]):
+        pairs.append((symbol.lower(), symbol))
+        name = name.lower()
+        if name:
+            pairs.append((name, symbol))
+            pairs.extend((word, symbol) for word in re.findall(r"[\w&.\-]+", name)[1:] if len(word) > 1)
+    pairs.sort()
+    return [key for key, _ in pairs], [symbol for _, symbol in pairs]
+
+
+def _load():
+    """索引檔讀進記憶體（依 mtime 判斷是否要重讀），同時準備好欄位陣列與前綴索引。"""
+    mtime = os.path.getmtime(INDEX_PATH) if os.path.exists(INDEX_PATH) else None
+    with _index_lock:
+        if _index["mtime"] != mtime:
+            frame = pd.read_parquet(INDEX_PATH) if mtime is not None else _empty()
+            keys, values = _build_prefix(frame)
+            _index.update(
+                mtime=mtime, frame=frame, keys=keys, values=values,
+                arrays={col: frame[col].to_numpy() for col in frame.columns},
+                market_cap=dict(zip(frame["symbol"], frame["marketCap"])),
+                names=dict(zip(frame["symbol"], frame["longName"])),
+            )
+        return dict(_index)
+
+
+def load_index():
+    """目前的索引表；還沒建立時回傳空表。"""
+    return _load()["frame"]
+
+
+def _value(text):
+    """'100B' -> 1e11、'25' -> 25.0；不是數字時回傳去掉引號的字串。"""
+    text = text.strip().strip("'\"")
+    match = re.fullmatch(r"(-?[\d.]+(?:e-?\d+)?)\s*([KMBT]?)", text, re.IGNORECASE)
+    if match:
+        return float(match.group(1)) * SUFFIXES.get(match.group(2).upper(), 1)
+    return text
+
+
+def _split_clauses(expression):
+    """依 and / 逗號切成條件；引號裡的 and 與逗號不算（longName ~ "Procter and Gamble"）。"""
+    quoted = []
+    masked = QUOTED.sub(lambda m: quoted.append(m.group()) or f"\0{len(quoted) - 1}\0", expression)
+    parts = re.split(r"\s+and\s+|,", masked, flags=re.IGNORECASE)
+    return [re.sub(r"\0(\d+)\0", lambda m: quoted[int(m.group(1))], part) for part in parts]
+
+
+def parse_filter(expression):
+    """
+    'marketCap > 100B and trailingPE < 30, sector = Technology, longName ~ "Procter and Gamble"'
+    -> [(欄位, 運算子, 值), ...]；~ 是不分大小寫的「包含」，值含 and 或逗號時用引號括起來。
+    格式錯誤時丟 ValueError。
+    """
+    clauses = []
+    for part in _split_clauses(expression.strip()):
+        if not part.strip():
+            continue
+        match = re.fullmatch(r"\s*(\w+)\s*(>=|<=|!=|==|=|>|<|~)\s*(.+?)\s*", part)
+        if not match or match.group(1) not in COLUMNS:
+            raise ValueError(f"Cannot parse '{part.strip()}'. Use e.g. marketCap > 10B; fields: {', '.join(COLUMNS)}")
+        field, op, value = match.group(1), match.group(2), _value(match.group(3))
+        if field not in TEXT_FIELDS and field not in ("symbol", "reportDate") and op != "~" and not isinstance(value, float):
+            raise ValueError(f"'{field}' is numeric; compare it with a number such as 25 or 10B")
+        clauses.append((field, op, value))
+    return clauses
+
+
+@timed("universe.screen")
+def screen(expression="", sort="-marketCap", limit=None):
+    """
+    在索引上套用篩選條件與排序，回傳符合的列。
+    每個條件對整個欄位陣列算一次布林遮罩再 AND 起來；sort 是 '-marketCap, trailingPE' 這種格式。
+    """
+    state = _load()
+    arrays, frame = state["arrays"], state["frame"]
+    mask = np.ones(len(frame), dtype=bool)
+    for field, op, value in parse_filter(expression):
+        column = arrays[field]
+        if op == "~":
+            mask &= pd.Series(column).astype(str).str.contains(str(value), case=False, regex=False).to_numpy()
+        elif field == "reportDate":
+            day = pd.Timestamp(str(int(value)) if isinstance(value, float) else value)
+            mask &= np.asarray(OPERATORS[op](pd.to_datetime(column), day))  # NaT 比較結果都是 False
+        elif isinstance(value, float) and field not in TEXT_FIELDS:
+            with np.errstate(invalid="ignore"):
+                mask &= OPERATORS[op](column.astype(float), value)  # NaN 比較結果都是 False
+        else:
+            mask &= OPERATORS[op](pd.Series(column).astype(str).str.lower().to_numpy(), str(value).lower())
+    result = frame[mask]
+
+    keys = [key.strip() for key in sort.split(",") if key.strip()]
+    by = [key.lstrip("-") for key in keys if key.lstrip("-") in frame.columns]
+    if by:
+        ascending = [not key.startswith("-") for key in keys if key.lstrip("-") in frame.columns]
+        result = result.sort_values(by, ascending=ascending, na_position="last", kind="stable")
+    return result if limit is None else result.head(limit)
+
+
+def search(prefix, limit=10):
+    """
+    代號或公司名稱的前綴搜尋：bisect 找到第一個 >= prefix 的鍵，往後掃到不再符合為止。
+    代號完全相同的排最前面，接著是代號開頭符合，其餘依市值由大到小。回傳 [(symbol, 公司名稱)]。
+    """
+    prefix = prefix.strip().lower()
+    if not prefix:
+        return []
+    state = _load()
+    keys, values = state["keys"], state["values"]
+    matches = set()
+    i = bisect.bisect_left(keys, prefix)
+    while i < len(keys) and keys[i].startswith(prefix) and len(matches) < 50 * limit:
+        matches.add(values[i])
+        i += 1
+    market_cap, names = state["market_cap"], state["names"]
+    ranked = sorted(matches, key=lambda s: (
+        s.lower() != prefix, not s.lower().startswith(prefix), -np.nan_to_num(market_cap.get(s, 0.0)), s
+    ))[:limit]
+    return [(symbol, names.get(symbol, "")) for symbol in ranked]
@@ -1,4 +1,10 @@
-import yfinance as yf
+import datetime
+from components.cache import get_or_fetch
+from components.statements import get_statement
+from components.archive import record
+from components.config import FINNCLIENT, STARTDATE
+from components.tickers import get_ticker
+from components.instrument import timed
 
 def format_number(value):
     """Format large numbers into B (Billion) or M (Million)."""
@@ -9,41 +15,73 @@ def format_number(value):
     else:
         return f"{value:,}"  # Keep smaller numbers with commas
     
+@timed("utils.get_ic")
 def get_ic(symbol,type="quarterly"):
-    ticker = yf.Ticker(symbol)
+    return get_statement(symbol, "income", type, lambda: _fetch_ic(symbol, type))
 
+def _fetch_ic(symbol,type):
     if type =="quarterly":
-        df_quarterly = ticker.quarterly_financials 
+        df_quarterly = get_ticker(symbol, "quarterly_financials").quarterly_financials 
         return df_quarterly
     elif type =="annual":
-        df_annual = ticker.financials
+        df_annual = get_ticker(symbol, "financials").financials
         return df_annual
 
 
+@timed("utils.get_bs")
 def get_bs(symbol,type="quarterly"):
-    ticker = yf.Ticker(symbol)
+    return get_statement(symbol, "balance", type, lambda: _fetch_bs(symbol, type))
+
+def _fetch_bs(symbol,type):
     if type =="quarterly":
-        df_quarterly = ticker.quarterly_balance_sheet
+        df_quarterly = get_ticker(symbol, "quarterly_balance_sheet").quarterly_balance_sheet
         return df_quarterly
     elif type =="annual":
-        df_annual = ticker.balance_sheet
+        df_annual = get_ticker(symbol, "balance_sheet").balance_sheet
         return df_annual
 
+@timed("utils.get_cf")
 def get_cf(symbol,type="quarterly"):
-    ticker = yf.Ticker(symbol)
+    return get_statement(symbol, "cashflow", type, lambda: _fetch_cf(symbol, type))
+
+def _fetch_cf(symbol,type):
     if type =="quarterly":
-        df_quarterly = ticker.quarterly_cashflow
+        df_quarterly = get_ticker(symbol, "quarterly_cashflow").quarterly_cashflow
         return df_quarterly
     elif type =="annual":
-        df_annual = ticker.cashflow
+        df_annual = get_ticker(symbol, "cashflow").cashflow
         return df_annual
 
+@timed("utils.get_institutional_holders")
 def get_institutional_holders(symbol):
-    ticker = yf.Ticker(symbol)
+    return get_or_fetch(symbol, "institutional_holders", None, lambda: _fetch_institutional_holders(symbol))
+
+def _fetch_institutional_holders(symbol):
+    ticker = get_ticker(symbol, "institutional_holders")
     df = ticker.institutional_holders
-    return df
+    return record(symbol, "institutional_holders", df)  # 每次重抓順便存一份歷史快照
 
+@timed("utils.get_major_holders")
 def get_major_holders(symbol):
-    ticker = yf.Ticker(symbol)
+    return get_or_fetch(symbol, "major_holders", None, lambda: _fetch_major_holders(symbol))
+
+def _fetch_major_holders(symbol):
+    ticker = get_ticker(symbol, "major_holders")
     df = ticker.major_holders
-    return df
\ No newline at end of file
+    return record(symbol, "major_holders", df)
+
+
+@timed("utils.get_profile")
+def get_profile(symbol):
+    return get_or_fetch(symbol, "profile", None, lambda: _fetch_profile(symbol))
+
+def _fetch_profile(symbol, client=FINNCLIENT):
+    return client.company_profile2(symbol=symbol)
+
+def _fetch_news(symbol, start, client=FINNCLIENT):
+    # 新聞改存在 components.news_store，這裡只負責打 API
+    return client.company_news(symbol,_from=start.strftime('%Y-%m-%d'), to=datetime.datetime.today().strftime('%Y-%m-%d'))
+
+def _fetch_insider_transactions(symbol, start=STARTDATE, client=FINNCLIENT):
+    # 交易明細改存在 components.insider_store，這裡只負責打 API
+    return client.stock_insider_transactions(symbol,start,datetime.datetime.today().strftime('%Y-%m-%d'))
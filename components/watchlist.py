@@ -0,0 +1,59 @@
+import streamlit as st
+import plotly.express as px
+
+from components.figcache import show_figure
+from components.instrument import timed
+from components.batch import parse_symbols, load_income_statements, latest_snapshot
+from components.metrics import compute_metrics
+
+SORTABLE = [
+    "Total Revenue", "Net Income", "Gross Margin (%)", "Operating Margin (%)",
+    "Net Margin (%)", "Revenue YoY (%)", "Diluted EPS YoY (%)", "Revenue CAGR (%)",
+    "TTM Total Revenue", "TTM Net Income", "Diluted EPS"
+]
+MAX_CHARTS = 30  # small multiples 最多畫幾檔，避免瀏覽器卡住
+
+
+@timed("page.show_watchlist")
+def show_watchlist(symbols_text, period_type="quarterly"):
+    symbols = parse_symbols(symbols_text)
+    if not symbols:
+        st.info("Enter at least one symbol.")
+        return
+
+    with st.spinner(f"Loading {len(symbols)} income statements..."):
+        panel = load_income_statements(symbols, period_type)
+    if panel.empty:
+        st.warning(f"No {period_type} financial data for these symbols.")
+        return
+    metrics = compute_metrics(panel, period_type)
+    snapshot = latest_snapshot(metrics)
+
+    missing = sorted(set(symbols) - set(snapshot.index))
+    if missing:
+        st.caption(f"No data: {', '.join(missing)}")
+
+    # 1) 橫截面表格（st.dataframe 本身可點欄位排序）
+    sort_by = st.selectbox("Sort by", SORTABLE, index=SORTABLE.index("Revenue YoY (%)"))
+    snapshot = snapshot.sort_values(sort_by, ascending=False)
+    st.subheader("Latest period")
+    st.dataframe(snapshot, use_container_width=True)
+
+    # 2) small multiples：依排序取前幾名畫趨勢
+    metric = st.selectbox("Trend metric", SORTABLE, index=SORTABLE.index("Net Margin (%)"))
+    top = snapshot.index[:MAX_CHARTS]
+    long_df = metrics.loc[top, [metric]].reset_index()
+    fig = px.line(
+        long_df,
+        x="ReportDate",
+        y=metric,
+        facet_col="Symbol",
+        facet_col_wrap=5,
+        markers=True,
+        height=220 * ((len(top) + 4) // 5),
+    )
+    fig.update_yaxes(matches=None, title_text="")
+    fig.update_xaxes(title_text="")
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+    st.subheader(f"{metric} trend (top {len(top)} by {sort_by})")
+    show_figure(fig, "watchlist_trend", use_container_width=True)
@@ -0,0 +1,49 @@
+import datetime
+
+import streamlit as st
+import plotly.express as px
+
+from components.analytics import build_dataset, load_dataset, institutions_adding, net_insider_by_sector
+from components.batch import parse_symbols
+from components.figcache import cached_figure, show_figure
+from components.instrument import timed
+
+
+@timed("page.show_whale_screens")
+def show_whale_screens(symbols_text):
+    """跨股票的機構 / 內部人篩選：讀本地 Parquet 資料集，按鈕才重新建立。"""
+    if st.button("Rebuild dataset for these symbols"):
+        symbols = parse_symbols(symbols_text)
+        with st.spinner(f"Collecting holders and insider trades for {len(symbols)} symbols..."):
+            holders, insiders, failed = build_dataset(symbols)
+        if failed:
+            st.caption(f"Failed: {', '.join(failed)}")
+    else:
+        holders, insiders = load_dataset()
+        if holders is None:
+            st.info("No dataset yet. Press the button above to build it.")
+            return
+
+    st.caption(f"{holders['symbol'].nunique()} symbols, {len(holders)} holder rows, {len(insiders)} insider trades")
+
+    # 1) 哪些機構在最多檔股票加碼
+    st.subheader("Institutions adding to the most positions")
+    adding = institutions_adding(holders)
+    st.dataframe(adding, use_container_width=True)
+
+    # 2) 依產業的內部人淨買賣
+    st.subheader("Net insider buying by sector")
+    days = st.slider("Lookback (days)", min_value=30, max_value=1095, value=365, step=30)
+    start = datetime.date.today() - datetime.timedelta(days=days)
+    by_sector = net_insider_by_sector(insiders, start=start)
+    st.dataframe(by_sector, use_container_width=True)
+    if not by_sector.empty:
+        bar_data = by_sector.reset_index()
+        fig = cached_figure("insider_by_sector", bar_data, {}, lambda: px.bar(
+            bar_data,
+            x="sector",
+            y="net_value",
+            title="Net insider open-market value by sector",
+            labels={"sector": "Sector", "net_value": "Net value (USD)"},
+        ))
+        show_figure(fig, "insider_by_sector", use_container_width=True)
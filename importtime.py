@@ -0,0 +1,72 @@
+"""
+匯入時間分析：在乾淨的子程序裡用 `python -X importtime` 匯入每個頁面模組，
+列出總匯入時間與最重的幾個套件，用來盯住新 session 的首次渲染延遲。
+
+    python importtime.py                # 所有頁面
+    python importtime.py components.overview --top 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# app 本身應該只載入 streamlit；各頁面模組在選到時才載入
+MODULES = [
+    "streamlit",
+    "app",
+    "components.overview",
+    "components.financialdata",
+    "components.financialTrend",
+    "components.insider",
+    "components.whales",
+    "components.watchlist",
+    "components.portfolio",
+    "components.screener",
+]
+
+
+def measure(module):
+    """回傳 [(套件名稱, 深度, self 微秒, cumulative 微秒), ...]。"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-module import time breakdown (python -X importtime).")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--top", type=int, default=10, help="number of heaviest packages to list per module")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            rows = measure(module)
+        except RuntimeError as exc:
+            print(f"{module}: {exc}\n")
+            continue
+        total_ms = sum(row[3] for row in rows if row[1] == 0) / 1000
+        # 依頂層套件加總 self 時間，看出時間花在哪個套件（pandas、plotly、yfinance...）
+        by_package = {}
+        for name, _, self_us, _ in rows:
+            package = name.split(".")[0]
+            by_package[package] = by_package.get(package, 0) + self_us
+        print(f"{module}: {total_ms:.0f} ms total, {len(rows)} modules")
+        for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {self_us / 1000:8.1f} ms  {package}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
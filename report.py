@@ -0,0 +1,235 @@
+"""
+批次報表：對一串 symbols 產生 Sankey、損益趨勢與 K 線圖的靜態報表（HTML / PNG / PDF）。
+與 Streamlit app 分開執行，繪圖吃滿所有核心也不會拖慢互動中的 session；圖表沿用頁面的 build_* 函式。
+資料先在主程序從共用快取讀齊（過期才打網路），算出資料雜湊；
+雜湊與上次相同且檔案都還在的 symbol 直接略過，其餘丟進 process pool 繪製。
+
+    python report.py AAPL MSFT NVDA                 # 預設輸出 HTML 到 reports/
+    python report.py --formats html png pdf         # WATCHLIST 全部；PNG / PDF 需要 kaleido（與 Chrome）
+    python report.py AAPL --period annual --start 2018-01-01 --out /tmp/reports
+    python report.py AAPL --force                   # 不管雜湊，全部重畫
+    python report.py --fixtures benchmarks/fixtures AAA BBB   # 用錄好的 fixtures，不打網路
+"""
+import argparse
+import datetime
+import html
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FORMATS = ["html", "png", "pdf"]
+MANIFEST = "manifest.json"
+LAYOUT_VERSION = 2  # 報表內容或版面改了就加一，舊報表會全部重畫
+TREND_NAMES = ["revenue_net_income", "margins", "eps", "operating"]
+
+
+# ---- 主程序：讀資料、判斷哪些要重畫 ----
+
+def load(symbol, period, start):
+    """從共用快取讀齊一檔報表需要的資料：指標表（Sankey + 趨勢）與日 K。"""
+    from components.metrics import get_metrics
+    from components.pricestore import load_prices
+    return {
+        "metrics": get_metrics(symbol, period),
+        "candles": load_prices(symbol, start, datetime.date.today()),
+    }
+
+
+def report_hash(symbol, data, period):
+    from components.figcache import data_hash
+    return data_hash(data["metrics"], data["candles"], symbol, period, LAYOUT_VERSION)
+
+
+def expected_files(symbol, formats, names):
+    """這檔報表應該產生的檔案（相對於輸出目錄）。"""
+    files = [f"{symbol}/report.html"] if "html" in formats else []
+    files += [f"{symbol}/{name}.{fmt}" for fmt in formats if fmt != "html" for name in names]
+    return files
+
+
+def up_to_date(entry, digest, formats, out_dir):
+    return (
+        entry is not None and entry["hash"] == digest and set(formats) <= set(entry["formats"])
+        and all(os.path.exists(os.path.join(out_dir, path)) for path in entry["files"])
+    )
+
+
+def read_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def static_export_error(formats):
+    """PNG / PDF 需要 kaleido；沒裝時回傳錯誤訊息。"""
+    if not set(formats) - {"html"}:
+        return None
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        return "PNG / PDF export needs the kaleido package (pip install kaleido)"
+    return None
+
+
+# ---- 子程序：建圖與寫檔 ----
+
+def build_figures(symbol, data, period):
+    """{圖名: plotly Figure}，直接呼叫頁面用的 build_* 函式。"""
+    from components.financialdata import build_sankey_figure, sankey_flows
+    from components.financialTrend import trend_frame, build_trend_figures
+    from components.overview import build_candle_figure
+    from components.lod import level_of_detail
+
+    figures = {}
+    metrics, candles = data["metrics"], data["candles"]
+    if not metrics.empty:
+        figures["sankey"] = build_sankey_figure(symbol, metrics.index, sankey_flows(metrics), period)
+        trend = trend_frame(metrics)
+        if not trend.empty:
+            figures.update(zip((f"trend_{name}" for name in TREND_NAMES), build_trend_figures(symbol, period, trend)))
+    if not candles.empty:
+        visible, resolution = level_of_detail(candles)
+        fig = build_candle_figure(visible)
+        fig.update_layout(title=f"{symbol} {resolution} Candlestick Chart")
+        figures["candles"] = fig
+    return figures
+
+
+def write_html(path, symbol, figures, period):
+    parts = [
+        f"<h1>{html.escape(symbol)}</h1>",
+        f"<p>{period.capitalize()} statements · generated {datetime.datetime.now():%Y-%m-%d %H:%M}</p>",
+    ]
+    for i, fig in enumerate(figures.values()):
+        # plotly.js 只在第一張圖載入一次
+        parts.append(fig.to_html(full_html=False, include_plotlyjs="cdn" if i == 0 else False))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(symbol)} report</title></head>"
+                f"<body>{''.join(parts)}</body></html>")
+
+
+def render(symbol, data, period, formats, out_dir):
+    """
+    在子程序裡建圖、寫出各格式的檔案。
+    回傳 (symbol, 成功的格式, 寫出的檔案, 錯誤訊息清單)；某個格式失敗不影響其他格式。
+    """
+    figures = build_figures(symbol, data, period)
+    directory = os.path.join(out_dir, symbol)
+    os.makedirs(directory, exist_ok=True)
+    done, files, errors = [], [], []
+    for fmt in formats:
+        try:
+            if fmt == "html":
+                write_html(os.path.join(directory, "report.html"), symbol, figures, period)
+            else:
+                for name, fig in figures.items():
+                    fig.write_image(os.path.join(directory, f"{name}.{fmt}"), format=fmt)
+        except Exception as exc:
+            first_line = next((line.strip() for line in str(exc).splitlines() if line.strip()), "")
+            errors.append(f"{fmt}: {type(exc).__name__}: {first_line}")
+            continue
+        done.append(fmt)
+        files += expected_files(symbol, [fmt], list(figures))
+    return symbol, done, files, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render static Sankey / trend / candlestick reports for many symbols.")
+    parser.add_argument("symbols", nargs="*", help="symbols to report on (default: DASHBOARD_WATCHLIST)")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=["html"])
+    parser.add_argument("--period", choices=["quarterly", "annual"], default="quarterly")
+    parser.add_argument("--start", default=None, help="first candlestick date, YYYY-MM-DD (default: STARTDATE)")
+    parser.add_argument("--out", default=os.path.join(ROOT, "reports"), help="output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="rendering processes")
+    parser.add_argument("--force", action="store_true", help="re-render even if the data has not changed")
+    parser.add_argument("--fixtures", help="replay recorded fixtures instead of calling Yahoo / Finnhub")
+    args = parser.parse_args()
+
+    from components.config import STARTDATE, WATCHLIST
+    from components.prefetch import prefetch
+    if args.fixtures:
+        from benchmarks.fixtures import FixtureFinnhub, Universe, load_all
+        from components.config import FINNHUB_SCHEDULER
+        from components.tickers import set_ticker_factory
+        universe = Universe(load_all(args.fixtures))
+        set_ticker_factory(universe.ticker_factory)
+        FINNHUB_SCHEDULER.set_client(FixtureFinnhub(universe))
+
+    error = static_export_error(args.formats)
+    if error:
+        sys.exit(error)
+    symbols = list(dict.fromkeys(s.upper() for s in args.symbols)) or WATCHLIST
+    start = datetime.date.fromisoformat(args.start or STARTDATE)
+    os.makedirs(args.out, exist_ok=True)
+    started = time.perf_counter()
+
+    # 1) 資料：thread pool 並行從快取讀（I/O 為主），算雜湊決定要不要重畫
+    futures = prefetch({symbol: (lambda s=symbol: load(s, args.period, start)) for symbol in symbols})
+    manifest = read_manifest(args.out)
+    todo, skipped, failed = {}, [], []
+    for symbol, future in futures.items():
+        try:
+            data = future.result()
+        except Exception as exc:
+            failed.append(symbol)
+            print(f"{symbol:<8} data error: {type(exc).__name__}: {exc}")
+            continue
+        if data["metrics"].empty and data["candles"].empty:
+            failed.append(symbol)
+            print(f"{symbol:<8} no data")
+            continue
+        digest = report_hash(symbol, data, args.period)
+        if not args.force and up_to_date(manifest.get(symbol), digest, args.formats, args.out):
+            skipped.append(symbol)
+        else:
+            todo[symbol] = (data, digest)
+    print(f"{len(todo)} to render, {len(skipped)} unchanged ({time.perf_counter() - started:.1f}s loading data)")
+
+    # 2) 繪圖：CPU 為主，用 spawn 的 process pool（主程序已開了 thread，不用 fork）
+    if todo:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(todo)), mp_context=context) as pool:
+            jobs = {pool.submit(render, symbol, data, args.period, args.formats, args.out): symbol
+                    for symbol, (data, _) in todo.items()}
+            for job in as_completed(jobs):
+                try:
+                    symbol, done, files, errors = job.result()
+                except Exception as exc:
+                    failed.append(jobs[job])
+                    print(f"{jobs[job]:<8} render error: {type(exc).__name__}: {exc}")
+                    continue
+                for message in errors:
+                    print(f"{symbol:<8} {message}")
+                if errors:
+                    failed.append(symbol)
+                if done:
+                    # 只記成功的格式；失敗的格式下次會再畫
+                    manifest[symbol] = {
+                        "hash": todo[symbol][1], "formats": done, "files": files,
+                        "rendered_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                    }
+                    print(f"{symbol:<8} {', '.join(done)} -> {os.path.join(args.out, symbol)}")
+        write_manifest(args.out, manifest)
+
+    print(f"rendered {len(todo) - len(set(failed) & set(todo))}, unchanged {len(skipped)}, "
+          f"failed {len(failed)} in {time.perf_counter() - started:.1f}s")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+背景預熱 worker：依 REFRESH_CADENCE 定期更新 WATCHLIST 裡每檔股票的資料，
+寫進與 dashboard 共用的快取 / 價格檔，讓頁面載入時直接讀到熱資料。
+
+    python worker.py          # 常駐執行
+    python worker.py --once   # 每個資料集各跑一次就結束（可搭配 cron）
+"""
+import argparse
+import datetime
+import logging
+import time
+
+from components.cache import refresh
+from components.config import FINNCLIENT_BACKGROUND, NEWS_BATCH, REFRESH_CADENCE, STARTDATE, WATCHLIST
+from components.pricestore import sync
+from components.statements import get_statement
+from components.insider_store import ingest
+from components.news_store import ingest as ingest_news, iter_news, thumbnail
+from components import utils
+from components import tickers
+
+log = logging.getLogger("worker")
+
+
+def refresh_candles(symbol):
+    sync(symbol, STARTDATE, force=True)
+
+
+def refresh_news(symbol):
+    ingest_news(symbol, force=True, client=FINNCLIENT_BACKGROUND)
+    # 第一頁的縮圖也先準備好
+    for article in next(iter_news(symbol, NEWS_BATCH), []):
+        if article["image"]:
+            thumbnail(article["image"])
+
+
+def refresh_info(symbol):
+    refresh(symbol, "info", None, lambda: tickers._fetch_info(symbol))
+
+
+def refresh_holders(symbol):
+    refresh(symbol, "major_holders", None, lambda: utils._fetch_major_holders(symbol))
+    refresh(symbol, "institutional_holders", None, lambda: utils._fetch_institutional_holders(symbol))
+
+
+def refresh_insider_transactions(symbol):
+    ingest(symbol, force=True, client=FINNCLIENT_BACKGROUND)
+
+
+def refresh_statements(symbol):
+    for period in ("quarterly", "annual"):
+        get_statement(symbol, "income", period, lambda: utils._fetch_ic(symbol, period), force=True)
+        get_statement(symbol, "balance", period, lambda: utils._fetch_bs(symbol, period), force=True)
+        get_statement(symbol, "cashflow", period, lambda: utils._fetch_cf(symbol, period), force=True)
+
+
+def refresh_profile(symbol):
+    refresh(symbol, "profile", None, lambda: utils._fetch_profile(symbol, FINNCLIENT_BACKGROUND))
+
+
+JOBS = {
+    "candles": refresh_candles,
+    "news": refresh_news,
+    "info": refresh_info,
+    "holders": refresh_holders,
+    "insider_transactions": refresh_insider_transactions,
+    "statements": refresh_statements,
+    "profile": refresh_profile,
+}
+
+
+def next_run_time(cadence, now):
+    """依 cadence 算出下一次執行的時間（epoch 秒）。"""
+    if "every" in cadence:
+        return now + cadence["every"]
+    hour, minute = map(int, cadence["at"].split(":"))
+    current = datetime.datetime.fromtimestamp(now, datetime.timezone.utc)
+    target = current.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= current:
+        target += datetime.timedelta(days=1)
+    return target.timestamp()
+
+
+def run_job(name, symbols):
+    started = time.time()
+    for symbol in symbols:
+        try:
+            JOBS[name](symbol)
+        except Exception:
+            log.exception("refresh %s for %s failed", name, symbol)
+    log.info("refreshed %s for %d symbols in %.1fs", name, len(symbols), time.time() - started)
+
+
+def run(symbols, once=False):
+    # 啟動時每個資料集都先跑一次，之後照各自的頻率排程
+    due = {name: 0.0 for name in JOBS}
+    while True:
+        now = time.time()
+        for name in JOBS:
+            if due[name] <= now:
+                run_job(name, symbols)
+                due[name] = next_run_time(REFRESH_CADENCE[name], time.time())
+        if once:
+            return
+        time.sleep(max(1.0, min(due.values()) - time.time()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm dashboard caches for a watchlist.")
+    parser.add_argument("--once", action="store_true", help="refresh every dataset once and exit")
+    parser.add_argument("symbols", nargs="*", help="symbols to refresh (default: DASHBOARD_WATCHLIST)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    run([s.upper() for s in args.symbols] or WATCHLIST, once=args.once)
+
+
+if __name__ == "__main__":
+    main()